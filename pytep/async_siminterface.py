@@ -0,0 +1,108 @@
+import asyncio
+import concurrent.futures
+
+from pytep.siminterface import BaseSimInterface, make_bridge
+
+
+async def wait_for_future(future, min_interval=0.001, max_interval=0.02):
+    """Awaits the future of a background bridge call without blocking the event loop.
+
+    concurrent.futures.Future objects are awaited directly. Futures of the MATLAB engine are checked with an
+    exponentially growing interval between min_interval and max_interval seconds.
+
+    Returns
+    -------
+    The result of the future
+    """
+    if isinstance(future, concurrent.futures.Future):
+        return await asyncio.wrap_future(future)
+    interval = min_interval
+    while not future.done():
+        await asyncio.sleep(interval)
+        interval = min(2 * interval, max_interval)
+    return future.result()
+
+
+class AsyncSimInterface(BaseSimInterface):
+    """asyncio version of the :class:`~pytep.siminterface.SimInterface`.
+
+    simulate(), update() and set_idv() are coroutines built on the background calls of the bridge, so one event loop
+    can drive several plants concurrently: while one plant simulates, the data of another one is transferred.
+    AsyncSimInterface is not a singleton, every instance owns its own bridge. All other methods are inherited from the
+    SimInterface and are synchronous.
+
+    Examples
+    --------
+    >>> async def main():
+    ...     plants = [AsyncSimInterface.setup() for _ in range(4)]
+    ...     await asyncio.gather(*[plant.simulate(10) for plant in plants])
+    """
+
+    @staticmethod
+    def setup(backend="matlab", save_interval=None, signals=None, seed=None, **bridge_kwargs):
+        """Creates a new, fully initialized AsyncSimInterface with its own bridge
+
+        Parameters
+        ----------
+        backend: string
+            'matlab', 'numpy' or 'fake' (see :func:`~pytep.siminterface.make_bridge`), by default 'matlab'
+        save_interval, signals, seed:
+            Logging options and seed as for :func:`~pytep.siminterface.SimInterface.setup`
+
+        Returns
+        -------
+        AsyncSimInterface
+        """
+        si = AsyncSimInterface()
+        si._attach_bridge(make_bridge(backend, **bridge_kwargs), save_interval=save_interval, signals=signals,
+                          seed=seed)
+        return si
+
+    async def simulate(self, duration=None):
+        """
+        Start/Continue the the active simulation until it is paused or terminates.
+        """
+        if duration is not None:
+            self.extend_simulation(duration)
+        with self._span("simulate.run"):
+            await wait_for_future(self._matlab_bridge.run_until_paused(background=True))
+        await self.update()
+
+    async def update(self):
+        """
+        Fetches current simulation data from the workspace and updates process_data, setpoint_data, idv_data and
+        cost_data.
+        """
+        try:
+            current_sim_time = self.current_sim_time()
+        except IndexError:
+            current_sim_time = 0
+        with self._span("update"):
+            if current_sim_time == 0:
+                self._init_internal_variables()
+            else:
+                with self._span("update.fetch"):
+                    recent_data, _ = await wait_for_future(
+                        self._matlab_bridge.fetch_since(self._fetch_cursor(), background=True)
+                    )
+                self._append_recent_data(recent_data)
+
+    async def set_idv(self, idv_idx, value, delay=0):
+        """
+        Set the fault magnitude and delay in hours before the magnitude is changed from its current value for
+        one idv (IDV1-IDV28).
+
+        Parameters
+        ----------
+        idv_idx: int
+            Index of the idv (IDV1-IDV28)
+        value: float
+            Activation flag for the IDV. Value between 0 and 1.
+        delay:
+            Delay in hours before the idv value is changed from it's current value.
+        """
+        current_time = self.current_sim_time()
+        self._log_idv_change(idv_idx, value, current_time)
+        await wait_for_future(
+            self._matlab_bridge.set_idv_step(idv_idx, value, current_time + delay, background=True)
+        )
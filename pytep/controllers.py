@@ -0,0 +1,170 @@
+"""Decentralized control strategy of the MultiLoop_mode3 model.
+
+NumPy implementation of the controllers in the "TE Plant" subsystem of ``simulator/MultiLoop_mode3.mdl`` (multiloop
+strategy of Ricker for operating mode 3). All quantities are batched along the first axis, so that a single
+:class:`MultiLoopController` can drive any number of plant copies.
+"""
+import numpy as np
+
+from pytep.mode_one import XMV_0, CONTROLLER_INIT, INTEGRATOR_INIT, TS_BASE
+
+# order of the setpoint blocks in the Simulink model (and of the 'setpoints' workspace variable)
+SP_BLOCK_NAMES = [
+    "ProductionSP", "StripLevelSP", "SepLevelSP", "ReactorLevelSP", "ReactorPressSP", "MolePctGSP", "YASP", "YACSP",
+    "ReactorTempSP", "RecycleValvePosSP", "SteamValvePosSP", "AgitatorSpeedSP",
+]
+
+# Discrete PI loops: xmv1, xmv2, xmv3, xmv4, xmv6, xmv7, xmv8, xmv10, xmv11, Fp, SP17, Eadj, r5, r6, r7
+_KC = np.array([1.6e-6, 1.8e-6, .01, .003, .01, 4e-4, 4e-4, -8., -4., 3.2, .8, -.4, -1e-4, -1e-3, -2e-4])
+_TI = np.array([.001 / 60] * 7 + [7.5 / 60, 15 / 60, 2., 1., 100 / 60, 20 / 60, 200 / 60, 200 / 60])
+_LO = np.array([0.] * 9 + [-30., 0., -np.inf, 0., 0., 0.])
+_HI = np.array([100.] * 9 + [30., 120., np.inf, 100., 100., 100.])
+# xmeas indices of the controlled variables of the flow, temperature and supervisory loops
+_MEAS = np.array([1, 2, 0, 3, 9, 13, 16, 8, 10, 16, 7, 39, 6, 11, 14])
+# xmv entries driven by the first nine loops
+_XMV_LOOPS = np.array([0, 1, 2, 3, 5, 6, 7, 9, 10])
+
+# ratio trimming loops 14 (yA) and 15 (yAC)
+_KC_TRIM = np.array([2e-4, 3e-4])
+_TI_TRIM = np.array([1., 2.])
+_TS_TRIM = .1
+
+_RATE_PRODUCTION = .3 * 22.95 / 24
+_RATE_PCT_G = 50 / 24
+
+
+def _initial_outputs(xmv_0, controller_init):
+    """Initial outputs ``x0`` of the 15 Discrete PI loops"""
+    return np.array([
+        xmv_0[0], xmv_0[1], xmv_0[2], xmv_0[3], xmv_0[5], xmv_0[6], xmv_0[7], xmv_0[9], xmv_0[10],
+        0., controller_init[1], controller_init[0], controller_init[5],
+        controller_init[6], controller_init[7],
+    ])
+
+
+def _initial_errors(integrator_init):
+    """Initial conditions of the error unit delays of the 15 Discrete PI loops"""
+    ud = np.zeros(15)
+    # loops derived from TElib/Discrete PI use integrator_init, library references start at zero
+    for loop, idx in [(2, 2), (9, 9), (10, 10), (11, 11), (12, 12), (14, 14)]:
+        ud[loop] = integrator_init[idx]
+    ud[3] = 100.
+    return ud
+
+
+def hourly_cost(xmeas, xmv):
+    """Operating cost in $/h (HourlyCost subsystem)
+
+    Parameters
+    ----------
+    xmeas : np.array
+        Process measurements (..., 41)
+    xmv : np.array
+        Manipulated variables (..., 12)
+
+    Returns
+    -------
+    np.array
+        Operating cost (...)
+    """
+    purge = xmeas[..., [28, 30, 31, 32, 33, 34, 35]] @ np.array([2.209, 6.177, 22.06, 14.56, 17.89, 30.44, 22.94])
+    product = xmeas[..., [36, 37, 38]] @ np.array([.2206, .1456, .1789])
+    return (
+        .0318 * xmeas[..., 18] + .0536 * xmeas[..., 19]
+        + .44791 * xmeas[..., 9] * purge
+        + product * 4.541 * xmv[..., 7]
+    )
+
+
+class MultiLoopController:
+    """Multiloop controller for a batch of ``n`` plants, sampled every ``ts`` hours.
+
+    Parameters
+    ----------
+    n : int, optional
+        Number of plants, by default 1
+    xmv_0 : np.array, optional
+        Initial manipulated variables (12,), by default the mode 1 values
+    controller_init : np.array, optional
+        Initial outputs of the supervisory loops (8,), by default the mode 1 values
+    integrator_init : np.array, optional
+        Initial error states of the modified Discrete PI loops (17,), by default the mode 1 values
+    ts : float, optional
+        Sample time in hours, by default Ts_base
+    """
+
+    def __init__(self, n=1, xmv_0=None, controller_init=None, integrator_init=None, ts=TS_BASE):
+        self.n = n
+        self.ts = ts
+        self._xmv_0 = XMV_0 if xmv_0 is None else np.asarray(xmv_0, dtype=float)
+        self._controller_init = CONTROLLER_INIT if controller_init is None else np.asarray(controller_init, dtype=float)
+        self._integrator_init = INTEGRATOR_INIT if integrator_init is None else np.asarray(integrator_init, dtype=float)
+        self._trim_every = int(round(_TS_TRIM / ts))
+        self.reset()
+
+    def reset(self):
+        """Resets all unit delays and rate limiters to their initial conditions"""
+        n = self.n
+        self._u = np.tile(_initial_outputs(self._xmv_0, self._controller_init), (n, 1))
+        self._e = np.tile(_initial_errors(self._integrator_init), (n, 1))
+        self._e_trim = np.zeros((n, 2))
+        self._r1 = np.full(n, self._controller_init[3])
+        self._r4 = np.full(n, self._controller_init[4])
+        self._ticks = 0
+        self.production_sp = None
+        self.pct_g_sp = None
+
+    def _rate_limit(self, u, y, rate):
+        if y is None:
+            return u.copy()
+        return np.clip(u, y - rate * self.ts, y + rate * self.ts)
+
+    def step(self, xmeas, sp):
+        """Advances all controllers by one sample
+
+        Parameters
+        ----------
+        xmeas : np.array
+            Process measurements (n, 41)
+        sp : np.array
+            Outputs of the setpoint blocks (n, 12), ordered as ``SP_BLOCK_NAMES``
+
+        Returns
+        -------
+        np.array
+            Manipulated variables (n, 12)
+        """
+        self.production_sp = self._rate_limit(sp[:, 0], self.production_sp, _RATE_PRODUCTION)
+        self.pct_g_sp = self._rate_limit(sp[:, 5], self.pct_g_sp, _RATE_PCT_G)
+
+        if self._ticks % self._trim_every == 0:
+            y_a = 100 * xmeas[:, 22] / (xmeas[:, 22] + xmeas[:, 24])
+            y_ac = xmeas[:, 22] + xmeas[:, 24]
+            e = np.stack([sp[:, 6] - y_a, sp[:, 7] - y_ac], axis=1)
+            delta = _KC_TRIM * (e + _TS_TRIM / _TI_TRIM * e - self._e_trim)
+            self._e_trim = e
+            self._r1 = self._r1 + delta[:, 0]
+            self._r4 = self._r4 - delta[:, 0] + delta[:, 1]
+        self._ticks += 1
+
+        u = self._u
+        fp = 100 / 22.89 * self.production_sp + u[:, 9]
+        e_adj = u[:, 11]
+        r2 = np.polyval([1.5192e-3, 5.9446e-1, 2.7690e-1], self.pct_g_sp) - 32 * e_adj / fp
+        r3 = np.polyval([-1.1377e-3, -8.0893e-1, 9.1060e+1], self.pct_g_sp) + 46 * e_adj / fp
+
+        setpoint = np.stack([
+            r2 * fp, r3 * fp, self._r1 * fp, self._r4 * fp, u[:, 12] * fp, u[:, 13] * fp, u[:, 14] * fp,
+            sp[:, 8], u[:, 10], self.production_sp, sp[:, 3], self.pct_g_sp, sp[:, 4], sp[:, 2], sp[:, 1],
+        ], axis=1)
+        e = setpoint - xmeas[:, _MEAS]
+
+        xmv = np.empty((self.n, 12))
+        xmv[:, _XMV_LOOPS] = u[:, :9]
+        xmv[:, 4] = np.clip(sp[:, 9] + np.minimum(-2 * (u[:, 8] - 90), 0), 0, 100)
+        xmv[:, 8] = sp[:, 10]
+        xmv[:, 11] = sp[:, 11]
+
+        self._u = np.clip(u + _KC * (e + self.ts / _TI * e - self._e), _LO, _HI)
+        self._e = e
+        return xmv
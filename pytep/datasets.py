@@ -0,0 +1,256 @@
+"""Generation of fault detection datasets: every idv at several magnitudes and onset times, across random seeds, run
+in parallel on an :class:`~pytep.enginepool.EnginePool`.
+
+Every run is written to its own run archive (see :mod:`pytep.runarchive`) in ``<output_dir>/runs/<run_id>``. The file
+``<output_dir>/manifest.json`` lists all runs of the campaign and is updated when a run is finished, so an interrupted
+campaign continues with the missing runs when it is started again.
+
+Command line usage::
+
+    python -m pytep.datasets tep_dataset --idv 1-28 --magnitudes 0.5 1 --onsets 8 --seeds 20 --duration 48
+"""
+import argparse
+import itertools
+import json
+import os
+import pathlib
+import pickle
+import sys
+import time
+
+from pytep.enginepool import EnginePool, apply_scenario
+from pytep.runarchive import RunArchive, RunArchiveWriter
+from pytep.utils.seeds import derive_seeds
+
+MANIFEST_VERSION = 1
+_HISTORY_LABEL_FILES = [
+    ("process_data", "process_var_labels.pkl"),
+    ("manipulated_variables", "xmv_labels.pkl"),
+    ("setpoint_data", "setpoint_labels.pkl"),
+    ("cost_data", None),
+    ("idv_data", "idv_labels.pkl"),
+]
+
+
+def fault_campaign(idvs=range(1, 29), magnitudes=(1.,), onsets=(1.,), seeds=range(1, 11), duration=48.,
+                   include_normal=True):
+    """Lists the runs of a fault campaign: every combination of idv, magnitude, onset time and seed.
+
+    Parameters
+    ----------
+    idvs : iterable, optional
+        Indices of the idvs (1-28), by default all
+    magnitudes : iterable, optional
+        Values of the idv after the onset, between 0 and 1, by default (1.,)
+    onsets : iterable, optional
+        Onset times of the fault in hours, by default (1.,)
+    seeds : iterable, optional
+        Seeds of the random number generators, by default 1 to 10. Every fault is simulated with the same seeds.
+        :func:`pytep.utils.seeds.derive_seeds` derives independent seeds from one master seed.
+    duration : float, optional
+        Simulated time of every run in hours, by default 48
+    include_normal : bool, optional
+        Add one fault-free run (idv 0) per seed, by default True
+
+    Returns
+    -------
+    list
+        Runs as dicts with the keys 'run_id', 'idv', 'magnitude', 'onset', 'seed' and 'duration'
+    """
+    runs = []
+    for seed in seeds:
+        if include_normal:
+            runs.append(_run(0, 0., 0., seed, duration))
+        for idv, magnitude, onset in itertools.product(idvs, magnitudes, onsets):
+            runs.append(_run(idv, magnitude, onset, seed, duration))
+    return runs
+
+
+def _run(idv, magnitude, onset, seed, duration):
+    if idv == 0:
+        run_id = "normal_seed{}".format(seed)
+    else:
+        run_id = "idv{:02d}_mag{:g}_onset{:g}_seed{}".format(idv, magnitude, onset, seed)
+    return {"run_id": run_id, "idv": int(idv), "magnitude": float(magnitude), "onset": float(onset),
+            "seed": float(seed), "duration": float(duration)}
+
+
+def history_groups():
+    """Column labels of the logged data by history, in the column order of bridge.fetch_since"""
+    setupinfo_path = pathlib.Path(__file__).parent / "setupinfo"
+    groups = dict()
+    for group, label_file in _HISTORY_LABEL_FILES:
+        if label_file is None:
+            groups[group] = ["cost"]
+            continue
+        with open(setupinfo_path / label_file, "rb") as labels:
+            groups[group] = list(pickle.load(labels))
+    return groups
+
+
+def simulate_run(bridge, job):
+    """Job of the pool workers: simulates one run on a reset bridge and writes it to its run archive.
+
+    Parameters
+    ----------
+    bridge : MatlabBridge or NumpyBridge
+    job : dict
+        Run as returned by :func:`fault_campaign`, with the additional keys 'path' (directory of the run archive) and
+        'file_format'
+
+    Returns
+    -------
+    dict
+        'rows' (number of logged rows) and 'wall_time' (seconds)
+    """
+    start = time.perf_counter()
+    scenario = {"duration": job["duration"], "seed": job["seed"]}
+    if job["idv"]:
+        scenario["idv"] = {job["idv"]: (job["magnitude"], job["onset"])}
+    apply_scenario(bridge, scenario)
+    bridge.set_simpause_time(job["duration"])
+    bridge.run_until_paused()
+    data, _ = bridge.fetch_since(0)
+    metadata = {key: job[key] for key in ["run_id", "idv", "magnitude", "onset", "seed", "duration"]}
+    with RunArchiveWriter(job["path"], history_groups(), metadata=metadata, file_format=job["file_format"]) as writer:
+        writer.append(data)
+    return {"rows": int(data.shape[0]), "wall_time": time.perf_counter() - start}
+
+
+def load_manifest(output_dir):
+    """Reads the manifest of a campaign, an empty manifest if there is none yet"""
+    manifest_path = pathlib.Path(output_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return {"version": MANIFEST_VERSION, "runs": dict()}
+    with open(manifest_path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def _write_manifest(output_dir, manifest):
+    manifest_path = pathlib.Path(output_dir) / "manifest.json"
+    tmp_path = manifest_path.with_name("manifest.json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, manifest_path)
+
+
+def load_run(output_dir, run_id):
+    """Opens the run archive of a finished run
+
+    Returns
+    -------
+    RunArchive
+    """
+    return RunArchive(pathlib.Path(output_dir) / "runs" / run_id)
+
+
+def generate_dataset(output_dir, runs, workers=None, backend="matlab", bridge_kwargs=None, file_format="npz",
+                     report=print):
+    """Simulates all runs that are not finished yet in parallel and writes them to output_dir.
+
+    Parameters
+    ----------
+    output_dir : string or pathlib.Path
+        Directory of the dataset
+    runs : list
+        Runs as returned by :func:`fault_campaign`
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs
+    backend : string, optional
+        'matlab', 'numpy' or 'fake' (see :func:`~pytep.siminterface.make_bridge`), by default 'matlab'
+    bridge_kwargs : dict, optional
+        Keyword arguments for the bridges of the workers
+    file_format : string, optional
+        Format of the run archives, 'npz' or 'parquet', by default 'npz'
+    report : callable, optional
+        Called with a progress message after every run, by default print. None disables the reports.
+
+    Returns
+    -------
+    dict
+        The manifest, with the status ('done' or 'failed'), number of rows and wall time of every run
+    """
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    for run in runs:
+        entry = manifest["runs"].setdefault(run["run_id"], dict(run, status="pending"))
+        if entry["status"] == "failed":
+            entry["status"] = "pending"
+    _write_manifest(output_dir, manifest)
+    pending = [run for run in runs if manifest["runs"][run["run_id"]]["status"] != "done"]
+    jobs = [dict(run, path=str(output_dir / "runs" / run["run_id"]), file_format=file_format) for run in pending]
+    if report is not None:
+        report("{} of {} runs already done, simulating {} runs".format(len(runs) - len(jobs), len(runs), len(jobs)))
+    if not jobs:
+        return manifest
+
+    start = time.perf_counter()
+    progress = {"finished": 0, "sim_hours": 0.}
+
+    def on_result(job_idx, result):
+        job = jobs[job_idx]
+        entry = manifest["runs"][job["run_id"]]
+        progress["finished"] += 1
+        if isinstance(result, Exception):
+            entry.update(status="failed", error=str(result))
+        else:
+            entry.update(status="done", **result)
+            progress["sim_hours"] += job["duration"]
+        _write_manifest(output_dir, manifest)
+        if report is not None:
+            elapsed = time.perf_counter() - start
+            report("[{:>{width}}/{}] {:<36} {:<6} {:8.1f} sim h/s".format(
+                progress["finished"], len(jobs), job["run_id"], entry["status"], progress["sim_hours"] / elapsed,
+                width=len(str(len(jobs)))))
+
+    with EnginePool(workers=workers, backend=backend, bridge_kwargs=bridge_kwargs) as pool:
+        pool.map(jobs, func=simulate_run, raise_errors=False, callback=on_result)
+    return manifest
+
+
+def _parse_idvs(spec):
+    idvs = []
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            idvs.extend(range(int(first), int(last) + 1))
+        else:
+            idvs.append(int(part))
+    return idvs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pytep.datasets", description=__doc__.split("\n\n")[0])
+    parser.add_argument("output_dir", help="directory of the dataset, an existing campaign is resumed")
+    parser.add_argument("--idv", default="1-28", help="idvs, e.g. '1-28' or '1,4,6-8' (default: 1-28)")
+    parser.add_argument("--magnitudes", type=float, nargs="+", default=[1.], help="idv values after the onset")
+    parser.add_argument("--onsets", type=float, nargs="+", default=[1.], help="onset times in hours")
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds per fault (default: 10)")
+    parser.add_argument("--first-seed", type=int, default=1, help="first seed (default: 1)")
+    parser.add_argument("--master-seed", type=int, default=None,
+                        help="derive the seeds from this master seed instead of counting from --first-seed")
+    parser.add_argument("--duration", type=float, default=48., help="simulated hours per run (default: 48)")
+    parser.add_argument("--no-normal", action="store_true", help="do not add fault-free runs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--backend", choices=["matlab", "numpy"], default="matlab")
+    parser.add_argument("--format", choices=["npz", "parquet"], default="npz", dest="file_format")
+    args = parser.parse_args(argv)
+
+    if args.master_seed is None:
+        seeds = range(args.first_seed, args.first_seed + args.seeds)
+    else:
+        seeds = derive_seeds(args.master_seed, args.seeds)
+    runs = fault_campaign(idvs=_parse_idvs(args.idv), magnitudes=args.magnitudes, onsets=args.onsets,
+                          seeds=seeds, duration=args.duration,
+                          include_normal=not args.no_normal)
+    manifest = generate_dataset(args.output_dir, runs, workers=args.workers, backend=args.backend,
+                                file_format=args.file_format)
+    failed = [run_id for run_id, entry in manifest["runs"].items() if entry["status"] == "failed"]
+    if failed:
+        print("{} runs failed: {}".format(len(failed), ", ".join(failed)), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""Pool of worker processes that each own a simulation engine and bridge, for running independent scenarios in
+parallel."""
+import multiprocessing
+import multiprocessing.connection
+import os
+import traceback
+
+import numpy as np
+
+from pytep.siminterface import make_bridge
+from pytep.utils.seeds import derive_seed
+
+SP_SETTERS = {
+    "ProductionSP": "set_production_sp",
+    "StripLevelSP": "set_strip_level_sp",
+    "SepLevelSP": "set_sep_level_sp",
+    "ReactorLevelSP": "set_reactor_level_sp",
+    "ReactorPressSP": "set_reactor_press_sp",
+    "MolePctGSP": "set_g_in_product_sp",
+    "YASP": "set_ya_sp",
+    "YACSP": "set_yac_sp",
+    "ReactorTempSP": "set_reactor_temp_sp",
+    "RecycleValvePosSP": "set_recycle_valve_sp",
+    "SteamValvePosSP": "set_steam_valve_sp",
+    "AgitatorSpeedSP": "set_agitator_sp",
+}
+
+RESULT_VARIABLES = ["tout", "simout", "xmv", "setpoints", "idv_list", "OpCost"]
+
+
+class WorkerError(RuntimeError):
+    """Raised for a scenario that failed inside a worker. Carries the formatted traceback of the worker."""
+
+
+def reset_bridge(bridge):
+    """Returns a bridge to its initial state without restarting the engine, by restoring the cached initial workspace
+    and the changed blocks (see SimInterface.reset)"""
+    bridge.stop_simulation()
+    bridge.restore_initial_state()
+
+
+def run_scenario(bridge, scenario):
+    """Default job of the pool: applies a scenario to a freshly reset bridge and simulates it.
+
+    Parameters
+    ----------
+    bridge : MatlabBridge or NumpyBridge
+        Bridge owned by the worker
+    scenario : dict
+        'duration': simulated time in hours (required).
+        'seed': seed of the random number generators (optional).
+        'setpoints': dict mapping setpoint labels (e.g. 'ProductionSP') to dicts with the keyword arguments 'before',
+        'after', 'duration' and 'start_time' of the setpoint block (optional).
+        'idv': dict mapping idv indices (1-28) to (value, start_time) tuples (optional).
+
+    Returns
+    -------
+    dict
+        np.arrays of the workspace variables tout, simout, xmv, setpoints, idv_list and OpCost
+    """
+    apply_scenario(bridge, scenario)
+    bridge.set_simpause_time(scenario["duration"])
+    bridge.run_until_paused()
+    return {name: np.asarray(bridge.get_workspace_variable(name), dtype=float) for name in RESULT_VARIABLES}
+
+
+def apply_scenario(bridge, scenario):
+    """Sets the seed, setpoint blocks and idv block of a reset bridge for a scenario in the format of
+    :func:`run_scenario`"""
+    if "seed" in scenario:
+        bridge.set_workspace_variable("seed", float(scenario["seed"]))
+    for label, params in scenario.get("setpoints", dict()).items():
+        params = dict(params)
+        params.setdefault("start_time", 0.)
+        getattr(bridge, SP_SETTERS[label])(**params)
+    if scenario.get("idv"):
+        values_before, values_after, step_times = bridge.get_idv_input_block_params()
+        for idv_idx, (value, start_time) in scenario["idv"].items():
+            values_after[0, idv_idx - 1] = value
+            step_times[0, idv_idx - 1] = start_time
+        bridge.set_idv_input_block_params(values_before, values_after, step_times)
+
+
+def _engine_alive(bridge):
+    try:
+        bridge.get_sim_status()
+        return True
+    except Exception:
+        return False
+
+
+def _worker_main(conn, backend, bridge_kwargs):
+    """Entry point of a worker process. Jobs are (job_id, func, scenario) tuples, None shuts the worker down."""
+    bridge = make_bridge(backend, **bridge_kwargs)
+    conn.send(("ready", None, None))
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        job_id, func, scenario = job
+        try:
+            reset_bridge(bridge)
+            result = func(bridge, scenario)
+        except Exception:
+            alive = _engine_alive(bridge)
+            conn.send(("error", job_id, (traceback.format_exc(), alive)))
+            if not alive:
+                break
+        else:
+            conn.send(("done", job_id, result))
+    try:
+        bridge.stop_engine()
+    except Exception:
+        pass
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, context, backend, bridge_kwargs):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, backend, bridge_kwargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.job = None
+
+    def stop(self, timeout=5):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class EnginePool:
+    """Runs independent scenarios in parallel, in worker processes that each own their own engine and bridge.
+
+    Engines are started once per worker and recycled between jobs with a reset: the simulation is stopped, the
+    workspace is restored from the copy of the initialized workspace that the bridge keeps since its first reset, and
+    only the setpoint and idv blocks that the previous job changed are reset (see
+    :func:`~pytep.matlab_bridge.MatlabBridge.restore_initial_state`). A full reload of the workspace, as with
+    SimInterface.reset(reload=True), is only needed by job functions that change blocks directly in MATLAB instead of
+    through the bridge, or after the initialization files changed on disk. Such jobs should call the bridge's
+    reset_workspace() and reset_simulink_blocks() themselves. A worker whose engine or process dies is replaced
+    transparently and its job is retried on the new worker.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs
+    backend : string, optional
+        'matlab', 'numpy' or 'fake' (see :func:`~pytep.siminterface.make_bridge`), by default 'matlab'
+    max_retries : int, optional
+        Number of times a job is retried after its worker died, by default 1
+    bridge_kwargs : dict, optional
+        Keyword arguments for the bridge constructor (e.g. model and sim_path)
+
+    Examples
+    --------
+    >>> with EnginePool(workers=4) as pool:
+    ...     results = pool.map([{"duration": 10, "seed": seed} for seed in range(100)])
+    """
+
+    def __init__(self, workers=None, backend="matlab", max_retries=1, bridge_kwargs=None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.backend = backend
+        self.max_retries = max_retries
+        self._bridge_kwargs = dict() if bridge_kwargs is None else dict(bridge_kwargs)
+        # MATLAB engines do not survive a fork, so workers are always spawned
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [self._start_worker() for _ in range(self.workers)]
+        self.replaced_workers = 0
+        self._generation = 0
+
+    def _start_worker(self):
+        return _Worker(self._context, self.backend, self._bridge_kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Shuts down all workers and their engines"""
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def map(self, scenarios, func=run_scenario, raise_errors=True, callback=None, master_seed=None):
+        """Runs all scenarios on the pool and returns their results in order.
+
+        Parameters
+        ----------
+        scenarios : iterable
+            Scenarios passed to ``func``, see :func:`run_scenario` for the default format
+        func : callable, optional
+            Picklable (module level) function func(bridge, scenario) that runs one scenario on a reset bridge, by
+            default :func:`run_scenario`
+        raise_errors : bool, optional
+            Raise a WorkerError for the first failed scenario. Otherwise the WorkerError is returned in place of the
+            result. By default True.
+        callback : callable, optional
+            Called with (index, result) in the parent process as soon as a scenario is finished or has failed
+        master_seed : int, optional
+            Scenarios (dicts) without a 'seed' get the seed derive_seed(master_seed, index), so the results do not
+            depend on the number of workers or the scheduling order
+
+        Returns
+        -------
+        list
+            Results of ``func`` in the order of ``scenarios``
+        """
+        scenarios = list(scenarios)
+        if master_seed is not None:
+            scenarios = [dict(scenario, seed=scenario.get("seed", derive_seed(master_seed, idx)))
+                         for idx, scenario in enumerate(scenarios)]
+        self._generation += 1
+        generation = self._generation
+        results = [None] * len(scenarios)
+        attempts = [0] * len(scenarios)
+        pending = list(reversed(range(len(scenarios))))
+        remaining = len(scenarios)
+        while remaining > 0:
+            for worker in self._workers:
+                if worker.ready and worker.job is None and pending:
+                    job_id = pending.pop()
+                    worker.job = (generation, job_id)
+                    worker.conn.send((worker.job, func, scenarios[job_id]))
+            ready = multiprocessing.connection.wait(
+                [w.conn for w in self._workers] + [w.process.sentinel for w in self._workers]
+            )
+            for idx, worker in enumerate(list(self._workers)):
+                if worker.conn not in ready and worker.process.sentinel not in ready:
+                    continue
+                try:
+                    kind, job, payload = worker.conn.recv()
+                except (EOFError, OSError):
+                    # the worker process died, possibly while running a job
+                    kind, job, payload = "died", worker.job, ("Worker process died.", False)
+                if kind == "ready":
+                    worker.ready = True
+                    continue
+                if kind == "died" and not worker.ready:
+                    raise RuntimeError("Worker process died while starting its engine.")
+                worker.job = None
+                if job is None or job[0] != generation:
+                    # worker is gone without a job, or a result of an earlier, aborted call
+                    if kind == "died":
+                        self._replace_worker(idx)
+                    continue
+                job_id = job[1]
+                if kind == "done":
+                    results[job_id] = payload
+                    remaining -= 1
+                    if callback is not None:
+                        callback(job_id, payload)
+                    continue
+                error, alive = payload
+                if not alive:
+                    self._replace_worker(idx)
+                    attempts[job_id] += 1
+                    if attempts[job_id] <= self.max_retries:
+                        pending.append(job_id)
+                        continue
+                results[job_id] = WorkerError(error)
+                remaining -= 1
+                if raise_errors:
+                    raise results[job_id]
+                if callback is not None:
+                    callback(job_id, results[job_id])
+        return results
+
+    def _replace_worker(self, idx):
+        self._workers[idx].stop(timeout=1)
+        self._workers[idx] = self._start_worker()
+        self.replaced_workers += 1
@@ -1,4 +1,12 @@
 """Functions that simplify the interaction with the matlab engine in python"""
+import array
+
+import numpy as np
+
+# conversion paths by matlab.double type, detected at the first conversion: "buffer" for engines whose arrays support
+# the buffer protocol (R2022a and later), "data" for older engines that keep the elements in an array.array attribute
+# '_data' (column-major), "list" if neither is available
+_conversion_paths = dict()
 
 
 def get_workspace(engine):
@@ -51,3 +59,99 @@ def get_variable(engine, var):
         Matrices are returned as np.arrays.
     """
     return engine.workspace[var]
+
+
+class ConvertedFuture:
+    """Wraps a future of a background engine call and converts its result when it is fetched.
+
+    Parameters
+    ----------
+    future : matlab.engine.FutureResult
+        Future returned by an engine call with background=True
+    convert : callable
+        Function applied to the result of the engine call
+    """
+
+    def __init__(self, future, convert):
+        self._future = future
+        self._convert = convert
+
+    def done(self):
+        return self._future.done()
+
+    def cancel(self):
+        return self._future.cancel()
+
+    def result(self, timeout=None):
+        return self._convert(self._future.result(timeout))
+
+
+def _detect_conversion_path(matlab_double):
+    path = _conversion_paths.get(matlab_double)
+    if path is None:
+        probe = matlab_double([[1.0, 2.0]])
+        try:
+            memoryview(probe)
+            path = "buffer"
+        except TypeError:
+            path = "data" if isinstance(getattr(probe, "_data", None), array.array) else "list"
+        _conversion_paths[matlab_double] = path
+    return path
+
+
+def to_numpy(value):
+    """Converts a matlab.double to a float np.array of the same shape without converting the elements one by one.
+
+    The array shares the memory of the matlab.double where the engine allows it.
+
+    Parameters
+    ----------
+    value : matlab.double
+        Other values are passed to np.asarray
+
+    Returns
+    -------
+    np.array
+    """
+    if not isinstance(getattr(value, "size", None), tuple):
+        return np.asarray(value, dtype=float)
+    path = _detect_conversion_path(type(value))
+    shape = value.size
+    if path == "buffer":
+        result = np.asarray(memoryview(value), dtype=float)
+        if result.shape == shape:
+            return result
+        return result.reshape(shape, order="F")
+    if path == "data":
+        return np.frombuffer(value._data, dtype=float).reshape(shape, order="F")
+    return np.asarray(value, dtype=float)
+
+
+def to_matlab_double(value, matlab_double):
+    """Converts an array to a matlab.double with a single copy of the data buffer.
+
+    Scalars and 1d arrays become row vectors, like matlab.double(value.tolist()).
+
+    Parameters
+    ----------
+    value : array_like
+    matlab_double : type
+        matlab.double of the imported matlab package
+
+    Returns
+    -------
+    matlab.double
+    """
+    value = np.asarray(value, dtype=float)
+    if value.ndim < 2:
+        value = value.reshape(1, -1)
+    path = _detect_conversion_path(matlab_double)
+    if path == "buffer":
+        return matlab_double(np.ascontiguousarray(value))
+    if path == "data":
+        result = matlab_double(size=value.shape)
+        data = array.array("d")
+        data.frombytes(value.tobytes(order="F"))
+        result._data = data
+        return result
+    return matlab_double(value.tolist())
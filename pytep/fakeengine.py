@@ -0,0 +1,634 @@
+"""In-process stand-in for the MATLAB engine that implements the functions of the simcommands directory.
+
+A :class:`FakeEngine` produces synthetic, correctly shaped time series instead of simulating the process, at a
+configurable speed. Plugged into a :class:`~pytep.matlab_bridge.MatlabBridge`, it exercises all the Python-side code
+of the MATLAB backend (engine calls, matlab.double conversions, updates of the histories, saving) without a MATLAB
+installation, for tests and benchmarks::
+
+    bridge = MatlabBridge(engine=FakeEngine(sim_speed=500))
+    sim = SimInterface.setup(backend="fake")
+
+The setpoint and IDVInput blocks are evaluated like in the model, so the logged setpoints and idvs follow the
+commands. The process variables, manipulated variables and operating cost are sinusoids around the mode 1 values,
+shifted by active idvs, with phases that depend on the seed.
+"""
+import array
+import collections
+import concurrent.futures
+import functools
+import pickle
+import re
+import threading
+import time
+import types
+
+import numpy as np
+
+from pytep.controllers import SP_BLOCK_NAMES
+import pytep.engineutils as engineutils
+import pytep.mode_one as mode_one
+from pytep.numpy_bridge import initial_workspace
+
+N_PV = 41
+N_XMV = 12
+N_IDV = 28
+# columns of the logged data: tout simout xmv setpoints OpCost idv_list
+_LOG_VARIABLES = [("tout", 0, 1), ("simout", 1, 42), ("xmv", 42, 54), ("setpoints", 54, 66), ("OpCost", 66, 67),
+                  ("idv_list", 67, 95)]
+_LOG_NAMES = [name for name, _, _ in _LOG_VARIABLES]
+N_LOG_COLUMNS = 95
+
+
+class MatlabExecutionError(Exception):
+    """Error of a call into the fake engine, the counterpart of matlab.engine.MatlabExecutionError"""
+
+
+class EngineError(Exception):
+    """Error of the fake engine itself, the counterpart of matlab.engine.EngineError"""
+
+
+class double:
+    """Minimal matlab.double of the engines before R2022a: a matrix of floats with the shape ``size`` and the elements
+    in column-major order in the array.array ``_data``.
+
+    Parameters
+    ----------
+    initializer : array_like, optional
+        Nested lists (rows) or a flat list (row vector)
+    size : tuple, optional
+        Shape of a zero matrix, used without initializer
+    """
+
+    def __init__(self, initializer=None, size=None):
+        if initializer is not None:
+            values = np.asarray(initializer, dtype=float)
+            if values.ndim < 2:
+                values = values.reshape(1, -1)
+        else:
+            values = np.zeros((1, 0) if size is None else tuple(size))
+        self._size = tuple(int(n) for n in values.shape)
+        self._data = array.array("d")
+        self._data.frombytes(values.tobytes(order="F"))
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return self._size[0]
+
+    def __getitem__(self, row):
+        if not 0 <= row < self._size[0]:
+            raise IndexError("index out of range")
+        return [self._data[row + self._size[0] * col] for col in range(self._size[1])]
+
+    def __repr__(self):
+        return "fake matlab.double({})".format(engineutils.to_numpy(self).tolist())
+
+
+def _start_matlab(*args, **kwargs):
+    return FakeEngine()
+
+
+# the parts of the matlab package that MatlabBridge uses
+matlab = types.SimpleNamespace(
+    double=double,
+    engine=types.SimpleNamespace(MatlabExecutionError=MatlabExecutionError, EngineError=EngineError,
+                                 start_matlab=_start_matlab, connect_matlab=_start_matlab),
+)
+
+
+def _to_matlab(value):
+    """Workspace value as the engine returns it: floats for scalars, matlab.double for arrays, other values as they
+    are"""
+    if isinstance(value, np.ndarray) and value.dtype.kind in "biuf":
+        if value.size == 1:
+            return float(value.ravel()[0])
+        return engineutils.to_matlab_double(value, double)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def _from_matlab(value):
+    if isinstance(value, double):
+        return engineutils.to_numpy(value).copy()
+    if isinstance(value, (bool, int, float, np.number)):
+        return np.float64(value)
+    return value
+
+
+def _copy_variables(variables):
+    return {name: value.copy() if isinstance(value, np.ndarray) else value for name, value in variables.items()}
+
+
+def _engine_function(func):
+    """Adds the calling convention of engine functions: nargout (0 returns None) and background (returns a
+    concurrent.futures.Future). Counts the calls in FakeEngine.calls."""
+
+    @functools.wraps(func)
+    def call(self, *args, nargout=1, background=False):
+        self.calls[func.__name__] += 1
+        if self.call_latency:
+            time.sleep(self.call_latency)
+        if background:
+            return self._submit(run, self, *args, nargout=nargout)
+        return run(self, *args, nargout=nargout)
+
+    def run(self, *args, nargout=1):
+        result = func(self, *args)
+        return None if nargout == 0 else result
+
+    return call
+
+
+@functools.lru_cache(maxsize=1)
+def _pv_baseline():
+    # measurements of the plant at the mode 1 steady state
+    from pytep.temodel import TEProcess
+    process = TEProcess(1, x0=mode_one.X_INITIAL)
+    process._evaluate(0., process.x)
+    return process.outputs()[0][0].copy()
+
+
+class _Workspace:
+    """Mapping interface of engine.workspace"""
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def __getitem__(self, name):
+        self._engine.calls["workspace.get"] += 1
+        return _to_matlab(self._engine._get_variable(name))
+
+    def __setitem__(self, name, value):
+        self._engine.calls["workspace.set"] += 1
+        self._engine._set_variable(name, _from_matlab(value))
+
+    def __contains__(self, name):
+        return self._engine._has_variable(name)
+
+
+class FakeEngine:
+    """Fake MATLAB engine with a loaded MultiLoop_mode3 model.
+
+    Like in MATLAB, a started or continued simulation runs in the background (on a worker thread of the engine) until
+    it reaches the pause time, while engine calls return immediately. Calls with background=True run on the same
+    thread, in order, and return a concurrent.futures.Future.
+
+    Parameters
+    ----------
+    sim_speed : float, optional
+        Simulated hours per second of wall time, by default None (as fast as possible)
+    call_latency : float, optional
+        Seconds added to every engine call, to model the round trip to a MATLAB process, by default 0
+
+    Attributes
+    ----------
+    calls : collections.Counter
+        Number of calls by engine function, workspace reads and writes are counted as 'workspace.get' and
+        'workspace.set'
+    """
+
+    matlab = matlab
+    STOP_TIME = 1000.
+    # simulated hours per step of the background simulation, the simulation checks for pause and stop requests
+    # between the steps
+    STEP_HOURS = 1.
+
+    def __init__(self, sim_speed=None, call_latency=0.):
+        self.sim_speed = sim_speed
+        self.call_latency = call_latency
+        self.calls = collections.Counter()
+        self.workspace = _Workspace(self)
+        self._lock = threading.RLock()
+        self._executor = None
+        self._sim_future = None
+        self._variables = dict()
+        self._log = None
+        self._n_log_rows = 0
+        self._models = set()
+        self._params = dict()
+        self._sp_blocks = {name: [0., 0., 0., 0.] for name in SP_BLOCK_NAMES}
+        self._idv_block = {"Before": np.zeros(N_IDV), "After": np.zeros(N_IDV), "Time": np.zeros(N_IDV)}
+        self._simpause_time = self.STOP_TIME
+        self._status = "stopped"
+        self._time = 0.
+        self._interrupt = None
+        self._snapshots = dict()
+        self._last_snapshot_key = 0.
+        self._initial_state = None
+        self._initial_workspace = None
+
+    def _submit(self, func, *args, **kwargs):
+        # one worker thread runs the simulation and the background calls in order
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        return self._executor.submit(func, *args, **kwargs)
+
+    # workspace
+
+    def _has_variable(self, name):
+        return name in self._variables or (self._log is not None and name in _LOG_NAMES)
+
+    def _get_variable(self, name):
+        with self._lock:
+            for var, start, stop in _LOG_VARIABLES:
+                if var == name and self._log is not None:
+                    return self._log_matrix()[:, start:stop]
+            if name not in self._variables:
+                raise MatlabExecutionError("Undefined function or variable '{}'.".format(name))
+            return self._variables[name]
+
+    def _set_variable(self, name, value):
+        with self._lock:
+            if self._log is not None and name in _LOG_NAMES:
+                # logged data that is overwritten becomes an ordinary workspace variable
+                matrix = self._log_matrix()
+                for var, start, stop in _LOG_VARIABLES:
+                    self._variables[var] = matrix[:, start:stop].copy()
+                self._log = None
+            self._variables[name] = value
+
+    def _log_matrix(self):
+        """Logged data as one matrix [tout simout xmv setpoints OpCost idv_list]"""
+        if self._log is not None:
+            if len(self._log) > 1:
+                self._log[:] = [np.concatenate(self._log, axis=0)]
+            return self._log[0]
+        ws = self._variables
+        columns = [ws.get(var, np.zeros((1, stop - start))) for var, start, stop in _LOG_VARIABLES]
+        n_rows = np.reshape(columns[0], (-1, 1)).shape[0]
+        return np.hstack([np.reshape(column, (n_rows, -1)) for column in columns])
+
+    def _n_logged(self):
+        if self._log is not None:
+            return self._n_log_rows
+        return np.reshape(self._variables.get("tout", np.zeros(1)), (-1, 1)).shape[0]
+
+    def _append_log(self, rows):
+        self._log.append(rows)
+        self._n_log_rows += rows.shape[0]
+
+    def _rows_since(self, cursor):
+        if self._log is None:
+            return self._log_matrix()[cursor:]
+        # only the chunks after the cursor are touched, so the cost does not depend on the length of the log
+        rows = []
+        first_row = self._n_log_rows
+        for chunk in reversed(self._log):
+            if first_row <= cursor:
+                break
+            first_row -= chunk.shape[0]
+            rows.append(chunk[max(cursor - first_row, 0):])
+        if not rows:
+            return np.zeros((0, N_LOG_COLUMNS))
+        return np.concatenate(rows[::-1], axis=0)
+
+    @_engine_function
+    def eval(self, expression):
+        match = re.fullmatch(r"exist\('(\w+)', 'var'\)", expression)
+        if match:
+            return float(self._has_variable(match.group(1)))
+        if expression == "clearvars":
+            with self._lock:
+                self._variables.clear()
+                self._log = None
+            return None
+        if expression == "loadSimEnvironment":
+            with self._lock:
+                self._variables.update(initial_workspace())
+            return None
+        if expression == "tout(end)":
+            return float(np.ravel(self._get_variable("tout"))[-1])
+        if expression.startswith("addpath("):
+            return None
+        match = re.fullmatch(r"save\('(.+)'\)", expression)
+        if match:
+            with self._lock:
+                variables = {name: np.asarray(self._get_variable(name))
+                             for name in set(self._variables) | set(_LOG_NAMES) if self._has_variable(name)}
+            np.savez(match.group(1), **{name: value for name, value in variables.items() if value.dtype != object})
+            return None
+        raise MatlabExecutionError("The fake engine cannot evaluate '{}'.".format(expression))
+
+    @_engine_function
+    def capture_initial_workspace(self):
+        with self._lock:
+            self._initial_workspace = _copy_variables(self._variables)
+
+    @_engine_function
+    def restore_initial_workspace(self):
+        if self._initial_workspace is None:
+            raise MatlabExecutionError("capture_initial_workspace has not been called.")
+        with self._lock:
+            self._variables = _copy_variables(self._initial_workspace)
+            self._log = None
+            self._params[("MultiLoop_mode3", "InitialState")] = "xInitial"
+            self._initial_state = None
+
+    @_engine_function
+    def exist(self, name, kind=None):
+        if kind == "var":
+            return float(self._has_variable(name))
+        return 2. if name == "loadSimEnvironment" or hasattr(type(self), name) else 0.
+
+    @_engine_function
+    def quit(self):
+        self._stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # model
+
+    @_engine_function
+    def load_system(self, model):
+        self._models.add(model)
+
+    @_engine_function
+    def bdIsLoaded(self, model):
+        return model in self._models
+
+    @_engine_function
+    def set_param(self, model, name, value):
+        self._params[(model, name)] = value
+        if name == "InitialState" and value == "xInitial":
+            self._initial_state = None
+
+    @_engine_function
+    def get_param(self, model, name):
+        return self._params[(model, name)]
+
+    # blocks
+
+    @_engine_function
+    def init_setpointinput_from_workspace(self):
+        setpoint_init = np.atleast_2d(self._get_variable("setpoint_init"))
+        duration = float(self._get_variable("setpoint_change_duration"))
+        with self._lock:
+            for idx, name in enumerate(SP_BLOCK_NAMES):
+                self._sp_blocks[name] = [float(setpoint_init[0, idx]), float(setpoint_init[1, idx]), duration,
+                                         float(setpoint_init[2, idx])]
+
+    @_engine_function
+    def init_idvinput_from_workspace(self):
+        idv_init = np.atleast_2d(self._get_variable("idv_init"))
+        with self._lock:
+            self._idv_block = {"Before": idv_init[0].copy(), "After": idv_init[1].copy(), "Time": idv_init[2].copy()}
+
+    @_engine_function
+    def set_sp_generic(self, block_name, before, after, duration, start_time):
+        with self._lock:
+            self._sp_blocks[block_name] = [float(before), float(after), float(duration), float(start_time)]
+
+    @_engine_function
+    def get_sp_generic(self, block_name):
+        return tuple(self._sp_blocks[block_name])
+
+    @_engine_function
+    def set_idv_input_block_params(self, values_before, values_after, step_times):
+        with self._lock:
+            self._idv_block = {"Before": engineutils.to_numpy(values_before).ravel().copy(),
+                               "After": engineutils.to_numpy(values_after).ravel().copy(),
+                               "Time": engineutils.to_numpy(step_times).ravel().copy()}
+
+    @_engine_function
+    def get_idv_input_block_params(self):
+        block = self._idv_block
+        return (engineutils.to_matlab_double(block["Before"], double),
+                engineutils.to_matlab_double(block["After"], double),
+                engineutils.to_matlab_double(block["Time"], double))
+
+    @_engine_function
+    def set_idv_step(self, idv_idx, value, step_time):
+        with self._lock:
+            self._idv_block["After"][int(idv_idx) - 1] = value
+            self._idv_block["Time"][int(idv_idx) - 1] = step_time
+
+    @_engine_function
+    def get_block_params(self, block_names):
+        sp_params = [self._sp_blocks[name] for name in block_names]
+        block = self._idv_block
+        return (engineutils.to_matlab_double(np.reshape(sp_params, (-1, 4)), double),
+                engineutils.to_matlab_double(np.vstack([block["Before"], block["After"], block["Time"]]), double))
+
+    @_engine_function
+    def apply_block_changes(self, block_names, sp_params, idv_params):
+        sp_params = engineutils.to_numpy(sp_params).reshape(-1, 4)
+        idv_params = engineutils.to_numpy(idv_params).reshape(-1, N_IDV)
+        with self._lock:
+            for name, params in zip(block_names, sp_params):
+                self._sp_blocks[name] = [float(p) for p in params]
+            if idv_params.shape[0]:
+                self._idv_block = {"Before": idv_params[0].copy(), "After": idv_params[1].copy(),
+                                   "Time": idv_params[2].copy()}
+
+    # simulation control
+
+    @_engine_function
+    def set_simpause_time(self, simpause_time):
+        self._simpause_time = float(simpause_time)
+
+    @_engine_function
+    def get_simulation_status(self):
+        return self._status
+
+    @_engine_function
+    def wait_for_simulation(self, timeout):
+        future = self._sim_future
+        if future is not None:
+            try:
+                future.result(timeout if timeout > 0 else None)
+            except concurrent.futures.TimeoutError:
+                pass
+        return self._status
+
+    @_engine_function
+    def start_simulation(self):
+        self._stop()
+        with self._lock:
+            state = self._initial_state
+            # the block parameters of a restored snapshot were applied by restore_simulation
+            self._time = 0. if state is None else state["time"]
+            ts_save = float(self._get_variable("Ts_save"))
+            # the log starts at the start time, afterwards samples are taken at the multiples of Ts_save
+            self._run = {"ts_save": ts_save, "ts_base": float(self._get_variable("Ts_base")),
+                         "phases": np.random.default_rng(int(self._get_variable("seed"))).uniform(
+                             0., 2 * np.pi, N_PV + N_XMV + 1),
+                         "next_sample": int(np.floor(self._time / ts_save + 1e-9)) + 1}
+            self._log = []
+            self._n_log_rows = 0
+            self._append_log(self._rows(np.array([self._time])))
+        self._resume()
+
+    @_engine_function
+    def continue_simulation(self):
+        if self._status == "paused":
+            self._resume()
+
+    @_engine_function
+    def pause_simulation(self):
+        if self._status == "running":
+            self._interrupt = "paused"
+
+    @_engine_function
+    def stop_simulation(self):
+        self._stop()
+
+    def _resume(self):
+        self._status = "running"
+        self._interrupt = None
+        self._sim_future = self._submit(self._simulate)
+
+    def _stop(self):
+        if self._status == "running":
+            self._interrupt = "stopped"
+            self._sim_future.result()
+        self._status = "stopped"
+
+    def _simulate(self):
+        run = self._run
+        # the model pauses at the end of the first base time step after t_simpause
+        pause_time = (np.floor(self._simpause_time / run["ts_base"] + 1e-9) + 1) * run["ts_base"]
+        end_time = min(max(pause_time, self._time + run["ts_base"]), self.STOP_TIME)
+        while self._time < end_time - 1e-9:
+            if self._interrupt is not None:
+                self._status = self._interrupt
+                return
+            step_start = self._time
+            step_end = min(end_time, step_start + self.STEP_HOURS)
+            started = time.perf_counter()
+            with self._lock:
+                last_sample = int(np.floor(step_end / run["ts_save"] + 1e-9))
+                times = _sample_times(run["ts_save"], np.arange(run["next_sample"], last_sample + 1))
+                if times.size:
+                    self._append_log(self._rows(times))
+                run["next_sample"] = max(run["next_sample"], last_sample + 1)
+                self._time = step_end
+            if self.sim_speed:
+                time.sleep(max(0., (step_end - step_start) / self.sim_speed - (time.perf_counter() - started)))
+        self._status = "paused" if end_time < self.STOP_TIME else "stopped"
+
+    def _rows(self, times):
+        """Synthetic logged rows [tout simout xmv setpoints OpCost idv_list] at the given times"""
+        phases = self._run["phases"]
+        t = times.reshape(-1, 1)
+        idv = np.where(t >= self._idv_block["Time"], self._idv_block["After"], self._idv_block["Before"])
+        setpoints = np.hstack([_block_output(self._sp_blocks[name], t) for name in SP_BLOCK_NAMES])
+        # every idv shifts a few process variables by up to 5 %
+        shift = idv @ _idv_effects()
+        pv = _pv_baseline() * (1. + 0.002 * np.sin(0.7 * t + phases[:N_PV]) + shift)
+        xmv = mode_one.XMV_0 * (1. + 0.005 * np.sin(0.3 * t + phases[N_PV:N_PV + N_XMV]))
+        op_cost = 170. * (1. + 0.02 * np.sin(0.5 * t + phases[-1]) + shift.mean(axis=1, keepdims=True))
+        return np.hstack([t, pv, xmv, setpoints, op_cost, idv])
+
+    # snapshots
+
+    @_engine_function
+    def snapshot_simulation(self):
+        with self._lock:
+            self._last_snapshot_key += 1.
+            key = self._last_snapshot_key
+            self._snapshots[key] = {
+                "time": self._time,
+                "tout": float(np.ravel(self._get_variable("tout"))[-1]),
+                "sp_blocks": {name: list(params) for name, params in self._sp_blocks.items()},
+                "idv_block": {key: values.copy() for key, values in self._idv_block.items()},
+            }
+        return key
+
+    @_engine_function
+    def restore_simulation(self, key):
+        self._stop()
+        state = self._snapshot(key)
+        with self._lock:
+            self._sp_blocks = {name: list(params) for name, params in state["sp_blocks"].items()}
+            self._idv_block = {key: values.copy() for key, values in state["idv_block"].items()}
+            self._initial_state = state
+        # start_simulation logs one row at the snapshot time
+        return 1., state["tout"]
+
+    @_engine_function
+    def export_snapshot(self, key, file_name):
+        with open(file_name, "wb") as snapshot_file:
+            pickle.dump(self._snapshot(key), snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _snapshot(self, key):
+        with self._lock:
+            if float(key) not in self._snapshots:
+                raise MatlabExecutionError("Snapshot {:d} does not exist or was released.".format(int(key)))
+            return self._snapshots[float(key)]
+
+    @_engine_function
+    def release_snapshot(self, key):
+        with self._lock:
+            self._snapshots.pop(float(key), None)
+
+    @_engine_function
+    def clear_snapshots(self):
+        with self._lock:
+            self._snapshots.clear()
+
+    @_engine_function
+    def import_snapshot(self, file_name):
+        with open(file_name, "rb") as snapshot_file:
+            state = pickle.load(snapshot_file)
+        with self._lock:
+            self._last_snapshot_key += 1.
+            key = self._last_snapshot_key
+            self._snapshots[key] = state
+        return key
+
+    # data
+
+    @_engine_function
+    def isolate_recent_data_in_workspace(self):
+        ref_time = float(self._get_variable("t_current"))
+        with self._lock:
+            matrix = self._log_matrix()
+            recent = matrix[matrix[:, 0] > ref_time]
+            for var, start, stop in _LOG_VARIABLES:
+                name = {"tout": "latest_tout", "OpCost": "latest_op_cost"}.get(var, "latest_" + var)
+                self._variables[name] = recent[:, start:stop].copy()
+
+    @_engine_function
+    def fetch_recent_data(self, ref_time):
+        with self._lock:
+            matrix = self._log_matrix()
+            return engineutils.to_matlab_double(matrix[matrix[:, 0] > ref_time], double)
+
+    @_engine_function
+    def fetch_since(self, cursor, columns=None):
+        with self._lock:
+            data = self._rows_since(int(cursor))
+            n_rows = self._n_logged()
+        if columns is not None:
+            columns = engineutils.to_numpy(columns).ravel()
+            if columns.size:
+                data = data[:, columns.astype(int) - 1]
+        return engineutils.to_matlab_double(data, double), float(n_rows)
+
+
+def _sample_times(ts_save, samples):
+    """Times of the samples with the given indices, rounded like the time vector of the Simulink logs (0.6 instead of
+    12 * 0.05 = 0.6000000000000001)"""
+    return np.round(samples * ts_save, 10)
+
+
+def _block_output(params, t):
+    """Output of a setpoint block (step for duration 0, ramp otherwise) at the times t"""
+    before, after, duration, start_time = params
+    if duration <= 0:
+        return np.where(t >= start_time, after, before)
+    # the ramp block of the model ramps over at least 0.1 h
+    return before + (after - before) * np.clip((t - start_time) / max(duration, 0.1), 0., 1.)
+
+
+@functools.lru_cache(maxsize=1)
+def _idv_effects():
+    effects = np.zeros((N_IDV, N_PV))
+    rng = np.random.default_rng(0)
+    for idx in range(N_IDV):
+        effects[idx, rng.choice(N_PV, size=3, replace=False)] = rng.uniform(-.05, .05, size=3)
+    return effects
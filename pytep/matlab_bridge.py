@@ -1,23 +1,84 @@
-import matlab.engine
 import numpy as np
 from pathlib import Path
 import time
 from collections.abc import Iterable
 
 import pytep.engineutils as engineutils
+from pytep.controllers import SP_BLOCK_NAMES
+from pytep.utils.instrumentation import InstrumentedEngine
+
+# the MATLAB engine is imported when the first MatlabBridge is created, so that pytep can be imported without MATLAB
+matlab = None
+
+
+def _import_matlab_engine():
+    global matlab
+    if matlab is None:
+        import matlab.engine
+    return matlab
+
+
+def _engine_errors(matlab_module):
+    """Exception classes of failed engine calls. The errors of the MATLAB engine have no common base class besides
+    Exception."""
+    names = ["MatlabExecutionError", "EngineError", "RejectedExecutionError"]
+    return tuple(getattr(matlab_module.engine, name) for name in names if hasattr(matlab_module.engine, name))
 
 
 class MatlabBridge:
-    def __init__(self, model="MultiLoop_mode3", sim_path=None):
+    """Bridge to the Simulink model through the MATLAB engine for Python.
+
+    By default a new MATLAB engine is started. With ``session``, the bridge connects to a running shared MATLAB
+    session instead (started in MATLAB with ``matlab.engine.shareEngine``), which avoids the startup time of the
+    engine. Setup steps that were already done in that session (simulator on the MATLAB path, model loaded, workspace
+    loaded) are skipped.
+
+    Parameters
+    ----------
+    model : string, optional
+        Name of the Simulink model, by default "MultiLoop_mode3"
+    sim_path : string or pathlib.Path, optional
+        Directory of the simulator files, by default the simulator directory of pytep
+    session : string or bool, optional
+        Name of the shared MATLAB session to connect to, or True for the first shared session that is found, by
+        default None (start a new engine)
+    engine : object, optional
+        Engine object to use instead of a MATLAB engine, e.g. a :class:`~pytep.fakeengine.FakeEngine`. It is set up
+        like a shared session and has to provide the matlab package it belongs to as ``engine.matlab``.
+    """
+
+    def __init__(self, model="MultiLoop_mode3", sim_path=None, session=None, engine=None):
         self._model = model
+        self._save_interval = None
+        self._logged_columns = None
+        self._instrumentation = None
+        self._initial_blocks = None
+        # time of a restored snapshot until the next start, tout(end) is stale until then
+        self._restored_time = None
         self._sim_path = (
             Path(__file__).parent / "simulator" if sim_path is None else sim_path
         )
-        self._eng = matlab.engine.start_matlab()
-        self.add_dir_to_matlab_path(self._sim_path)
-        self._load_simulink()
-        self._load_workspace()
+        self._matlab = _import_matlab_engine() if engine is None else engine.matlab
+        if engine is None and (session is None or session is False):
+            self._eng = self._matlab.engine.start_matlab()
+            self.add_dir_to_matlab_path(self._sim_path)
+            self._load_simulink()
+            self._load_workspace()
+        else:
+            if engine is not None:
+                self._eng = engine
+            else:
+                self._eng = self._matlab.engine.connect_matlab(None if session is True else session)
+            if not self._eng.exist("loadSimEnvironment", "file", nargout=1):
+                self.add_dir_to_matlab_path(self._sim_path)
+            if not self._eng.bdIsLoaded(self._model, nargout=1):
+                self._load_simulink()
+            if not self._eng.eval("exist('xInitial', 'var')", nargout=1):
+                self._load_workspace()
+        # required to snapshot the paused model
+        self._eng.set_param(self._model, "SaveOperatingPoint", "on", nargout=0)
         self._init_setpoint_blocks_from_workspace()
+        self._refresh_block_mirror()
         return
 
     def start_engine(self):
@@ -28,21 +89,48 @@ class MatlabBridge:
         bool
             Returns True when the MATLAB engine is started
         """
-        self._eng = matlab.engine.start_matlab()
+        self._eng = self._matlab.engine.start_matlab()
+        if self._instrumentation is not None:
+            self._eng = InstrumentedEngine(self._eng, self._instrumentation)
         return True
 
+    def set_instrumentation(self, instrumentation):
+        """Records all calls of the engine in an instrumentation, or stops recording
+
+        Parameters
+        ----------
+        instrumentation : pytep.utils.instrumentation.Instrumentation or None
+            Instrumentation that records the calls, None to call the engine directly again
+        """
+        if isinstance(self._eng, InstrumentedEngine):
+            self._eng = self._eng.engine
+        self._instrumentation = instrumentation
+        if instrumentation is not None:
+            self._eng = InstrumentedEngine(self._eng, instrumentation)
+
     def stop_engine(self):
-        """Terminates the running MATLAB engine
+        """Releases all snapshots of the bridge and terminates the running MATLAB engine
         """
+        self.clear_operating_points()
         self._eng.quit()
 
     #  Simulation Commands
 
-    def run_until_paused(self):
+    def run_until_paused(self, timeout=None, background=False):
         """Runs the Simulink Simulation until it is paused or stopped
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum waiting time in seconds, by default no limit
+        background : bool, optional
+            Return a future of the final simulation status instead of blocking, by default False
         """
         self.run_simulation()
-        self.block_until_sim_paused()
+        if background:
+            return self._eng.wait_for_simulation(0. if timeout is None else float(timeout), nargout=1,
+                                                 background=True)
+        self.block_until_sim_paused(timeout)
 
     def run_simulation(self):
         """Runs the Simulink simulation with the appropriate command, given the current state of the Simulink model
@@ -62,21 +150,55 @@ class MatlabBridge:
                 "Unexpected simulation status '{}' encountered.".format(sim_status)
             )
 
-    def block_until_sim_paused(self):
+    def block_until_sim_paused(self, timeout=None):
         """Waits until the Simulink simulation completes the simulation or is paused, and then returns
+
+        The wait runs inside MATLAB (wait_for_simulation.m) in a single blocking engine call, which returns when the
+        simulation reaches t_simpause or stops. If the engine call fails, e.g. because wait_for_simulation is not on
+        the path of a shared MATLAB session, the status is polled with an adaptive backoff instead.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum waiting time in seconds, by default no limit
+
+        Raises
+        ------
+        TimeoutError
+            If the simulation is neither paused nor stopped after timeout seconds
         """
-        while not self.get_sim_status() in ["paused", "stopped"]:
-            time.sleep(0.001)
+        try:
+            status = self._eng.wait_for_simulation(0. if timeout is None else float(timeout), nargout=1)
+        except _engine_errors(self._matlab):
+            status = self._poll_until_sim_paused(timeout)
+        if status not in ["paused", "stopped"]:
+            raise TimeoutError("Simulation is still '{}' after {} s.".format(status, timeout))
+
+    def _poll_until_sim_paused(self, timeout=None, min_interval=0.001, max_interval=0.05):
+        """Polls the simulation status with exponentially growing intervals until the simulation is paused or stopped
+        or the timeout expires. Returns the last status."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = min_interval
+        status = self.get_sim_status()
+        while status not in ["paused", "stopped"]:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+            interval = min(2 * interval, max_interval)
+            status = self.get_sim_status()
+        return status
 
     def start_simulation(self):
         """Send the start command to the active Simulink simulation
         """
         self._eng.start_simulation(nargout=0)
+        self._restored_time = None
 
     def continue_simulation(self):
         """Send the continue command to the active Simulink simulation
         """
         self._eng.continue_simulation(nargout=0)
+        self._restored_time = None
 
     def pause_simulation(self):
         """Send the pause command to the active Simulink simulation
@@ -88,11 +210,84 @@ class MatlabBridge:
         """
         self._eng.stop_simulation(nargout=0)
 
+    #  Snapshots
+
+    def save_operating_point(self):
+        """Captures the operating point of the paused model (plant, controller and integrator states, random number
+        generators) and the parameters of the setpoint and IDV blocks. The snapshot is kept in memory in the MATLAB
+        session.
+
+        Returns
+        -------
+        int
+            Key of the snapshot to pass to :func:`restore_operating_point`
+        """
+        return int(self._eng.snapshot_simulation(nargout=1))
+
+    def restore_operating_point(self, operating_point):
+        """Stops the active simulation and sets up the model to resume from a snapshot at the next start. The same
+        snapshot can be restored any number of times.
+
+        Parameters
+        ----------
+        operating_point : int
+            Key returned by :func:`save_operating_point`
+
+        Returns
+        -------
+        int
+            Number of rows that the logged data in the workspace contains once the simulation is continued, up to
+            and including the operating point. The logs of the restarted simulation begin at the snapshot time.
+        """
+        logged_rows, snapshot_time = self._eng.restore_simulation(float(operating_point), nargout=2)
+        self._restored_time = float(snapshot_time)
+        self._refresh_block_mirror()
+        return int(logged_rows)
+
+    def export_operating_point(self, operating_point, file_name):
+        """Writes a snapshot of the MATLAB session to a .mat file
+
+        Parameters
+        ----------
+        operating_point : int
+            Key returned by :func:`save_operating_point`
+        file_name : string or pathlib.Path
+            Path of the .mat file
+        """
+        self._eng.export_snapshot(float(operating_point), str(file_name), nargout=0)
+
+    def import_operating_point(self, file_name):
+        """Loads a snapshot written by :func:`export_operating_point` into the MATLAB session
+
+        Returns
+        -------
+        int
+            Key of the snapshot to pass to :func:`restore_operating_point`
+        """
+        return int(self._eng.import_snapshot(str(file_name), nargout=1))
+
+    def release_operating_point(self, operating_point):
+        """Removes a snapshot from the MATLAB session. A restored model does not need its snapshot anymore, but the
+        snapshot cannot be restored or exported again afterwards.
+
+        Parameters
+        ----------
+        operating_point : int
+            Key returned by :func:`save_operating_point` or :func:`import_operating_point`
+        """
+        self._eng.release_snapshot(float(operating_point), nargout=0)
+
+    def clear_operating_points(self):
+        """Removes all snapshots from the MATLAB session"""
+        self._eng.clear_snapshots(nargout=0)
+
     #  Initialization and reset
 
     def reset_workspace(self):
-        """Resets the MATLAB workspace to the initial values
+        """Resets the MATLAB workspace to the initial values and releases all snapshots
         """
+        self.clear_operating_points()
+        self._restored_time = None
         self._clear_workspace()
         self._load_workspace()
 
@@ -101,6 +296,58 @@ class MatlabBridge:
         """
         self._init_setpoint_blocks_from_workspace()
         self._init_idv_block_from_workspace()
+        self._refresh_block_mirror()
+
+    def restore_initial_state(self):
+        """Resets the MATLAB workspace and the block parameters to the initial values, like
+        :func:`reset_workspace` followed by :func:`reset_simulink_blocks`, without reloading the workspace. All
+        snapshots are released.
+
+        The first call resets the slow way and keeps a copy of the initialized workspace in MATLAB and of the
+        initial block parameters in python. Later calls restore the workspace from the copy with one engine call and
+        push only the block parameters that differ from the initial ones with another one.
+        """
+        if self._initial_blocks is None:
+            self.reset_workspace()
+            self.reset_simulink_blocks()
+            self._eng.capture_initial_workspace(nargout=0)
+            self._initial_blocks = self._copy_block_mirror()
+            return
+        self.clear_operating_points()
+        self._restored_time = None
+        self._eng.restore_initial_workspace(nargout=0)
+        if self._save_interval is not None:
+            self.set_workspace_variable("Ts_save", float(self._save_interval))
+        initial_sp, initial_idv = self._initial_blocks
+        block_names = [name for name in SP_BLOCK_NAMES if self._sp_mirror[name] != initial_sp[name]]
+        idv_params = []
+        if any(not np.array_equal(self._idv_mirror[key], initial_idv[key]) for key in initial_idv):
+            idv_params = [initial_idv["Before"], initial_idv["After"], initial_idv["Time"]]
+        if block_names or idv_params:
+            matlab_double = self._matlab.double
+            sp_params = [initial_sp[name] for name in block_names]
+            self._eng.apply_block_changes(block_names,
+                                          engineutils.to_matlab_double(np.reshape(sp_params, (-1, 4)), matlab_double),
+                                          engineutils.to_matlab_double(np.reshape(idv_params, (-1, 28)), matlab_double),
+                                          nargout=0)
+        self._sp_mirror, self._idv_mirror = self._copy_block_mirror(initial_sp, initial_idv)
+
+    def _copy_block_mirror(self, sp_mirror=None, idv_mirror=None):
+        sp_mirror = self._sp_mirror if sp_mirror is None else sp_mirror
+        idv_mirror = self._idv_mirror if idv_mirror is None else idv_mirror
+        return ({name: list(params) for name, params in sp_mirror.items()},
+                {key: values.copy() for key, values in idv_mirror.items()})
+
+    def _refresh_block_mirror(self):
+        # The parameters of the setpoint and IDVInput blocks are mirrored on the python side, so reading them costs
+        # no engine call. Every method that changes the blocks keeps the mirror up to date, it is only read back from
+        # Simulink when MATLAB has changed the blocks itself (initialization, reset, restored snapshots).
+        sp_params, idv_params = self._eng.get_block_params(list(SP_BLOCK_NAMES), nargout=2)
+        sp_params = engineutils.to_numpy(sp_params).reshape(len(SP_BLOCK_NAMES), 4)
+        self._sp_mirror = {name: [float(p) for p in row] for name, row in zip(SP_BLOCK_NAMES, sp_params)}
+        idv_params = engineutils.to_numpy(idv_params).reshape(3, -1)
+        self._idv_mirror = {"Before": idv_params[0].copy(), "After": idv_params[1].copy(),
+                            "Time": idv_params[2].copy()}
 
     def _init_idv_block_from_workspace(self):
         self._eng.init_idvinput_from_workspace(nargout=0)
@@ -113,6 +360,10 @@ class MatlabBridge:
 
     def _load_workspace(self):
         self._eng.eval("loadSimEnvironment", nargout=0)
+        if self._save_interval is not None:
+            self.set_workspace_variable("Ts_save", float(self._save_interval))
+        # undo a restored snapshot, the next start begins at the initial state again
+        self._eng.set_param(self._model, "InitialState", "xInitial", nargout=0)
 
     def _load_simulink(self):
         self._eng.load_system(self._model)
@@ -141,10 +392,35 @@ class MatlabBridge:
         step_times : float
             Absolute simulation time of which the idv (fault) change occurs (stepping from value_before to value_after)
         """
-        vb = matlab.double(values_before[0].tolist())
-        va = matlab.double(values_after[0].tolist())
-        st = matlab.double(step_times[0].tolist())
+        vb = engineutils.to_matlab_double(values_before[0], self._matlab.double)
+        va = engineutils.to_matlab_double(values_after[0], self._matlab.double)
+        st = engineutils.to_matlab_double(step_times[0], self._matlab.double)
         self._eng.set_idv_input_block_params(vb, va, st, nargout=0)
+        self._idv_mirror = {
+            "Before": np.array(values_before, dtype=float).ravel(),
+            "After": np.array(values_after, dtype=float).ravel(),
+            "Time": np.array(step_times, dtype=float).ravel(),
+        }
+
+    def set_idv_step(self, idv_idx, value, step_time, background=False):
+        """Schedules a step of one idv (IDV1-IDV28) with a single engine call
+
+        Parameters
+        ----------
+        idv_idx : int
+            Index of the idv (1-28)
+        value : float
+            Activation after the step, between 0 and 1
+        step_time : float
+            Absolute simulation time of the step in hours
+        background : bool, optional
+            Return a future instead of blocking, by default False
+        """
+        result = self._eng.set_idv_step(float(idv_idx), float(value), float(step_time), nargout=0,
+                                        background=background)
+        self._idv_mirror["After"][idv_idx - 1] = value
+        self._idv_mirror["Time"][idv_idx - 1] = step_time
+        return result
 
     def get_idv_input_block_params(self):
         """Gets and returns the values for the idv (faults) block
@@ -158,9 +434,60 @@ class MatlabBridge:
         step_times : float
             Absolute simulation time of which the idv (fault) change occurs (stepping from value_before to value_after)
         """
-        values_before, values_after, step_times = self._eng.get_idv_input_block_params(nargout=3)
-        aa = np.asarray
-        return aa(values_before), aa(values_after), aa(step_times)
+        block = self._idv_mirror
+        return block["Before"].reshape(1, -1), block["After"].reshape(1, -1), block["Time"].reshape(1, -1)
+
+    def apply_changes(self, changes):
+        """Pushes any number of setpoint and idv changes to the Simulink model with a single engine call
+
+        Parameters
+        ----------
+        changes : dict
+            Setpoint block names (e.g. 'ProductionSP') mapped to dicts with the optional keys 'before', 'after',
+            'duration' and 'start_time' of the set_*_sp methods, and optionally the key 'idv' mapped to a dict
+            {idv_idx: (value, step_time)} of steps as for :func:`set_idv_step`. Steps given as
+            (before, value, step_time) also set the value before the step.
+
+        Examples
+        --------
+        >>> bridge.apply_changes({
+        ...     "ProductionSP": {"after": 24.0, "duration": 2.0},
+        ...     "ReactorPressSP": {"after": 2750.0},
+        ...     "idv": {1: (1.0, 5.0)},
+        ... })
+        """
+        changes = dict(changes)
+        idv_steps = changes.pop("idv", dict())
+        block_names = list(changes)
+        sp_params = []
+        current_time = None
+        for name in block_names:
+            params = dict(changes[name])
+            if params.get("start_time") is None:
+                if current_time is None:
+                    current_time = self.current_time()
+                params["start_time"] = current_time
+            sp_params.append(self._resolve_sp_params(name, **params))
+        idv_params = []
+        if idv_steps:
+            # changed copies, the mirror is only updated once the engine has applied the changes
+            block = {key: values.copy() for key, values in self._idv_mirror.items()}
+            for idv_idx, step in idv_steps.items():
+                *before, value, step_time = step
+                if before:
+                    block["Before"][idv_idx - 1] = before[0]
+                block["After"][idv_idx - 1] = value
+                block["Time"][idv_idx - 1] = step_time
+            idv_params = [block["Before"], block["After"], block["Time"]]
+        matlab_double = self._matlab.double
+        self._eng.apply_block_changes(block_names,
+                                      engineutils.to_matlab_double(np.reshape(sp_params, (-1, 4)), matlab_double),
+                                      engineutils.to_matlab_double(np.reshape(idv_params, (-1, 28)), matlab_double),
+                                      nargout=0)
+        for name, params in zip(block_names, sp_params):
+            self._sp_mirror[name] = params
+        if idv_steps:
+            self._idv_mirror = block
 
     # Setpoint modification
     def set_production_sp(self, before=None, after=None, duration=0.0, start_time=None):
@@ -195,8 +522,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "ProductionSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_strip_level_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Stripper Level setpoint
@@ -230,8 +556,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "StripLevelSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_sep_level_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Seperation Level setpoint
@@ -265,8 +590,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "SepLevelSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_reactor_level_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Reactor Level setpoint
@@ -300,8 +624,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "ReactorLevelSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_reactor_press_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Reactor Pressure setpoint
@@ -335,8 +658,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "ReactorPressSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_g_in_product_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the mole percentage of component g in the product (Quality) setpoint
@@ -370,8 +692,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "MolePctGSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_ya_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the YA setpoint
@@ -405,8 +726,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "YASP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_yac_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the YAC setpoint
@@ -440,8 +760,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "YACSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_reactor_temp_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Reactor Temperature setpoint
@@ -475,8 +794,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "ReactorTempSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_recycle_valve_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Recycle Valve setpoint
@@ -510,8 +828,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "RecycleValvePosSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_steam_valve_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Steam Valve setpoint
@@ -545,8 +862,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "SteamValvePosSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def set_agitator_sp(self, before=None, after=None, duration=0.0, start_time=None):
         """Setting the Agitator setpoint
@@ -580,8 +896,7 @@ class MatlabBridge:
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated
         """
         block_name = "AgitatorSpeedSP"
-        bef, aft, dur, t_start = self._eng.get_sp_generic(block_name, nargout=4)
-        return bef, aft, dur, t_start
+        return self.get_sp_block_params(block_name)
 
     def _set_sp_block_generic(self, block_name, before=None, after=None, duration=0.0, start_time=None):
         """Sets all parameters of a generic setpoint block in the simulink model.
@@ -599,17 +914,47 @@ class MatlabBridge:
         start_time : float, optional
             Absolute simulation time in hours at which the change from 'before' to 'after' is initiated, by default the current simulation time
         """
-        if None in [before, after]:
-            bef, aft, dur, _ = self._eng.get_sp_generic(block_name, nargout=4)
-            if before is None:
-                before = bef
-            if after is None:
-                after = aft
-            if start_time is None:
-                t = self.get_workspace_variable('tout')
-                current_time = t[-1]
-                start_time = current_time
-        self._eng.set_sp_generic(block_name, float(before), float(after), float(duration), float(start_time), nargout=0)
+        params = self._resolve_sp_params(block_name, before, after, duration, start_time)
+        self._eng.set_sp_generic(block_name, *params, nargout=0)
+        self._sp_mirror[block_name] = params
+
+    def get_sp_block_params(self, block_name):
+        """Gets the parameters of a setpoint block
+
+        Parameters
+        ----------
+        block_name : string
+            Name of the setpoint block, e.g. 'ProductionSP'
+
+        Returns
+        -------
+        tuple
+            (before, after, duration, start_time) of the block
+        """
+        bef, aft, dur, t_start = self._sp_mirror[block_name]
+        return bef, aft, dur, t_start
+
+    def current_time(self):
+        """Simulation time in hours of the last logged sample. After a snapshot was restored, the time of the snapshot
+        until the simulation is started again, since the logs in the workspace still belong to the discarded run.
+
+        Returns
+        -------
+        float
+        """
+        if self._restored_time is not None:
+            return self._restored_time
+        return float(self._eng.eval("tout(end)", nargout=1))
+
+    def _resolve_sp_params(self, block_name, before=None, after=None, duration=0.0, start_time=None):
+        bef, aft, _, _ = self._sp_mirror[block_name]
+        if before is None:
+            before = bef
+        if after is None:
+            after = aft
+        if start_time is None:
+            start_time = self.current_time()
+        return [float(before), float(after), float(duration), float(start_time)]
 
     # Data queries, setters and other utility methods
 
@@ -651,6 +996,8 @@ class MatlabBridge:
         var = engineutils.get_variable(self._eng, name)
         if isinstance(var, float):
             var = np.float64(var)
+        elif isinstance(var, self._matlab.double):
+            var = engineutils.to_numpy(var)
         elif isinstance(var, Iterable):
             var = np.asarray(var)
         return var
@@ -663,7 +1010,7 @@ class MatlabBridge:
         absolute_pause_time : float
             Absolute pause time in hours (i.e at hour 10.5)
         """
-        self._eng.set_simpause_time(float(absolute_pause_time), nargout=0)
+        self._eng.set_simpause_time(np.asarray(absolute_pause_time, dtype=float).item(), nargout=0)
 
     def set_workspace_variable(self, name, value):
         """Sets a MATLAB workspace variable from Python
@@ -678,10 +1025,10 @@ class MatlabBridge:
         """
         if isinstance(value, np.ndarray):
             if value.dtype in [int, float]:
-                var = matlab.double(value.tolist())
+                var = engineutils.to_matlab_double(value, self._matlab.double)
             else:
                 var = value.tolist()  # converted to cell-array in matlab
-        elif isinstance(value, np.float):
+        elif isinstance(value, float):
             var = float(value)
         else:
             var = value
@@ -699,3 +1046,82 @@ class MatlabBridge:
         """
         self.set_workspace_variable("t_current", ref_time)
         self._eng.isolate_recent_data_in_workspace(nargout=0)
+
+    def fetch_recent_data(self, ref_time):
+        """Fetches all simulation data with t_sim > ref_time from the MATLAB workspace in a single engine call.
+
+        Parameters
+        ----------
+        ref_time: float
+            Absolute simulation time.
+
+        Returns
+        -------
+        np.array
+            Matrix with one row per new sample and the columns [tout simout xmv setpoints OpCost idv_list]
+        """
+        data = self._eng.fetch_recent_data(float(ref_time), nargout=1)
+        return engineutils.to_numpy(data)
+
+    def fetch_since(self, cursor, background=False):
+        """Fetches the logged simulation data after a row cursor in a single engine call. Only the new rows are read,
+        so the cost does not depend on the length of the history.
+
+        Parameters
+        ----------
+        cursor: int
+            Number of logged rows that were already fetched.
+        background : bool, optional
+            Return a future of (data, cursor) instead of blocking, by default False
+
+        Returns
+        -------
+        data : np.array
+            Matrix with one row per new sample and the columns [tout simout xmv setpoints OpCost idv_list], or the
+            columns selected with :func:`set_logged_columns`
+        cursor : int
+            Cursor to pass to the next call (the number of logged rows)
+        """
+        columns = self._matlab.double([]) if self._logged_columns is None else engineutils.to_matlab_double(
+            np.asarray(self._logged_columns) + 1, self._matlab.double)
+        if background:
+            future = self._eng.fetch_since(float(cursor), columns, nargout=2, background=True)
+            return engineutils.ConvertedFuture(future, self._convert_fetched_data)
+        return self._convert_fetched_data(self._eng.fetch_since(float(cursor), columns, nargout=2))
+
+    def set_save_interval(self, save_interval):
+        """Sets the sample time Ts_save of the logging blocks. The interval is kept across workspace resets and takes
+        effect at the next start of the simulation.
+
+        Parameters
+        ----------
+        save_interval : float
+            Sample time in hours, a multiple of the base sample time Ts_base
+        """
+        self._save_interval = save_interval
+        self.set_workspace_variable("Ts_save", float(save_interval))
+
+    def set_logged_columns(self, columns):
+        """Restricts :func:`fetch_since` to a subset of the columns [tout simout xmv setpoints OpCost idv_list]. The
+        selection is done in MATLAB, so the other columns are not transferred.
+
+        Parameters
+        ----------
+        columns : list or None
+            Column indices (0-based) of the matrix returned by :func:`fetch_since`, None for all columns
+        """
+        self._logged_columns = None if columns is None else [int(column) for column in columns]
+
+    def get_logged_columns(self):
+        """Column indices (0-based) selected with :func:`set_logged_columns`, None if all columns are fetched
+
+        Returns
+        -------
+        list or None
+        """
+        return None if self._logged_columns is None else list(self._logged_columns)
+
+    @staticmethod
+    def _convert_fetched_data(fetched):
+        data, cursor = fetched
+        return engineutils.to_numpy(data), int(cursor)
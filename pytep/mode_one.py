@@ -0,0 +1,45 @@
+"""Operating point of the MultiLoop_mode3 model.
+
+These values mirror ``simulator/setupfiles/mode_one.mat`` and the constants defined in
+``simulator/simcommands/loadSimEnvironment.m``, so that the NumPy backend starts from exactly the same state as the
+Simulink model.
+"""
+import numpy as np
+
+# plant states after 72 h of operation in mode 1
+X_INITIAL = np.array([
+    11.972320715726578, 7.978232125593358, 4.823008649116723, 0.27354471395207286, 18.197991455663512,
+    6.081707153408678, 138.71634683465413, 136.14415802734726, 2.524073571835502, 62.87703820689191,
+    41.90060895631712, 25.32980353460796, 0.15277068309204214, 10.822057958485296, 3.6166954379133203,
+    52.308682831053495, 41.09279191920991, 0.6474084385068014, 0.4265120287821812, 0.007914666687554792,
+    0.8969943698099474, 0.009706850256558687, 0.5210777245214824, 0.1686103062752169, 48.3698991682943,
+    39.50611808859018, 0.38106663079755293, 113.6833003369937, 52.63292973720625, 66.37508777061157,
+    21.276981785399652, 58.910172219167244, 14.304416309862557, 17.46670225470465, 8.406169489963068,
+    1.1334699147647795, 102.45458275844315, 92.02786537721666, 62.89703730085488, 53.17305986064452,
+    26.23860228806225, 60.5635888811034, 1.0000000000000004, 25.811833625346075, 37.253675096165175,
+    46.4382206568001, 0.9999999999999963, 35.975501828446085, 12.415395321904532, 99.99999999999999,
+])
+
+XMV_0 = X_INITIAL[38:].copy()
+
+# Eadj, SP17, Fp, r1, r4, r5, r6, r7
+CONTROLLER_INIT = np.array([
+    0.35492604114496307, 91.739739545026723, 100.02036649866010, 0.0026668234181201566, 0.092332759079091276,
+    0.0021115715547296138, 0.25270448153340369, 0.22885344068559971,
+])
+
+INTEGRATOR_INIT = np.array([
+    -1.0684124072213308e-04, -2.3314553800446447e-05, 2.0906185232982821e-07, -4.1740602085837963e-08,
+    1.2486798892097362e-07, 1.4444010076886116e-07, 1.5258737562362512e-07, 7.1886219643602089e-08,
+    -2.4367585638174205e-07, -4.8587478964634556e-06, -1.7766357998993954e-05, -2.9319727971710563e-05,
+    -1.6585038338234881e-05, -7.5485821035670142e-05, -3.9626395854952534e-04, 9.5436249914371274e-05,
+    3.3340296283768112e-06,
+])
+
+SETPOINTS = np.array([22.89, 50., 50., 65., 2800., 53.8, 63.137, 51., 122.9, 1., 1., 100.])
+
+IDV = np.zeros(28)
+
+SEED = 1000.
+TS_BASE = 5e-4
+TS_SAVE = 0.05
@@ -0,0 +1,769 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import pickle
+
+import numpy as np
+
+from pytep.controllers import SP_BLOCK_NAMES
+from pytep.ensemble import Ensemble
+from pytep.utils.instrumentation import NULL_SPAN
+import pytep.mode_one as mode_one
+
+
+def initial_workspace():
+    """Equivalent of the loadSimEnvironment script: the workspace variables of the model in mode 1 as np.arrays and
+    np.floats
+
+    One value deliberately differs from the script: r6_0 is taken from the 7th column of controller_init, the initial
+    output of the r6 loop. loadSimEnvironment reads the 6th column for both r5_0 and r6_0, which starts the r6 loop at
+    the value of r5 instead of its own operating point. The :class:`~pytep.controllers.MultiLoopController` is
+    initialized from controller_init directly and always uses the 7th column.
+
+    Returns
+    -------
+    dict
+    """
+    sp = mode_one.SETPOINTS.reshape(1, -1)
+    idv = mode_one.IDV.reshape(1, -1)
+    controller_init = mode_one.CONTROLLER_INIT.reshape(1, -1)
+    workspace = {
+        "x": mode_one.X_INITIAL.reshape(-1, 1),
+        "sp": sp,
+        "idv": idv,
+        "t": np.float64(72.),
+        "xmv_0": mode_one.XMV_0.reshape(1, -1),
+        "controller_init": controller_init,
+        "integrator_init": mode_one.INTEGRATOR_INIT.reshape(1, -1),
+        "xInitial": mode_one.X_INITIAL.reshape(-1, 1),
+        "setpoint_init": np.vstack([sp, sp, np.zeros((1, 12))]),
+        "idv_init": np.vstack([idv, idv, np.zeros((1, 28))]),
+        "seed": np.float64(mode_one.SEED),
+        "setpoint_change_duration": np.float64(0.),
+        "Ts_base": np.float64(mode_one.TS_BASE),
+        "Ts_save": np.float64(mode_one.TS_SAVE),
+        "tout": np.float64(0.),
+        "simout": np.zeros((1, 41)),
+        "xmv": np.zeros((1, 12)),
+        "setpoints": sp.copy(),
+        "idv_list": idv.copy(),
+        "OpCost": np.float64(0.),
+    }
+    for name, idx in [("Eadj_0", 0), ("SP17_0", 1), ("Fp_0", 2), ("r1_0", 3), ("r4_0", 4), ("r5_0", 5),
+                      ("r6_0", 6), ("r7_0", 7)]:
+        workspace[name] = np.float64(controller_init[-1, idx])
+    return workspace
+
+
+class NumpyBridge:
+    """Drop-in replacement for :class:`~pytep.matlab_bridge.MatlabBridge` that simulates the MultiLoop_mode3 model
+    with the NumPy port of the TE process and its controllers, as an :class:`~pytep.ensemble.Ensemble` of one plant.
+
+    No MATLAB installation is required. The workspace, the setpoint and IDV blocks and the simulation status are
+    emulated in Python, so the bridge can be used wherever a MatlabBridge is used. Simulations run synchronously: a
+    call to start or continue the simulation returns once the simulation is paused or stopped. Calls with
+    background=True run on a worker thread of the bridge and return a concurrent.futures.Future.
+
+    The model is integrated with RK4 at the base sample time of 5e-4 h. With numba installed, the plant simulates
+    about 30 hours per second of wall time in the compiled loop of :mod:`pytep.tekernel`; without numba, it simulates
+    about 0.13 hours per second, and the bridge is only meant for workers without MATLAB.
+    """
+
+    STOP_TIME = 1000.
+
+    def __init__(self, model="MultiLoop_mode3", sim_path=None):
+        self._model = model
+        self._sim_path = sim_path
+        self._workspace = dict()
+        self._sp_blocks = dict()
+        self._idv_block = dict()
+        self._simpause_time = self.STOP_TIME
+        self._status = "stopped"
+        self._ensemble = None
+        # ensemble whose log is newer than the log variables of the workspace, see _sync_workspace_log
+        self._log_ensemble = None
+        self._executor = None
+        self._save_interval = None
+        self._logged_columns = None
+        self._instrumentation = None
+        self._load_workspace()
+        self._init_setpoint_blocks_from_workspace()
+        self._init_idv_block_from_workspace()
+
+    def start_engine(self):
+        """Kept for compatibility with the MatlabBridge, there is no engine to start
+
+        Returns
+        -------
+        bool
+            Returns True
+        """
+        return True
+
+    def stop_engine(self):
+        """Kept for compatibility with the MatlabBridge, there is no engine to stop
+        """
+        pass
+
+    def set_instrumentation(self, instrumentation):
+        """Records the simulation runs and data fetches in an instrumentation, or stops recording
+
+        Parameters
+        ----------
+        instrumentation : pytep.utils.instrumentation.Instrumentation or None
+            Instrumentation that records the calls, None to stop recording
+        """
+        self._instrumentation = instrumentation
+
+    def _span(self, name):
+        if self._instrumentation is None:
+            return NULL_SPAN
+        return self._instrumentation.span(name, "bridge")
+
+    #  Simulation Commands
+
+    def _submit(self, func, *args):
+        # one worker thread keeps background calls in order
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor.submit(func, *args)
+
+    def run_until_paused(self, timeout=None, background=False):
+        """Runs the simulation until it is paused or stopped. The timeout is accepted for compatibility with
+        MatlabBridge and ignored.
+
+        Parameters
+        ----------
+        background : bool, optional
+            Return a future of the final simulation status instead of blocking, by default False
+        """
+        if background:
+            return self._submit(self._run_until_paused_status)
+        self.run_simulation()
+        self.block_until_sim_paused(timeout)
+
+    def _run_until_paused_status(self):
+        self.run_until_paused()
+        return self.get_sim_status()
+
+    def run_simulation(self):
+        """Runs the simulation with the appropriate command, given the current simulation status
+        Possible states: Stopped, Paused
+        """
+        sim_status = self.get_sim_status()
+        if sim_status == "stopped":
+            self.start_simulation()
+        elif sim_status == "paused":
+            self.continue_simulation()
+        else:
+            UserWarning(
+                "Unexpected simulation status '{}' encountered.".format(sim_status)
+            )
+
+    def block_until_sim_paused(self, timeout=None):
+        """Returns immediately, since the simulation always runs synchronously
+        """
+        pass
+
+    def start_simulation(self):
+        """Starts a new simulation at t = 0 from the initial conditions in the workspace
+        """
+        ws = self._workspace
+        self._ensemble = Ensemble(
+            1,
+            seeds=ws["seed"],
+            x0=np.ravel(ws["xInitial"]),
+            xmv_0=np.ravel(ws["xmv_0"]),
+            controller_init=np.ravel(np.atleast_2d(ws["controller_init"])[-1]),
+            integrator_init=np.ravel(np.atleast_2d(ws["integrator_init"])[-1]),
+            ts_base=float(ws["Ts_base"]),
+            ts_save=float(ws["Ts_save"]),
+        )
+        self._status = "running"
+        self._simulate()
+
+    def continue_simulation(self):
+        """Continues a paused simulation
+        """
+        if self._status == "paused":
+            self._status = "running"
+            self._simulate()
+
+    def pause_simulation(self):
+        """Pauses the active simulation
+        """
+        if self._status == "running":
+            self._status = "paused"
+
+    def stop_simulation(self):
+        """Stops the active simulation
+        """
+        self._status = "stopped"
+
+    def _simulate(self):
+        ensemble = self._ensemble
+        for block_name, params in self._sp_blocks.items():
+            ensemble.set_setpoint(block_name, *params)
+        block = self._idv_block
+        ensemble.set_idv_block_params(block["Before"], block["After"], block["Time"])
+
+        with self._span("run_until"):
+            completed = ensemble.run_until(min(self._simpause_time, self.STOP_TIME), stop_on_shutdown=True)
+        if completed and self._simpause_time < self.STOP_TIME:
+            self._status = "paused"
+        else:
+            self._status = "stopped"
+
+        # copying the whole log into the workspace after every segment would cost O(history), the workspace
+        # variables are only updated when they are read
+        self._log_ensemble = ensemble
+
+    def _sync_workspace_log(self):
+        """Copies the log of the ensemble to the workspace variables tout, simout, xmv, setpoints, idv_list and
+        OpCost"""
+        ensemble = self._log_ensemble
+        if ensemble is None:
+            return
+        ws = self._workspace
+        ws["tout"] = ensemble.time.reshape(-1, 1)
+        ws["simout"] = ensemble.process_data[0]
+        ws["xmv"] = ensemble.manipulated_variables[0]
+        ws["setpoints"] = ensemble.setpoint_data[0]
+        ws["idv_list"] = ensemble.idv_data[0]
+        ws["OpCost"] = ensemble.operating_cost[0].reshape(-1, 1)
+        self._log_ensemble = None
+
+    def _n_logged(self):
+        if self._log_ensemble is not None:
+            return self._log_ensemble.logged_rows
+        return np.reshape(self._workspace["tout"], (-1, 1)).shape[0]
+
+    #  Snapshots
+
+    def save_operating_point(self):
+        """Captures the complete state of the simulation: plant and controller states, random number generators,
+        logged data, block parameters and workspace.
+
+        Returns
+        -------
+        object
+            Operating point to pass to :func:`restore_operating_point`
+        """
+        return copy.deepcopy({
+            "ensemble": self._ensemble,
+            "workspace": self._workspace,
+            "log_ensemble": self._log_ensemble,
+            "sp_blocks": self._sp_blocks,
+            "idv_block": self._idv_block,
+            "simpause_time": self._simpause_time,
+            "status": self._status,
+        })
+
+    def restore_operating_point(self, operating_point):
+        """Returns the simulation to an operating point. The same operating point can be restored any number of times.
+
+        Parameters
+        ----------
+        operating_point : object
+            Operating point returned by :func:`save_operating_point`
+
+        Returns
+        -------
+        int
+            Number of rows that the logged data in the workspace contains once the simulation is continued, up to
+            and including the operating point
+        """
+        state = copy.deepcopy(operating_point)
+        self._ensemble = state["ensemble"]
+        self._workspace = state["workspace"]
+        self._log_ensemble = state.get("log_ensemble")
+        self._sp_blocks = state["sp_blocks"]
+        self._idv_block = state["idv_block"]
+        self._simpause_time = state["simpause_time"]
+        self._status = state["status"]
+        return self._n_logged()
+
+    def export_operating_point(self, operating_point, file_name):
+        """Writes an operating point to a file
+
+        Parameters
+        ----------
+        operating_point : object
+            Operating point returned by :func:`save_operating_point`
+        file_name : string or pathlib.Path
+            Path of the file
+        """
+        with open(file_name, "wb") as op_file:
+            pickle.dump(operating_point, op_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def import_operating_point(self, file_name):
+        """Loads an operating point written by :func:`export_operating_point`
+
+        Returns
+        -------
+        object
+            Operating point to pass to :func:`restore_operating_point`
+        """
+        with open(file_name, "rb") as op_file:
+            return pickle.load(op_file)
+
+    def release_operating_point(self, operating_point):
+        """Counterpart of :func:`MatlabBridge.release_operating_point`. Operating points are python objects, they are
+        freed once they are no longer referenced."""
+
+    def clear_operating_points(self):
+        """Counterpart of :func:`MatlabBridge.clear_operating_points`, see :func:`release_operating_point`"""
+
+    #  Initialization and reset
+
+    def reset_workspace(self):
+        """Resets the workspace to the initial values
+        """
+        self._clear_workspace()
+        self._load_workspace()
+
+    def reset_simulink_blocks(self):
+        """Resets all the setpoint and idv block parameters to the correct initial values
+        """
+        self._init_setpoint_blocks_from_workspace()
+        self._init_idv_block_from_workspace()
+
+    def restore_initial_state(self):
+        """Resets the workspace and the block parameters to the initial values, the same as reset_workspace and
+        reset_simulink_blocks (kept for compatibility with the MatlabBridge)
+        """
+        self.reset_workspace()
+        self.reset_simulink_blocks()
+
+    def _init_idv_block_from_workspace(self):
+        idv_init = self._workspace["idv_init"]
+        self._idv_block = {"Before": idv_init[0].copy(), "After": idv_init[1].copy(), "Time": idv_init[2].copy()}
+
+    def _init_setpoint_blocks_from_workspace(self):
+        setpoint_init = self._workspace["setpoint_init"]
+        duration = self._workspace["setpoint_change_duration"]
+        for idx, block_name in enumerate(SP_BLOCK_NAMES):
+            self._sp_blocks[block_name] = [
+                float(setpoint_init[0, idx]), float(setpoint_init[1, idx]), float(duration), float(setpoint_init[2, idx])
+            ]
+
+    def _clear_workspace(self):
+        self._workspace.clear()
+        self._log_ensemble = None
+
+    def _load_workspace(self):
+        self._workspace.update(initial_workspace())
+        if self._save_interval is not None:
+            self._workspace["Ts_save"] = np.float64(self._save_interval)
+
+    def add_dir_to_matlab_path(self, dir_path):
+        """Kept for compatibility with the MatlabBridge, there is no MATLAB path
+
+        Parameters
+        ----------
+        dir_path : string
+            Ignored
+        """
+        pass
+
+    # Fault modificatiion (IDVs)
+
+    def set_idv_input_block_params(self, values_before, values_after, step_times):
+        """Setting the parameters for the idv (faults) block
+
+        Parameters
+        ----------
+        values_before : float
+            np.array (1 by 28) of floats for corresponding idv (faults), between 0 and 1
+        values_after : float
+            np.array (1 by 28) of floats for corresponding idv (faults), between 0 and 1
+        step_times : float
+            Absolute simulation time of which the idv (fault) change occurs (stepping from value_before to value_after)
+        """
+        self._idv_block = {
+            "Before": np.array(values_before, dtype=float).ravel(),
+            "After": np.array(values_after, dtype=float).ravel(),
+            "Time": np.array(step_times, dtype=float).ravel(),
+        }
+
+    def set_idv_step(self, idv_idx, value, step_time, background=False):
+        """Schedules a step of one idv (IDV1-IDV28)
+
+        Parameters
+        ----------
+        idv_idx : int
+            Index of the idv (1-28)
+        value : float
+            Activation after the step, between 0 and 1
+        step_time : float
+            Absolute simulation time of the step in hours
+        background : bool, optional
+            Return a future instead of blocking, by default False
+        """
+        if background:
+            return self._submit(self.set_idv_step, idv_idx, value, step_time)
+        self._idv_block["After"][idv_idx - 1] = value
+        self._idv_block["Time"][idv_idx - 1] = step_time
+
+    def get_idv_input_block_params(self):
+        """Gets and returns the values for the idv (faults) block
+
+        Returns
+        -------
+        values_before : float
+            np.array (1 by 28) of floats for corresponding idv (faults), between 0 and 1
+        values_after : float
+            np.array (1 by 28) of floats for corresponding idv (faults), between 0 and 1
+        step_times : float
+            Absolute simulation time of which the idv (fault) change occurs (stepping from value_before to value_after)
+        """
+        block = self._idv_block
+        return block["Before"].reshape(1, -1), block["After"].reshape(1, -1), block["Time"].reshape(1, -1)
+
+    def apply_changes(self, changes):
+        """Applies any number of setpoint and idv changes at once
+
+        Parameters
+        ----------
+        changes : dict
+            Setpoint block names (e.g. 'ProductionSP') mapped to dicts with the optional keys 'before', 'after',
+            'duration' and 'start_time' of the set_*_sp methods, and optionally the key 'idv' mapped to a dict
+            {idv_idx: (value, step_time)} of steps as for :func:`set_idv_step`. Steps given as
+            (before, value, step_time) also set the value before the step.
+        """
+        changes = dict(changes)
+        for idv_idx, step in changes.pop("idv", dict()).items():
+            *before, value, step_time = step
+            if before:
+                self._idv_block["Before"][idv_idx - 1] = before[0]
+            self.set_idv_step(idv_idx, value, step_time)
+        for block_name, params in changes.items():
+            self._set_sp_block_generic(block_name, **params)
+
+    # Setpoint modification
+
+    def set_production_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Production setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("ProductionSP", before, after, duration, start_time)
+
+    def get_production_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Production setpoint"""
+        return self.get_sp_block_params("ProductionSP")
+
+    def set_strip_level_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Stripper Level setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("StripLevelSP", before, after, duration, start_time)
+
+    def get_strip_level_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Stripper Level setpoint"""
+        return self.get_sp_block_params("StripLevelSP")
+
+    def set_sep_level_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Separator Level setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("SepLevelSP", before, after, duration, start_time)
+
+    def get_sep_level_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Separator Level setpoint"""
+        return self.get_sp_block_params("SepLevelSP")
+
+    def set_reactor_level_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Reactor Level setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("ReactorLevelSP", before, after, duration, start_time)
+
+    def get_reactor_level_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Reactor Level setpoint"""
+        return self.get_sp_block_params("ReactorLevelSP")
+
+    def set_reactor_press_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Reactor Pressure setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("ReactorPressSP", before, after, duration, start_time)
+
+    def get_reactor_press_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Reactor Pressure setpoint"""
+        return self.get_sp_block_params("ReactorPressSP")
+
+    def set_g_in_product_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Mole % G in Product setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("MolePctGSP", before, after, duration, start_time)
+
+    def get_g_in_product_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Mole % G in Product setpoint"""
+        return self.get_sp_block_params("MolePctGSP")
+
+    def set_ya_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the yA setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("YASP", before, after, duration, start_time)
+
+    def get_ya_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the yA setpoint"""
+        return self.get_sp_block_params("YASP")
+
+    def set_yac_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the yAC setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("YACSP", before, after, duration, start_time)
+
+    def get_yac_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the yAC setpoint"""
+        return self.get_sp_block_params("YACSP")
+
+    def set_reactor_temp_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Reactor Temperature setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("ReactorTempSP", before, after, duration, start_time)
+
+    def get_reactor_temp_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Reactor Temperature setpoint"""
+        return self.get_sp_block_params("ReactorTempSP")
+
+    def set_recycle_valve_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Recycle Valve setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("RecycleValvePosSP", before, after, duration, start_time)
+
+    def get_recycle_valve_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Recycle Valve setpoint"""
+        return self.get_sp_block_params("RecycleValvePosSP")
+
+    def set_steam_valve_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Steam Valve setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("SteamValvePosSP", before, after, duration, start_time)
+
+    def get_steam_valve_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Steam Valve setpoint"""
+        return self.get_sp_block_params("SteamValvePosSP")
+
+    def set_agitator_sp(self, before=None, after=None, duration=0.0, start_time=None):
+        """Setting the Agitator setpoint, see :func:`_set_sp_block_generic`"""
+        self._set_sp_block_generic("AgitatorSpeedSP", before, after, duration, start_time)
+
+    def get_agitator_sp(self):
+        """Gets and returns the values (before, after, duration, t_start) for the Agitator setpoint"""
+        return self.get_sp_block_params("AgitatorSpeedSP")
+
+    def _set_sp_block_generic(self, block_name, before=None, after=None, duration=0.0, start_time=None):
+        """Sets all parameters of a generic setpoint block.
+
+        Parameters
+        ----------
+        block_name : string
+            Name of the Simulink Block
+        before : float, optional
+            Value of the setpoint before a change is initiated, by default the current setpoint value
+        after : float, optional
+            Value of the setpoint after a change is initiated, by default the current setpoint value
+        duration : float, optional
+            Duration of the change from 'before' to 'after' in (hours). Step change for duration = 0, ramp otherwise, by default 0.0
+        start_time : float, optional
+            Absolute simulation time in hours at which the change from 'before' to 'after' is initiated, by default the current simulation time
+        """
+        self._sp_blocks[block_name] = self._resolve_sp_params(block_name, before, after, duration, start_time)
+
+    def _resolve_sp_params(self, block_name, before=None, after=None, duration=0.0, start_time=None):
+        bef, aft, _, _ = self._sp_blocks[block_name]
+        if before is None:
+            before = bef
+        if after is None:
+            after = aft
+        if start_time is None:
+            start_time = self.current_time()
+        return [float(before), float(after), float(duration), float(start_time)]
+
+    def get_sp_block_params(self, block_name):
+        """Gets the parameters of a setpoint block
+
+        Parameters
+        ----------
+        block_name : string
+            Name of the setpoint block, e.g. 'ProductionSP'
+
+        Returns
+        -------
+        tuple
+            (before, after, duration, start_time) of the block
+        """
+        bef, aft, dur, t_start = self._sp_blocks[block_name]
+        return bef, aft, dur, t_start
+
+    def current_time(self):
+        """Simulation time in hours of the last logged sample. A restored operating point includes the logs, so the
+        time is always that of the restored run.
+
+        Returns
+        -------
+        float
+        """
+        return float(np.ravel(self.get_workspace_variable('tout'))[-1])
+
+    # Data queries, setters and other utility methods
+
+    def get_sim_status(self):
+        """Provides the status of the simulation
+
+        Returns
+        -------
+        status : string
+            Takes on the values 'stopped' | 'running' | 'paused'
+        """
+        return self._status
+
+    def save_workspace(self, name):
+        """Saves the workspace to a .npz file with the specifed name
+
+        Parameters
+        ----------
+        name : string
+            File name of the saved workspace
+        """
+        self._sync_workspace_log()
+        np.savez(name, **self._workspace)
+
+    def get_workspace_variable(self, name):
+        """Fetches a variable from the emulated workspace.
+
+        Parameters
+        ----------
+        name : string
+            Name of the desired workspace variable to obtain
+
+        Returns
+        -------
+        np.floats, np.arrays
+            Numeric primitives are returned as np.floats.
+            Vectors are returned as np.arrays.
+            Matrices are returned as np.arrays.
+        """
+        self._sync_workspace_log()
+        var = self._workspace[name]
+        if isinstance(var, np.ndarray):
+            var = var.copy()
+        return var
+
+    def set_simpause_time(self, absolute_pause_time):
+        """Pauses the simulation at a specified time (in hours)
+
+        Parameters
+        ----------
+        absolute_pause_time : float
+            Absolute pause time in hours (i.e at hour 10.5)
+        """
+        self._simpause_time = np.asarray(absolute_pause_time, dtype=float).item()
+
+    def set_workspace_variable(self, name, value):
+        """Sets a variable in the emulated workspace
+
+        Parameters
+        ----------
+        name : string
+            string identifier for desired workspace variable
+        value : np.floats, np.arrays
+            1d arrays are set as vectors.
+            2d arrays are set as matrices.
+        """
+        if isinstance(value, np.ndarray):
+            value = value.copy()
+        elif isinstance(value, (int, float)):
+            value = np.float64(value)
+        self._sync_workspace_log()
+        self._workspace[name] = value
+
+    def isolate_recent_data_in_workspace(self, ref_time):
+        """Extracts the parts of the timeseries simulation data in the workspace for which t_sim > ref_time and
+        and stores them in separate arrays in the workspace.
+        Created arrays are: latest_tout, latest_op_cost, latest_simout, latest_xmv, latest_setpoints, latest_idv_list
+
+        Parameters
+        ----------
+        ref_time: float
+            Absolute simulation time.
+        """
+        self.set_workspace_variable("t_current", ref_time)
+        self._sync_workspace_log()
+        ws = self._workspace
+        tout = np.reshape(ws["tout"], (-1, 1))
+        mask = tout[:, 0] > ref_time
+        ws["latest_tout"] = tout[mask]
+        ws["latest_op_cost"] = np.reshape(ws["OpCost"], (-1, 1))[mask]
+        for name in ["simout", "xmv", "setpoints", "idv_list"]:
+            ws["latest_" + name] = np.atleast_2d(ws[name])[mask]
+
+    def fetch_recent_data(self, ref_time):
+        """Fetches all simulation data with t_sim > ref_time from the workspace as one matrix.
+
+        Parameters
+        ----------
+        ref_time: float
+            Absolute simulation time.
+
+        Returns
+        -------
+        np.array
+            Matrix with one row per new sample and the columns [tout simout xmv setpoints OpCost idv_list]
+        """
+        self._sync_workspace_log()
+        ws = self._workspace
+        tout = np.reshape(ws["tout"], (-1, 1))
+        mask = tout[:, 0] > ref_time
+        columns = [tout, ws["simout"], ws["xmv"], ws["setpoints"], np.reshape(ws["OpCost"], (-1, 1)), ws["idv_list"]]
+        return np.hstack([np.atleast_2d(c)[mask] for c in columns])
+
+    def fetch_since(self, cursor, background=False):
+        """Fetches the logged simulation data after a row cursor from the workspace.
+
+        Parameters
+        ----------
+        cursor: int
+            Number of logged rows that were already fetched.
+        background : bool, optional
+            Return a future of (data, cursor) instead of blocking, by default False
+
+        Returns
+        -------
+        data : np.array
+            Matrix with one row per new sample and the columns [tout simout xmv setpoints OpCost idv_list], or the
+            columns selected with :func:`set_logged_columns`
+        cursor : int
+            Cursor to pass to the next call (the number of logged rows)
+        """
+        if background:
+            return self._submit(self.fetch_since, cursor)
+        with self._span("fetch_since") as span:
+            if self._log_ensemble is not None:
+                # only the new rows are copied from the log of the ensemble
+                data = self._log_ensemble.log_rows(cursor)
+            else:
+                ws = self._workspace
+                columns = [np.reshape(ws["tout"], (-1, 1)), ws["simout"], ws["xmv"], ws["setpoints"],
+                           np.reshape(ws["OpCost"], (-1, 1)), ws["idv_list"]]
+                data = np.hstack([np.atleast_2d(c)[cursor:] for c in columns])
+            if self._logged_columns is not None:
+                data = data[:, self._logged_columns]
+            span.nbytes = data.nbytes
+        return data, self._n_logged()
+
+    def set_save_interval(self, save_interval):
+        """Sets the sample time Ts_save of the logged data. The interval is kept across workspace resets and takes
+        effect at the next start of the simulation.
+
+        Parameters
+        ----------
+        save_interval : float
+            Sample time in hours, a multiple of the base sample time Ts_base
+        """
+        self._save_interval = save_interval
+        self._workspace["Ts_save"] = np.float64(save_interval)
+
+    def set_logged_columns(self, columns):
+        """Restricts :func:`fetch_since` to a subset of the columns [tout simout xmv setpoints OpCost idv_list]
+
+        Parameters
+        ----------
+        columns : list or None
+            Column indices (0-based) of the matrix returned by :func:`fetch_since`, None for all columns
+        """
+        self._logged_columns = None if columns is None else [int(column) for column in columns]
+
+    def get_logged_columns(self):
+        """Column indices (0-based) selected with :func:`set_logged_columns`, None if all columns are fetched
+
+        Returns
+        -------
+        list or None
+        """
+        return None if self._logged_columns is None else list(self._logged_columns)
@@ -0,0 +1,216 @@
+"""Warm-start cache for simulations that share identical prefixes of commands."""
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+
+CACHE_VERSION = 2
+
+
+class CachedSimInterface:
+    """Cache layer on top of a :class:`~pytep.siminterface.SimInterface` that skips already simulated scenario
+    prefixes.
+
+    Every command (set_idv, ramp_setpoint) is recorded with its simulation time. After each simulate(duration), the
+    state of the simulation is stored on disk under a hash of the model, the seed, the logging configuration (save
+    interval and logged signals) and the command history up to the new simulation time. When a simulate() call reaches a point that is already in the cache, nothing is simulated.
+    The simulation is only restored from the cache when the scenario leaves the cached prefix or when data is
+    accessed, so a run always resumes from the longest cached prefix.
+
+    The cache is bounded in size. When it grows beyond max_size_bytes, the least recently used entries are evicted.
+
+    Parameters
+    ----------
+    sim : SimInterface
+        Fully set up simulation interface
+    cache_dir : string or pathlib.Path
+        Directory of the cache, shared between runs
+    max_size_bytes : int, optional
+        Maximum size of the cache on disk, by default 10 GB
+    seed : float, optional
+        Seed of the random number generators, by default the seed of the workspace
+
+    Examples
+    --------
+    >>> cached = CachedSimInterface(SimInterface.setup(), "tep_cache")
+    >>> for idv_idx in range(1, 21):
+    ...     cached.reset()
+    ...     cached.simulate(10)  # simulated once, restored from the cache afterwards
+    ...     cached.set_idv(idv_idx, 1)
+    ...     cached.simulate(5)
+    ...     cached.process_data.to_pickle("idv{}.pkl".format(idv_idx))
+    """
+
+    def __init__(self, sim, cache_dir, max_size_bytes=10 * 1024 ** 3, seed=None):
+        self._sim = sim
+        self._cache_dir = pathlib.Path(cache_dir)
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self._seed = seed
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self):
+        """Resets the simulation and clears the command history"""
+        self._sim.reset(seed=self._seed)
+        self._commands = []
+        self._pending_commands = []
+        self._sim_time = 0.
+        self._resume_key = None
+
+    # commands
+
+    def set_idv(self, idv_idx, value, delay=0):
+        """Records and applies :func:`~pytep.siminterface.SimInterface.set_idv`"""
+        self._record("set_idv", idv_idx, value, delay)
+
+    def ramp_setpoint(self, setpoint_label, target_val=None, duration=None, slope=None, delay=0):
+        """Records and applies :func:`~pytep.siminterface.SimInterface.ramp_setpoint`"""
+        self._record("ramp_setpoint", setpoint_label, target_val, duration, slope, delay)
+
+    def _record(self, command, *args):
+        self._commands.append([self._sim_time, command] + list(args))
+        self._pending_commands.append((command, args))
+
+    def simulate(self, duration):
+        """Simulates for the specified duration, or restores the result from the cache
+
+        Parameters
+        ----------
+        duration : float
+            Simulation time in hours
+        """
+        self._sim_time += duration
+        key = self._key()
+        if self._entry_path(key, ".pkl").exists():
+            self.hits += 1
+            self._touch(key)
+            # the pending commands are part of the cached state
+            self._pending_commands = []
+            self._resume_key = key
+            return
+        self.misses += 1
+        self._materialize()
+        for command, args in self._pending_commands:
+            getattr(self._sim, command)(*args)
+        self._pending_commands = []
+        self._sim.simulate(duration)
+        self._store(key)
+
+    # data access
+
+    @property
+    def sim(self):
+        """The SimInterface, restored to the current point of the scenario"""
+        self._materialize()
+        return self._sim
+
+    @property
+    def process_data(self):
+        return self.sim.process_data
+
+    @property
+    def manipulated_variables(self):
+        return self.sim.manipulated_variables
+
+    def operating_cost(self):
+        return self.sim.operating_cost()
+
+    def current_sim_time(self):
+        return self._sim_time
+
+    def stats(self):
+        """Hit and miss statistics and size of the cache
+
+        Returns
+        -------
+        dict
+            'hits', 'misses', 'hit_rate', 'entries' and 'size_bytes'
+        """
+        entries = list(self._cache_dir.glob("*.pkl"))
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.,
+            "entries": len(entries),
+            "size_bytes": self._cache_size(),
+        }
+
+    def clear(self):
+        """Removes all entries from the cache"""
+        for path in self._cache_dir.iterdir():
+            if path.is_file():
+                path.unlink()
+
+    # cache internals
+
+    def _key(self):
+        bridge = self._sim._matlab_bridge
+        description = {
+            "version": CACHE_VERSION,
+            "bridge": type(bridge).__name__,
+            "model": getattr(bridge, "_model", None),
+            "seed": float(bridge.get_workspace_variable("seed")) if self._seed is None else float(self._seed),
+            # the cached histories only hold the samples and columns of the logging configuration they were made with
+            "save_interval": float(bridge.get_workspace_variable("Ts_save")),
+            "logged_columns": bridge.get_logged_columns(),
+            "commands": self._commands,
+            "sim_time": round(self._sim_time, 9),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
+    def _entry_path(self, key, suffix):
+        return self._cache_dir / (key + suffix)
+
+    def _materialize(self):
+        if self._resume_key is None:
+            return
+        key, self._resume_key = self._resume_key, None
+        with open(self._entry_path(key, ".pkl"), "rb") as entry_file:
+            snapshot = pickle.load(entry_file)
+        bridge = self._sim._matlab_bridge
+        snapshot.operating_point = bridge.import_operating_point(self._entry_path(key, ".op"))
+        self._sim.restore(snapshot)
+        # the restored model does not need the imported snapshot anymore
+        self._sim.release(snapshot)
+
+    def _store(self, key):
+        snapshot = self._sim.snapshot()
+        self._sim._matlab_bridge.export_operating_point(snapshot.operating_point, self._entry_path(key, ".op"))
+        # the entry on disk replaces the snapshot in the bridge
+        self._sim.release(snapshot)
+        # write to a temporary file first, so that an interrupted write never leaves a valid looking entry
+        tmp_path = self._entry_path(key, ".pkl.tmp")
+        with open(tmp_path, "wb") as entry_file:
+            pickle.dump(snapshot, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._entry_path(key, ".pkl"))
+        self._evict(keep=key)
+
+    def _touch(self, key):
+        for suffix in [".pkl", ".op"]:
+            path = self._entry_path(key, suffix)
+            if path.exists():
+                os.utime(path)
+
+    def _cache_size(self):
+        return sum(path.stat().st_size for path in self._cache_dir.iterdir() if path.is_file())
+
+    def _evict(self, keep=None):
+        size = self._cache_size()
+        if size <= self.max_size_bytes:
+            return
+        entries = sorted(self._cache_dir.glob("*.pkl"), key=lambda path: path.stat().st_mtime)
+        for entry in entries:
+            if size <= self.max_size_bytes:
+                break
+            key = entry.name[:-len(".pkl")]
+            if key in [keep, self._resume_key]:
+                continue
+            for suffix in [".pkl", ".op"]:
+                path = self._entry_path(key, suffix)
+                if path.exists():
+                    size -= path.stat().st_size
+                    path.unlink()
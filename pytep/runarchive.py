@@ -0,0 +1,236 @@
+"""Chunked, compressed columnar archive of a simulation run.
+
+An archive is a directory with a ``meta.json`` file (column groups, units and user metadata) and numbered chunk files.
+Every chunk holds a fixed number of consecutive rows, stored column by column. Chunks are written to a temporary file
+and renamed when complete, so an interrupted run leaves a valid archive of all completed chunks.
+"""
+import json
+import os
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+FILE_FORMATS = ["npz", "parquet"]
+_META_FILE = "meta.json"
+
+
+def _import_parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Archives in the parquet format require pyarrow (pip install pyarrow).") from error
+    return pyarrow, pyarrow.parquet
+
+
+def _chunk_paths(path, file_format):
+    return sorted(pathlib.Path(path).glob("chunk-*." + file_format))
+
+
+def _write_atomic(path, write):
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class RunArchiveWriter:
+    """Appends rows to a run archive.
+
+    Rows are buffered until chunk_rows rows are available and then written as one compressed chunk. Rows that are not
+    written yet are lost on a crash, :func:`flush` writes them as a (shorter) chunk.
+
+    Parameters
+    ----------
+    path : string or pathlib.Path
+        Directory of the archive
+    groups : dict
+        Group names mapped to lists of column labels. A row holds the columns of all groups in this order.
+    units : dict, optional
+        Units of the columns by label
+    metadata : dict, optional
+        JSON serializable information about the run
+    chunk_rows : int, optional
+        Number of rows per chunk, by default 2000 (100 simulated hours at Ts_save = 0.05 h)
+    file_format : string, optional
+        'npz' (numpy, zlib compressed) or 'parquet' (requires pyarrow, zstd compressed), by default 'npz'
+    mode : string, optional
+        'w' to start a new archive, removing the chunks of an existing one, or 'a' to append to an existing archive
+        with the same columns. By default 'w'.
+    """
+
+    def __init__(self, path, groups, units=None, metadata=None, chunk_rows=2000, file_format="npz", mode="w"):
+        if file_format not in FILE_FORMATS:
+            raise ValueError("Unknown file format '{}'. Use one of {}.".format(file_format, FILE_FORMATS))
+        if mode not in ["w", "a"]:
+            raise ValueError("Unknown mode '{}'. Use 'w' or 'a'.".format(mode))
+        if file_format == "parquet":
+            _import_parquet()
+        self.path = pathlib.Path(path)
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.columns = [column for group_columns in groups.values() for column in group_columns]
+        self._buffer = []
+        self._n_buffered = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / _META_FILE
+        if mode == "a" and meta_path.exists():
+            archive = RunArchive(self.path)
+            if archive.columns != self.columns or archive.file_format != file_format:
+                raise ValueError("The archive in {} has different columns or another file format.".format(self.path))
+            self._n_chunks = archive.n_chunks
+            self._n_written = archive.n_rows
+            return
+        for chunk_path in _chunk_paths(self.path, file_format):
+            chunk_path.unlink()
+        self._n_chunks = 0
+        self._n_written = 0
+        meta = {
+            "version": FORMAT_VERSION,
+            "file_format": file_format,
+            "groups": {name: list(group_columns) for name, group_columns in groups.items()},
+            "units": dict() if units is None else dict(units),
+            "metadata": dict() if metadata is None else dict(metadata),
+        }
+        _write_atomic(meta_path, lambda tmp_path: tmp_path.write_text(json.dumps(meta, indent=2)))
+
+    @property
+    def n_rows(self):
+        """Number of appended rows, written or buffered"""
+        return self._n_written + self._n_buffered
+
+    def append(self, rows):
+        """Appends rows and writes every complete chunk
+
+        Parameters
+        ----------
+        rows : array_like
+            (k, n_columns) array or a single row
+        """
+        rows = np.asarray(rows, dtype=float).reshape(-1, len(self.columns))
+        if rows.shape[0] == 0:
+            return
+        self._buffer.append(rows)
+        self._n_buffered += rows.shape[0]
+        if self._n_buffered < self.chunk_rows:
+            return
+        buffered = np.concatenate(self._buffer, axis=0)
+        n_complete = self._n_buffered // self.chunk_rows * self.chunk_rows
+        for start in range(0, n_complete, self.chunk_rows):
+            self._write_chunk(buffered[start:start + self.chunk_rows])
+        self._buffer = [buffered[n_complete:]]
+        self._n_buffered = buffered.shape[0] - n_complete
+
+    def flush(self):
+        """Writes the buffered rows as a chunk"""
+        if self._n_buffered == 0:
+            return
+        self._write_chunk(np.concatenate(self._buffer, axis=0))
+        self._buffer = []
+        self._n_buffered = 0
+
+    def close(self):
+        """Writes the buffered rows. The writer must not be used afterwards."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write_chunk(self, rows):
+        chunk_path = self.path / "chunk-{:06d}.{}".format(self._n_chunks, self.file_format)
+        if self.file_format == "npz":
+            def write(tmp_path):
+                with open(tmp_path, "wb") as chunk_file:
+                    np.savez_compressed(chunk_file, **{"c{}".format(idx): rows[:, idx]
+                                                       for idx in range(len(self.columns))})
+        else:
+            pyarrow, parquet = _import_parquet()
+
+            def write(tmp_path):
+                table = pyarrow.table({column: rows[:, idx] for idx, column in enumerate(self.columns)})
+                parquet.write_table(table, str(tmp_path), compression="zstd")
+        _write_atomic(chunk_path, write)
+        self._n_chunks += 1
+        self._n_written += rows.shape[0]
+
+
+class RunArchive:
+    """Reads a run archive written by :class:`RunArchiveWriter`. Only the requested columns are decompressed.
+
+    Parameters
+    ----------
+    path : string or pathlib.Path
+        Directory of the archive
+
+    Examples
+    --------
+    >>> archive = RunArchive("run_01")
+    >>> archive.frame("process_data").plot(x="time", y="Reactor Pressure")
+    >>> for chunk in archive.iter_chunks(columns=["time", "IDV1"]):
+    ...     print(chunk["IDV1"].max())
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        with open(self.path / _META_FILE, "r") as meta_file:
+            meta = json.load(meta_file)
+        self.file_format = meta["file_format"]
+        self.groups = meta["groups"]
+        self.units = meta["units"]
+        self.metadata = meta["metadata"]
+        self.columns = [column for group_columns in self.groups.values() for column in group_columns]
+
+    @property
+    def n_chunks(self):
+        return len(_chunk_paths(self.path, self.file_format))
+
+    @property
+    def n_rows(self):
+        return sum(len(chunk) for chunk in self.iter_chunks(columns=self.columns[:1]))
+
+    def iter_chunks(self, columns=None):
+        """Yields the chunks as DataFrames
+
+        Parameters
+        ----------
+        columns : list, optional
+            Column labels to read, by default all columns
+        """
+        columns = self.columns if columns is None else list(columns)
+        for chunk_path in _chunk_paths(self.path, self.file_format):
+            yield self._read_chunk(chunk_path, columns)
+
+    def frame(self, group=None, columns=None):
+        """Reads the archive into a single DataFrame
+
+        Parameters
+        ----------
+        group : string, optional
+            Name of a column group, e.g. 'process_data' or 'idv_data'. The time column is always included.
+        columns : list, optional
+            Column labels to read, by default all columns (of the group)
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        if columns is None:
+            columns = self.columns if group is None else self.groups[group]
+            if group is not None and "time" not in columns:
+                columns = ["time"] + columns
+        chunks = list(self.iter_chunks(columns))
+        if not chunks:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    def _read_chunk(self, chunk_path, columns):
+        if self.file_format == "npz":
+            with np.load(chunk_path) as chunk:
+                data = {column: chunk["c{}".format(self.columns.index(column))] for column in columns}
+            return pd.DataFrame(data, columns=columns)
+        _, parquet = _import_parquet()
+        return parquet.read_table(str(chunk_path), columns=columns).to_pandas()
@@ -0,0 +1,182 @@
+"""Declarative scenarios of timed setpoint ramps and idv steps, compiled into parameters of the setpoint and IDVInput
+blocks so that a whole scenario runs with as few pauses as possible and a single data fetch."""
+import json
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, Union
+
+
+@dataclass
+class SetpointRamp:
+    """Ramp (duration > 0) or step (duration = 0) of a setpoint to ``target``, starting at ``start_time`` (h)"""
+    label: str
+    target: float
+    start_time: float
+    duration: float = 0.
+
+
+@dataclass
+class IdvStep:
+    """Step of idv ``idv_idx`` (1-28) to ``value`` at ``start_time`` (h)"""
+    idv_idx: int
+    value: float
+    start_time: float
+
+
+@dataclass
+class Scenario:
+    """Scenario of ``duration`` hours with timed setpoint ramps and idv steps"""
+    duration: float
+    events: List[Union[SetpointRamp, IdvStep]] = field(default_factory=list)
+    seed: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Creates a scenario from a dict with the keys 'duration', 'seed' (optional), 'setpoints' (list of dicts with
+        the fields of SetpointRamp) and 'idv' (list of dicts with the fields of IdvStep)"""
+        events = [SetpointRamp(**ramp) for ramp in spec.get("setpoints", [])]
+        events += [IdvStep(**step) for step in spec.get("idv", [])]
+        return cls(duration=spec["duration"], events=events, seed=spec.get("seed"))
+
+    @classmethod
+    def from_json(cls, json_path):
+        """Loads a scenario from a JSON file in the format of :func:`from_dict`"""
+        with open(json_path, "r") as json_file:
+            return cls.from_dict(json.load(json_file))
+
+    def to_dict(self):
+        return {
+            "duration": self.duration,
+            "seed": self.seed,
+            "setpoints": [asdict(e) for e in self.events if isinstance(e, SetpointRamp)],
+            "idv": [asdict(e) for e in self.events if isinstance(e, IdvStep)],
+        }
+
+
+@dataclass
+class Segment:
+    """Part of a compiled scenario that runs without interruption until ``end_time``. ``setpoint_blocks`` maps
+    setpoint labels to (before, after, duration, start time) and ``idv_steps`` maps idv indices to (before, after,
+    time). Blocks that are not listed keep their parameters."""
+    end_time: float
+    setpoint_blocks: dict = field(default_factory=dict)
+    idv_steps: dict = field(default_factory=dict)
+
+
+def compile_scenario(scenario, initial_setpoints, initial_idv):
+    """Compiles a scenario into segments of block parameters.
+
+    Each setpoint block can hold one ramp and the IDVInput block one step per idv. Events run in the same segment as
+    long as no block is needed twice. A new segment starts when the previous change of a block is completed, which is
+    the only point where the simulation has to be paused. This also applies to a change that was scheduled in an
+    earlier segment and is still pending when the block is needed again, because parametrizing the block anew would
+    drop it.
+
+    Parameters
+    ----------
+    scenario : Scenario
+    initial_setpoints : dict
+        Setpoint values at t = 0 by label
+    initial_idv : array_like
+        (28,) idv values at t = 0
+
+    Returns
+    -------
+    list
+        List of Segments, the last one ends at the end of the scenario
+
+    Raises
+    ------
+    ValueError
+        If two changes of the same setpoint or idv overlap or an event lies outside of the scenario
+    """
+    values = dict(initial_setpoints)
+    idv_values = {idx + 1: float(value) for idx, value in enumerate(initial_idv)}
+    completed_at = dict()  # time at which the last change of a block is completed
+    segments = [Segment(end_time=scenario.duration)]
+    for event in sorted(scenario.events, key=lambda e: e.start_time):
+        if not 0 <= event.start_time <= scenario.duration:
+            raise ValueError("Event {} lies outside of the scenario.".format(event))
+        if isinstance(event, SetpointRamp):
+            block = ("sp", event.label)
+            end_time = event.start_time + event.duration
+        else:
+            block = ("idv", event.idv_idx)
+            end_time = event.start_time
+        segment = segments[-1]
+        segment_start = segments[-2].end_time if len(segments) > 1 else 0.
+        in_segment = segment.setpoint_blocks if block[0] == "sp" else segment.idv_steps
+        if block[1] in in_segment or completed_at.get(block, segment_start) > segment_start:
+            if completed_at[block] > event.start_time:
+                raise ValueError("Event {} overlaps with the previous change of the same block.".format(event))
+            segment.end_time = completed_at[block]
+            segment = Segment(end_time=scenario.duration)
+            segments.append(segment)
+        if isinstance(event, SetpointRamp):
+            segment.setpoint_blocks[event.label] = (values[event.label], event.target, event.duration,
+                                                    event.start_time)
+            values[event.label] = event.target
+        else:
+            segment.idv_steps[event.idv_idx] = (idv_values[event.idv_idx], event.value, event.start_time)
+            idv_values[event.idv_idx] = event.value
+        completed_at[block] = end_time
+    return segments
+
+
+def run_compiled(sim, scenario):
+    """Resets the SimInterface and runs a scenario as compiled segments. The simulation is only paused between
+    segments, the block parameters of a segment are applied with a single bridge call and the data is fetched once at
+    the end.
+
+    Parameters
+    ----------
+    sim : SimInterface
+    scenario : Scenario
+
+    Returns
+    -------
+    int
+        Number of segments
+    """
+    sim.reset(seed=scenario.seed)
+    bridge = sim._matlab_bridge
+    initial_setpoints = {label: sim.current_setpoint_value(label) for label in sim.setpoint_labels}
+    initial_idv = [sim.get_idv(idx) for idx in range(1, 29)]
+    segments = compile_scenario(scenario, initial_setpoints, initial_idv)
+    for segment in segments:
+        # setpoint labels are the names of the setpoint blocks
+        changes = {label: dict(zip(["before", "after", "duration", "start_time"], params))
+                   for label, params in segment.setpoint_blocks.items()}
+        if segment.idv_steps:
+            changes["idv"] = segment.idv_steps
+        if changes:
+            bridge.apply_changes(changes)
+        bridge.set_simpause_time(segment.end_time)
+        bridge.run_until_paused()
+    sim.update()
+    return len(segments)
+
+
+def run_segmented(sim, scenario):
+    """Resets the SimInterface and runs a scenario the interactive way, pausing and fetching the data at every event.
+    Used as reference for :func:`run_compiled`. Changes take effect one base time step late, because the simulation
+    pauses after the step at the event time.
+
+    Parameters
+    ----------
+    sim : SimInterface
+    scenario : Scenario
+    """
+    sim.reset(seed=scenario.seed)
+    current_time = 0.
+    for event in sorted(scenario.events, key=lambda e: e.start_time):
+        if event.start_time > current_time:
+            sim.simulate(event.start_time - current_time)
+            current_time = event.start_time
+        if isinstance(event, SetpointRamp):
+            sim._internal_sp_info[event.label]["setter"](before=sim.current_setpoint_value(event.label),
+                                                         after=event.target, duration=event.duration,
+                                                         start_time=current_time)
+        else:
+            sim.set_idv(event.idv_idx, event.value)
+    if scenario.duration > current_time:
+        sim.simulate(scenario.duration - current_time)
@@ -1,12 +1,14 @@
-import matlab.engine
 import pandas as pd
 import numpy as np
 import pickle
 import pathlib
-from collections.abc import Iterable
+import weakref
 
 from pytep.utils.singleton import Singleton
-from pytep.matlab_bridge import MatlabBridge
+from pytep.utils.columnstore import ColumnStore, MemmapColumnStore
+from pytep.runarchive import RunArchiveWriter
+from pytep.utils.instrumentation import Instrumentation, NULL_SPAN
+from pytep.utils.plant_metadata import plant_metadata
 
 #  setup logger
 import logging
@@ -20,19 +22,68 @@ import json
 # logger = logging.getLogger(__name__)
 
 
-class SimInterface(metaclass=Singleton):
+def make_bridge(backend="matlab", **bridge_kwargs):
+    """Creates the bridge to the simulator for a backend ('matlab', 'numpy' or 'fake'). Keyword arguments are passed on
+    to the bridge constructor. 'fake' is a MatlabBridge on a :class:`~pytep.fakeengine.FakeEngine`, the keyword
+    arguments sim_speed and call_latency are passed on to the engine."""
+    if backend == "matlab":
+        from pytep.matlab_bridge import MatlabBridge
+        return MatlabBridge(**bridge_kwargs)
+    if backend == "numpy":
+        from pytep.numpy_bridge import NumpyBridge
+        return NumpyBridge(**bridge_kwargs)
+    if backend == "fake":
+        from pytep.fakeengine import FakeEngine
+        from pytep.matlab_bridge import MatlabBridge
+        engine_kwargs = {key: bridge_kwargs.pop(key) for key in ["sim_speed", "call_latency"] if key in bridge_kwargs}
+        return MatlabBridge(engine=FakeEngine(**engine_kwargs), **bridge_kwargs)
+    raise ValueError("Unknown backend '{}'. Use 'matlab', 'numpy' or 'fake'.".format(backend))
+
+
+class SimulationSnapshot:
+    """In-memory snapshot of a simulation, created by :func:`~pytep.siminterface.SimInterface.snapshot`.
+
+    Attributes
+    ----------
+    sim_time : float
+        Simulation time in hours at which the snapshot was taken
+    operating_point : object
+        Simulation state held by the bridge (plant, controllers, random number generators and block parameters), None
+        once the snapshot was released
+    histories : dict
+        Copies of the process data, manipulated variable, setpoint, cost and idv histories
+    """
+
+    def __init__(self, sim_time, operating_point, histories):
+        self.sim_time = sim_time
+        self.operating_point = operating_point
+        self.histories = histories
+
+
+class BaseSimInterface:
+    """Simulation interface for a single plant: commands the simulation through a bridge and keeps the simulation
+    histories. Use :class:`SimInterface` (one per process) or :class:`~pytep.async_siminterface.AsyncSimInterface`.
+    """
+
+    _HISTORY_ATTRIBUTES = ["_process_data", "_manipulated_variables", "_setpoint_data", "_cost_data", "_idv_data"]
 
     def __init__(self):
         self._matlab_bridge = None
-        self._process_data = pd.DataFrame()
+        self._process_data = ColumnStore(["time"])
         self._process_units = pd.DataFrame()
-        self._manipulated_variables = pd.DataFrame()
+        self._manipulated_variables = ColumnStore([])
         self._manipulated_var_units = pd.DataFrame()
-        self._setpoint_data = pd.DataFrame()
+        self._setpoint_data = ColumnStore([])
         self._setpoint_labels = list()
-        self._cost_data = pd.DataFrame()
-        self._idv_data = pd.DataFrame()
+        self._cost_data = ColumnStore(["cost"])
+        self._idv_data = ColumnStore([])
         self._internal_sp_info = None
+        self._cursor_offset = 0
+        self._archive = None
+        self._seed = None
+        self._instrumentation = None
+        # snapshots whose operating points are held by the bridge, invalidated on reset
+        self._snapshots = weakref.WeakSet()
 
     def simulate(self, duration=None):
         """
@@ -40,9 +91,75 @@ class SimInterface(metaclass=Singleton):
         """
         if duration is not None:
             self.extend_simulation(duration)
-        self._matlab_bridge.run_until_paused()
+        with self._span("simulate.run"):
+            self._matlab_bridge.run_until_paused()
         self.update()
 
+    def stream(self, step, until, keep_history=False):
+        """
+        Simulates until the absolute simulation time `until` in segments of `step` hours and yields the new rows of
+        every segment. Commands such as set_idv and ramp_setpoint can be issued between two yields, they take effect
+        in the next segment.
+
+        By default, the SimInterface only keeps the most recent row of the histories (enough for current_sim_time,
+        current_setpoint_value, get_idv, ...), so the memory used does not grow with the simulated time.
+
+        Parameters
+        ----------
+        step: float
+            Duration of a segment in hours.
+        until: float
+            Absolute simulation time in hours at which the stream ends.
+        keep_history: bool
+            Keep the full histories in process_data, manipulated_variables etc., by default False.
+
+        Yields
+        ------
+        chunk: np.array
+            One row per new sample, with the columns of :func:`~backend.siminterface.SimInterface.stream_labels`
+            (time, process variables, manipulated variables, setpoints, cost, idv).
+
+        Examples
+        --------
+        >>> for chunk in si.stream(step=0.5, until=200):
+        ...     if chunk[-1, si.stream_labels().index("Reactor Pressure")] > 2900:
+        ...         si.set_idv(6, 0)
+        """
+        while self.current_sim_time() < until - 1e-9:
+            self._matlab_bridge.set_simpause_time(self.current_sim_time() + min(step, until - self.current_sim_time()))
+            self._matlab_bridge.run_until_paused()
+            if self.current_sim_time() == 0:
+                self._init_internal_variables()
+                chunk = np.hstack([getattr(self, name).to_array() for name in self._HISTORY_ATTRIBUTES])
+            else:
+                chunk, _ = self._matlab_bridge.fetch_since(self._fetch_cursor())
+                self._append_recent_data(chunk)
+            if not keep_history:
+                self._truncate_histories()
+            if len(chunk) == 0:
+                return  # the simulation has stopped
+            yield chunk
+
+    def stream_labels(self):
+        """
+        Returns the column labels of the chunks yielded by :func:`~backend.siminterface.SimInterface.stream`.
+
+        Returns
+        -------
+        labels: list
+        """
+        return [label for name in self._HISTORY_ATTRIBUTES for label in getattr(self, name).columns]
+
+    def _truncate_histories(self):
+        """Keeps only the most recent row of every history"""
+        cursor = self._fetch_cursor()
+        for name in self._HISTORY_ATTRIBUTES:
+            history = getattr(self, name)
+            last_row = history.last()
+            history.clear()
+            history.append(last_row)
+        self._cursor_offset = len(self._process_data) - cursor
+
     def update(self):
         """
         Fetches current simulation data from the MATLAB workspace and updates process_data, setpoint_data, idv_data and
@@ -55,84 +172,313 @@ class SimInterface(metaclass=Singleton):
             Warning("Current sim time is empty. This should not happen with proper initialization. "
                     "Current sim time is set to 0.")
             current_sim_time = 0
-        if current_sim_time == 0:
-            self._init_internal_variables()
-        else:
-            self._matlab_bridge.isolate_recent_data_in_workspace(current_sim_time)
-            self._update_process_data()
-            self._update_setpoint_data()
-            self._update_idv_data()
-            self._update_cost_data()
-            self._update_manipulated_variables()
+        with self._span("update"):
+            if current_sim_time == 0:
+                self._init_internal_variables()
+            else:
+                with self._span("update.fetch"):
+                    recent_data, _ = self._matlab_bridge.fetch_since(self._fetch_cursor())
+                self._append_recent_data(recent_data)
+
+    def enable_instrumentation(self, max_events=100000):
+        """
+        Starts recording the count, latency and transferred bytes of every engine call and the duration of the phases
+        of update(), simulate() and save_all(). Without instrumentation, the calls are not wrapped at all.
 
-    def reset(self):
+        Parameters
+        ----------
+        max_events: int
+            Maximum number of calls kept for the timeline of :func:`~backend.siminterface.SimInterface.write_trace`,
+            by default 100000. The statistics include all calls.
+
+        Returns
+        -------
+        instrumentation: pytep.utils.instrumentation.Instrumentation
         """
-        Resets the simulation environment to it's initial condition. All unsaved simulation results are lost on reset.
-        On reset, the active simulation is stopped, the MATLAB workspace is cleared fully and then reloaded from an
-        initialization script in MATLAB.
-        :func:`~backend.siminterface.SimInterface.update` is called to reset the internal variables of the SimInterface.
+        self._instrumentation = Instrumentation(max_events)
+        self._matlab_bridge.set_instrumentation(self._instrumentation)
+        return self._instrumentation
+
+    def disable_instrumentation(self):
         """
-        self._matlab_bridge.stop_simulation()
-        self._matlab_bridge.reset_workspace()
-        self._matlab_bridge.reset_simulink_blocks()
-        self._init_internal_variables()
+        Stops recording the calls. The statistics recorded so far are kept until the next enable_instrumentation().
+        """
+        if self._instrumentation is not None:
+            self._instrumentation.enabled = False
+            self._matlab_bridge.set_instrumentation(None)
 
-    @staticmethod
-    def setup():
+    def stats(self):
         """
-        Setup for the SimInterface. The first initialization of SimInterface should be done using this method. Any
-        following initialization should be done using the regular constructor, which will return the already existing
-        SimInterface object (SimInterface is a singleton class).
+        Statistics of the recorded calls, see :func:`~backend.siminterface.SimInterface.enable_instrumentation`.
 
         Returns
         -------
-        simulation interface: backend.siminterface.SimInterface()
-            Fully initialized simulation interface for the Tennessee Eastman Simulator.
+        stats: dict
+            Call names mapped to dicts with 'category', 'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max' (in
+            seconds) and 'bytes'. Engine calls have the category 'engine', the phases of the SimInterface 'pytep'.
+            Empty if the instrumentation was never enabled.
         """
-        si = SimInterface()
-        mb = MatlabBridge()
-        si._matlab_bridge = mb
-        si._load_dataframes()
-        si._setup_internal_sp_info()
-        si.reset()
-        return si
+        if self._instrumentation is None:
+            return dict()
+        return self._instrumentation.stats()
+
+    def write_trace(self, path):
+        """
+        Writes the timeline of the recorded calls as Chrome trace JSON, to be opened in chrome://tracing or
+        https://ui.perfetto.dev.
+
+        Parameters
+        ----------
+        path: pathlib.Path, string
+            Path of the JSON file.
+        """
+        if self._instrumentation is None:
+            raise RuntimeError("The instrumentation was never enabled, call enable_instrumentation() first.")
+        self._instrumentation.write_chrome_trace(path)
+
+    def _span(self, name):
+        if self._instrumentation is None:
+            return NULL_SPAN
+        return self._instrumentation.span(name)
+
+    def reset(self, seed=None, reload=False):
+        """
+        Resets the simulation environment to it's initial condition. All unsaved simulation results are lost on reset.
+        On reset, the active simulation is stopped and the MATLAB workspace is restored from a copy of the initialized
+        workspace, which is kept in MATLAB at the first reset. Only the setpoint and idv block parameters that were
+        changed during the run are reset. All snapshots are released.
+        :func:`~backend.siminterface.SimInterface.update` is called to reset the internal variables of the SimInterface.
+
+        Parameters
+        ----------
+        seed: int, optional
+            Seed of the random number generators for the next run. By default the seed given to setup(), or the seed
+            of the workspace (1000). See :func:`pytep.utils.seeds.derive_seed` for seeds of Monte Carlo runs.
+        reload: bool, optional
+            Clear the workspace fully and reload it from the initialization script in MATLAB, then reinitialize every
+            block, instead of restoring the copy. By default False.
+        """
+        self.stop_archive()
+        self._matlab_bridge.stop_simulation()
+        if reload:
+            self._matlab_bridge.reset_workspace()
+            self._matlab_bridge.reset_simulink_blocks()
+        else:
+            self._matlab_bridge.restore_initial_state()
+        # the bridge has dropped the operating points of all snapshots
+        for snapshot in list(self._snapshots):
+            snapshot.operating_point = None
+        self._snapshots.clear()
+        seed = self._seed if seed is None else seed
+        if seed is not None:
+            self._matlab_bridge.set_workspace_variable("seed", float(seed))
+        self._init_internal_variables()
+
+    def _attach_bridge(self, bridge, save_interval=None, signals=None, seed=None):
+        """Connects the interface to a bridge, configures the logging and resets the simulation"""
+        self._matlab_bridge = bridge
+        self._seed = seed
+        self._load_dataframes()
+        self._setup_internal_sp_info()
+        self._configure_logging(save_interval, signals)
+        self.reset()
+
+    def _configure_logging(self, save_interval=None, signals=None):
+        """Sets the save interval of the bridge and restricts the histories and the fetched columns to the labels in
+        signals. The time column is always logged."""
+        if save_interval is not None:
+            self._matlab_bridge.set_save_interval(save_interval)
+        if signals is None:
+            self._matlab_bridge.set_logged_columns(None)
+            return
+        histories = [getattr(self, name) for name in self._HISTORY_ATTRIBUTES]
+        all_labels = [label for history in histories for label in history.columns]
+        unknown = set(signals) - set(all_labels)
+        if unknown:
+            raise ValueError("Unknown signals: {}".format(sorted(unknown)))
+        selected = set(signals) | {"time"}
+        for name, history in zip(self._HISTORY_ATTRIBUTES, histories):
+            setattr(self, name, ColumnStore([label for label in history.columns if label in selected]))
+        self._matlab_bridge.set_logged_columns([idx for idx, label in enumerate(all_labels) if label in selected])
 
     def save_all(self, save_dir):
         """
         Saves the time, process data, manipulated variables, setpoint data, cost data and idv data as separate pickled
         dataframes in the specified save directory. Multiple saves in the same save_dir will result in older files being
-        overwritten.
+        overwritten. For long runs, :func:`~backend.siminterface.SimInterface.start_archive` writes the data
+        incrementally instead.
         Parameters
         ----------
         save_dir: pathlib.Path, string
             Directory in which the simulation data should be saved.
         """
 
-        pd_save_path = pathlib.Path(save_dir) / "process_data.pkl"
-        self._process_data.to_pickle(pd_save_path)
+        with self._span("save_all"):
+            pd_save_path = pathlib.Path(save_dir) / "process_data.pkl"
+            self._process_data.frame().to_pickle(pd_save_path)
 
-        sp_save_path = pathlib.Path(save_dir) / "setpoint_data.pkl"
-        self._setpoint_data.to_pickle(sp_save_path)
+            sp_save_path = pathlib.Path(save_dir) / "setpoint_data.pkl"
+            self._setpoint_data.frame().to_pickle(sp_save_path)
 
-        idv_save_path = pathlib.Path(save_dir) / "idv_data.pkl"
-        self._idv_data.to_pickle(idv_save_path)
+            idv_save_path = pathlib.Path(save_dir) / "idv_data.pkl"
+            self._idv_data.frame().to_pickle(idv_save_path)
 
-        cost_save_path = pathlib.Path(save_dir) / "cost_data.pkl"
-        self._cost_data.to_pickle(cost_save_path)
+            cost_save_path = pathlib.Path(save_dir) / "cost_data.pkl"
+            self._cost_data.frame().to_pickle(cost_save_path)
 
-        manipulated_vars_path = pathlib.Path(save_dir) / "manipulated_vars.pkl"
-        self._manipulated_variables.to_pickle(manipulated_vars_path)
+            manipulated_vars_path = pathlib.Path(save_dir) / "manipulated_vars.pkl"
+            self._manipulated_variables.frame().to_pickle(manipulated_vars_path)
+
+    def start_archive(self, path, chunk_rows=2000, file_format="npz", metadata=None):
+        """
+        Starts archiving the simulation data to a chunked, compressed run archive. The data simulated so far is
+        written first, afterwards the new rows of every update are appended. Time, process data, manipulated
+        variables, setpoints, cost and idv data are stored as aligned columns, the units are stored as metadata.
+        Complete chunks survive a crash of the run. The archive is closed by
+        :func:`~backend.siminterface.SimInterface.stop_archive`, reset() and restore().
+
+        Parameters
+        ----------
+        path: pathlib.Path, string
+            Directory of the archive. An existing archive in the directory is replaced.
+        chunk_rows: int
+            Number of rows per chunk, by default 2000 (100 simulated hours).
+        file_format: string
+            'npz' or 'parquet' (requires pyarrow), by default 'npz'.
+        metadata: dict, optional
+            JSON serializable information about the run.
+
+        Returns
+        -------
+        writer: pytep.runarchive.RunArchiveWriter
+        """
+        self.stop_archive()
+        histories = [getattr(self, name) for name in self._HISTORY_ATTRIBUTES]
+        groups = {name.lstrip("_"): history.columns for name, history in zip(self._HISTORY_ATTRIBUTES, histories)}
+        units = dict(self._process_units.iloc[0]) if not self._process_units.empty else dict()
+        if not self._manipulated_var_units.empty:
+            units.update(self._manipulated_var_units.iloc[0])
+        self._archive = RunArchiveWriter(path, groups, units=units, metadata=metadata, chunk_rows=chunk_rows,
+                                         file_format=file_format)
+        self._archive_history()
+        return self._archive
+
+    def _archive_history(self):
+        """Appends the rows of the histories that are not archived yet"""
+        # before the first simulation, the histories hold a placeholder row that the first update replaces
+        if self._archive is None or len(self._process_data) == 0 or self.current_sim_time() == 0:
+            return
+        histories = [getattr(self, name) for name in self._HISTORY_ATTRIBUTES]
+        rows = np.hstack([history.to_array() for history in histories])
+        self._archive.append(rows[self._archive.n_rows:])
+
+    def stop_archive(self):
+        """
+        Writes the remaining rows and closes the archive started with
+        :func:`~backend.siminterface.SimInterface.start_archive`.
+        """
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def use_memmap_history(self, history_dir, chunk_rows=8192):
+        """
+        Moves the process data, manipulated variable, setpoint, cost and idv histories into memory-mapped files in
+        history_dir, so that the resident memory stays bounded for very long simulations. The files grow by chunk_rows
+        rows at a time. process_data, manipulated_variables etc. then return DataFrames on top of the mapped data.
+        Another process can follow the run read-only with
+        ``MemmapColumnStore.open(history_dir / "process_data.dat")``. Files of a previous run in history_dir are
+        replaced.
+
+        Parameters
+        ----------
+        history_dir: pathlib.Path, string
+            Directory of the history files.
+        chunk_rows: int
+            Number of rows the files grow by, by default 8192 (about 400 simulated hours).
+        """
+        history_dir = pathlib.Path(history_dir)
+        for name in self._HISTORY_ATTRIBUTES:
+            history = getattr(self, name)
+            if not history.columns:
+                continue  # no logged signals, nothing to map
+            store = MemmapColumnStore(history.columns, history_dir / (name.lstrip("_") + ".dat"), chunk_rows)
+            store.append(history.to_array())
+            setattr(self, name, store)
+
+    def snapshot(self):
+        """
+        Captures the state of the paused simulation in memory: plant state, controller and integrator states, setpoint
+        and idv block parameters, random number generator state and the simulation histories. The simulation can be
+        resumed from the snapshot any number of times with :func:`~backend.siminterface.SimInterface.restore`, e.g.
+        to branch into several fault scenarios after a common warm-up.
+
+        The operating point is held by the bridge (in the MATLAB session for the MATLAB backend) until the snapshot is
+        released with :func:`~backend.siminterface.SimInterface.release` or the simulation is reset.
+
+        Returns
+        -------
+        snapshot: SimulationSnapshot
+        """
+        histories = {name: getattr(self, name).copy() for name in self._HISTORY_ATTRIBUTES}
+        snapshot = SimulationSnapshot(self.current_sim_time(), self._matlab_bridge.save_operating_point(), histories)
+        self._snapshots.add(snapshot)
+        return snapshot
+
+    def release(self, snapshot):
+        """
+        Frees the operating point of a snapshot held by the bridge. The snapshot cannot be restored afterwards.
+        Releasing a snapshot twice has no effect.
+
+        Parameters
+        ----------
+        snapshot: SimulationSnapshot
+        """
+        if snapshot.operating_point is not None:
+            self._matlab_bridge.release_operating_point(snapshot.operating_point)
+            snapshot.operating_point = None
+        self._snapshots.discard(snapshot)
+
+    def restore(self, snapshot):
+        """
+        Returns the simulation to a snapshot taken with :func:`~backend.siminterface.SimInterface.snapshot`. The next
+        call to :func:`~backend.siminterface.SimInterface.simulate` continues from the snapshot time. Data simulated
+        after the snapshot is discarded.
+
+        Parameters
+        ----------
+        snapshot: SimulationSnapshot
+
+        Raises
+        ------
+        ValueError
+            If the snapshot was released or the simulation was reset after the snapshot was taken
+        """
+        if snapshot.operating_point is None:
+            raise ValueError("The snapshot was released and cannot be restored.")
+        self.stop_archive()
+        logged_rows = self._matlab_bridge.restore_operating_point(snapshot.operating_point)
+        for name, history in snapshot.histories.items():
+            # the rows are copied into the existing stores, which may be memory-mapped
+            getattr(self, name).clear()
+            getattr(self, name).append(history.to_array())
+        # rows of the histories that are not part of the workspace logs after the restart
+        self._cursor_offset = len(self._process_data) - logged_rows
+
+    def _fetch_cursor(self):
+        return len(self._process_data) - self._cursor_offset
 
     def _init_internal_variables(self):
         """
         Fetches current simulation data from the MATLAB workspace and updates process_data, setpoint_data, idv_data and
         cost_data.
         """
-        self._init_process_data()
-        self._init_setpoint_data()
-        self._init_idv_data()
-        self._init_cost_data()
-        self._init_manipulated_variables()
+        self._cursor_offset = 0
+        data, _ = self._matlab_bridge.fetch_since(0)
+        for name in self._HISTORY_ATTRIBUTES:
+            getattr(self, name).clear()
+        self._split_into_histories(data)
+        self._archive_history()
 
     def extend_simulation(self, duration=5):
         """
@@ -143,178 +489,42 @@ class SimInterface(metaclass=Singleton):
         duration: float
             Additional simulation time in hours.
         """
-        time = self._matlab_bridge.get_workspace_variable("tout")
-        if isinstance(time, Iterable):
-            current_time = time[-1]
-        else:
-            current_time = time
+        # the time of the last update, the logs in the workspace still end at the old time after a restore
+        try:
+            current_time = self.current_sim_time()
+        except IndexError:
+            current_time = 0.
         self._matlab_bridge.set_simpause_time(current_time + duration)
 
-    def _update_process_data(self):
-        try:
-            new_process_data = self._fetch_new_process_data()
-            if new_process_data.size == 0:
-                return  # no new process data
-            new_process_data = pd.DataFrame(
-                data=new_process_data, columns=self._process_data.columns
-            )
-            self._process_data = pd.concat([self._process_data, new_process_data], axis=0)
-        except ValueError:
-            pass
-
-    def _init_process_data(self):
-        new_process_data = self._fetch_process_data()
-        new_process_data = pd.DataFrame(
-            data=new_process_data, columns=self._process_data.columns
-        )
-        self._process_data = new_process_data
-
-    def _update_manipulated_variables(self):
-        try:
-            new_manipulated_variables = self._fetch_new_manipulated_variables()
-            if new_manipulated_variables.size == 0:
-                return  # no new manipulated variables
-            new_manipulated_variables = pd.DataFrame(
-                data=new_manipulated_variables, columns=self._manipulated_variables.columns
-            )
-            self._manipulated_variables = pd.concat([self._manipulated_variables, new_manipulated_variables], axis=0)
-        except ValueError:
-            pass
-
-    def _init_manipulated_variables(self):
-        new_manipulated_variables = self._fetch_manipulated_variables()
-        new_manipulated_variables = pd.DataFrame(
-            data=new_manipulated_variables, columns=self._manipulated_variables.columns
-        )
-        self._manipulated_variables = new_manipulated_variables
-
-    def _update_setpoint_data(self):
-        try:
-            new_data = self._fetch_new_setpoint_data()
-            new_data = pd.DataFrame(
-                data=new_data, columns=self._setpoint_data.columns
-            )
-            self._setpoint_data = pd.concat([self._setpoint_data, new_data], axis=0)
-        except ValueError:
-            pass  # This is executed if there is no new data since the last update
-
-    def _init_setpoint_data(self):
-        setpoint_data = self._fetch_setpoint_data()
-        setpoint_data = pd.DataFrame(
-            data=setpoint_data, columns=self._setpoint_data.columns
-        )
-        self._setpoint_data = setpoint_data
-
-    def _update_cost_data(self):
-        try:
-            new_data = self._fetch_new_cost_data()
-            new_data = pd.DataFrame(
-                data=new_data, columns=self._cost_data.columns
-            )
-            self._cost_data = pd.concat([self._cost_data, new_data], axis=0)
-        except ValueError:
-            pass
-
-    def _init_cost_data(self):
-        cost_data = self._fetch_cost_data()
-        if isinstance(cost_data, float):
-            cost_data = [cost_data]
-        cost_data = pd.DataFrame(
-            data=cost_data, columns=self._cost_data.columns
-        )
-        self._cost_data = cost_data
-
-    def _update_idv_data(self):
-        try:
-            new_data = self._fetch_new_idv_data()
-            new_data = pd.DataFrame(
-                data=new_data, columns=self._idv_data.columns
-            )
-            self._idv_data = pd.concat([self._idv_data, new_data], axis=0)
-        except ValueError:
-            pass
-
-    def _init_idv_data(self):
-        idv_data = self._fetch_idv_data()
-        idv_data = pd.DataFrame(
-            data=idv_data, columns=self._idv_data.columns
-        )
-        self._idv_data = idv_data
-
-    def _fetch_new_process_data(self):
-        time = self._matlab_bridge.get_workspace_variable("latest_tout")
-        if time.size == 0:
-            return np.asarray([])  # no new processdata
-        if not isinstance(time, Iterable):
-            time = np.asarray(time).reshape(1, 1)
-        process_vars = self._matlab_bridge.get_workspace_variable("latest_simout")
-        time_and_pv = np.hstack((time, process_vars))
-        return time_and_pv
-
-    def _fetch_process_data(self):
-        time = self._matlab_bridge.get_workspace_variable("tout")
-        if not isinstance(time, Iterable):
-            time = np.asarray(time).reshape(1, 1)
-        process_vars = self._matlab_bridge.get_workspace_variable("simout")
-        time_and_pv = np.hstack((time, process_vars))
-        return time_and_pv
-
-    def _fetch_new_manipulated_variables(self):
-        vars = self._matlab_bridge.get_workspace_variable("latest_xmv")
-        return vars
-
-    def _fetch_manipulated_variables(self):
-        vars = self._matlab_bridge.get_workspace_variable("xmv")
-        return vars
-
-    def _fetch_new_setpoint_data(self):
-        setpoints = self._matlab_bridge.get_workspace_variable("latest_setpoints")
-        return setpoints
-
-    def _fetch_setpoint_data(self):
-        setpoints = self._matlab_bridge.get_workspace_variable("setpoints")
-        return setpoints
-
-    def _fetch_new_cost_data(self):
-        # TODO: Check if this fails if only one new time is returned or if no new data is present
-        cost = self._matlab_bridge.get_workspace_variable("latest_op_cost")
-        return cost
-
-    def _fetch_cost_data(self):
-        cost = self._matlab_bridge.get_workspace_variable("OpCost")
-        return cost
-
-    def _fetch_new_idv_data(self):
-        idvs = self._matlab_bridge.get_workspace_variable("latest_idv_list")
-        return idvs
-
-    def _fetch_idv_data(self):
-        idvs = self._matlab_bridge.get_workspace_variable("idv_list")
-        return idvs
+    def _append_recent_data(self, recent_data):
+        """Appends the matrix [time pv xmv setpoints cost idv] of new samples to the histories and the archive."""
+        with self._span("update.append"):
+            recent_data = self._split_into_histories(recent_data)
+        if self._archive is not None:
+            with self._span("update.archive"):
+                self._archive.append(recent_data)
+
+    def _split_into_histories(self, data):
+        """Splits the matrix [time pv xmv setpoints cost idv] (logged columns only) into the histories."""
+        histories = [getattr(self, name) for name in self._HISTORY_ATTRIBUTES]
+        widths = [len(history.columns) for history in histories]
+        data = np.asarray(data, dtype=float).reshape(-1, sum(widths))
+        if data.shape[0] == 0:
+            return data  # no new data
+        for history, first_col, width in zip(histories, np.cumsum([0] + widths[:-1]), widths):
+            history.append(data[:, first_col:first_col + width])
+        return data
 
     def _load_dataframes(self):
-        setupinfo_path = pathlib.Path(__file__).parent / "setupinfo"
-        with open(setupinfo_path / "process_var_labels.pkl", "rb") as pv_label_file:
-            pv_labels = pickle.load(pv_label_file)
-        self._process_data = pd.DataFrame(columns=pv_labels)
-        with open(setupinfo_path / "xmv_labels.pkl", "rb") as xmv_label_file:
-            xmv_labels = pickle.load(xmv_label_file)
-        self._manipulated_variables = pd.DataFrame(columns=xmv_labels)
-        with open(setupinfo_path / "setpoint_labels.pkl", "rb") as setpoint_label_file:
-            setpoint_labels = pickle.load(setpoint_label_file)
-        self._setpoint_data = pd.DataFrame(columns=setpoint_labels)
-        self._setpoint_labels = setpoint_labels
-        with open(setupinfo_path / "process_var_units.pkl", "rb") as pv_units_file:
-            pv_units = pickle.load(pv_units_file)
-        self._process_units = pd.DataFrame(data=[pv_units], columns=pv_labels)
-        with open(setupinfo_path / "xmv_units.pkl", "rb") as xmv_units_file:
-            xmv_units = pickle.load(xmv_units_file)
-        self._manipulated_var_units = pd.DataFrame(data=[xmv_units], columns=xmv_labels)
-        with open(setupinfo_path / "idv_labels.pkl", "rb") as idv_label_file:
-            idv_labels = pickle.load(idv_label_file)
-        self._idv_data = pd.DataFrame(columns=idv_labels)
-        # pure dummy init for cost data
-        self._cost_data = pd.DataFrame(data=[0], columns=["cost"])
+        metadata = plant_metadata()
+        self._process_data = ColumnStore(metadata["process_var_labels"])
+        self._manipulated_variables = ColumnStore(metadata["xmv_labels"])
+        self._setpoint_data = ColumnStore(metadata["setpoint_labels"])
+        self._setpoint_labels = metadata["setpoint_labels"]
+        self._process_units = metadata["process_var_units"]
+        self._manipulated_var_units = metadata["xmv_units"]
+        self._idv_data = ColumnStore(metadata["idv_labels"])
+        self._cost_data = ColumnStore(["cost"])
 
     def process_data_labels(self):
         """
@@ -325,7 +535,7 @@ class SimInterface(metaclass=Singleton):
         process_data_columns : list
             List of processdata labels
         """
-        return self._process_data.columns.tolist()
+        return list(self._process_data.columns)
 
     def timed_var(self, var_name):
         """
@@ -343,8 +553,8 @@ class SimInterface(metaclass=Singleton):
             Dataframe with columns ["time", "var_name"]
         """
         if var_name == "time":
-            return self._process_data[["time"]]
-        return self._process_data[["time", var_name]]
+            return self.process_data[["time"]]
+        return self.process_data[["time", var_name]]
 
     @property
     def process_data(self):
@@ -355,7 +565,7 @@ class SimInterface(metaclass=Singleton):
         -------
         process_data: pandas dataframe
         """
-        return self._process_data
+        return self._process_data.frame()
     
     def current_process_data(self):
         """
@@ -374,7 +584,7 @@ class SimInterface(metaclass=Singleton):
         -------
         manipulated_variables: pandas dataframe
         """
-        return self._manipulated_variables
+        return self._manipulated_variables.frame()
 
     def current_manipulated_variables(self):
         """
@@ -393,7 +603,7 @@ class SimInterface(metaclass=Singleton):
         -------
         simulation_time: float
         """
-        return self._process_data["time"].values[-1]
+        return self._process_data.last_value("time")
 
     def operating_cost(self):
         """
@@ -404,7 +614,7 @@ class SimInterface(metaclass=Singleton):
         Operating cost: pandas dataframe
             Pandas dataframe containing a "Cost" column.
         """
-        return self._cost_data
+        return self._cost_data.frame()
 
     def current_operating_cost(self):
         return self._cost_data.tail(1)
@@ -439,7 +649,7 @@ class SimInterface(metaclass=Singleton):
         delay:
             Delay in hours before the idv value is changed from it's current value.
         """
-        current_time = list(self._process_data['time'])[-1]
+        current_time = self.current_sim_time()
         values_before_step, values_after_step, step_times = self._matlab_bridge.get_idv_input_block_params()
         values_after_step[0, idv_idx-1] = value
         step_times[0, idv_idx-1] = current_time + delay
@@ -461,7 +671,12 @@ class SimInterface(metaclass=Singleton):
                 Value between 0 and 1
         """
         idv_label = "IDV{}".format(idv_idx)
-        return self._idv_data[idv_label].values[-1]
+        if idv_label not in self._idv_data.columns:
+            # not logged, evaluated from the parameters of the IDVInput block
+            values_before, values_after, step_times = self._matlab_bridge.get_idv_input_block_params()
+            after_step = self.current_sim_time() >= step_times[0, idv_idx - 1]
+            return (values_after if after_step else values_before)[0, idv_idx - 1]
+        return self._idv_data.last_value(idv_label)
 
     def _log_idv_change(self, idv_idx, target_val, start_time):
         log = self._idv_change_log_message(idv_idx, target_val, start_time)
@@ -480,16 +695,25 @@ class SimInterface(metaclass=Singleton):
     # setpoint commands
 
     def current_setpoint_value(self, setpoint_label):
-        cur = self._setpoint_data.tail(1)
-        cur_val = cur[setpoint_label].values[0]
-        return cur_val
+        if setpoint_label not in self._setpoint_data.columns:
+            # not logged, evaluated from the parameters of the setpoint block
+            before, after, duration, start_time = self._matlab_bridge.get_sp_block_params(setpoint_label)
+            elapsed = self.current_sim_time() - start_time
+            if elapsed < 0:
+                return before
+            if duration > 0:
+                # the ramp block of the model ramps over at least 0.1 h
+                value = before + (after - before) * elapsed / max(duration, 0.1)
+                return min(max(value, min(before, after)), max(before, after))
+            return after
+        return self._setpoint_data.last_value(setpoint_label)
 
     def current_setpoints(self):
         return self._setpoint_data.tail(1)
 
     @property
     def setpoint_labels(self):
-        return self._setpoint_labels
+        return list(self._setpoint_labels)
 
     def _setup_internal_sp_info(self):
         """Generates a dictionary containing setpoint labels as keys and correponding utility functions (getter/setter)
@@ -779,8 +1003,8 @@ class SimInterface(metaclass=Singleton):
         delay (float): Delay until the ramp transition is initiated
         """
 
-        current_sp_val = list(self._setpoint_data[setpoint_label])[-1]
-        current_time = list(self._process_data['time'])[-1]
+        current_sp_val = self.current_setpoint_value(setpoint_label)
+        current_time = self.current_sim_time()
         sp_set_func = self._internal_sp_info[setpoint_label]["setter"]
 
         if not any([target_val, duration]):
@@ -818,5 +1042,56 @@ class SimInterface(metaclass=Singleton):
         return log
 
 
+class SimInterface(BaseSimInterface, metaclass=Singleton):
 
+    @staticmethod
+    def setup(backend="matlab", save_interval=None, signals=None, seed=None, singleton=True, **bridge_kwargs):
+        """
+        Setup for the SimInterface. The first initialization of SimInterface should be done using this method. Any
+        following initialization should be done using the regular constructor, which will return the already existing
+        SimInterface object (SimInterface is a singleton class).
 
+        With singleton=False, setup returns a new, independent SimInterface with its own bridge and histories instead,
+        so that one process can run several plants side by side. The labels and units of the plant are loaded once
+        per process and shared by all instances (see :func:`~pytep.utils.plant_metadata.plant_metadata`).
+
+        Parameters
+        ----------
+        backend: string
+            'matlab' to simulate the Simulink model through the MATLAB engine, 'numpy' to simulate the same model with
+            the NumPy implementation, which does not require MATLAB, 'fake' for synthetic data from a
+            :class:`~pytep.fakeengine.FakeEngine` (tests and benchmarks). By default 'matlab'.
+        save_interval: float, optional
+            Sample time of the logged data in hours (Ts_save), a multiple of the base sample time of 0.0005 h. By
+            default 0.05 h. Simulation durations should be multiples of the save interval.
+        signals: list, optional
+            Labels of the logged signals (process variables, manipulated variables, setpoints, 'cost' and idv), by
+            default all. Only these columns are transferred from the simulator and kept in the histories, e.g.
+            process_data_labels() returns 'time' and the selected process variables.
+        seed: int, optional
+            Seed of the random number generators, used for every run after a reset. By default the seed of the
+            workspace (1000).
+        bridge_kwargs:
+            Passed on to the bridge, e.g. session="pytep" to connect the MatlabBridge to a running shared MATLAB
+            session instead of starting a new engine.
+        singleton: bool, optional
+            Set up the SimInterface shared by the process, which SimInterface() returns, or a new independent one
+            (False). By default True.
+
+        Returns
+        -------
+        simulation interface: backend.siminterface.SimInterface()
+            Fully initialized simulation interface for the Tennessee Eastman Simulator.
+
+        Examples
+        --------
+        >>> reference = SimInterface.setup(backend="numpy", singleton=False)
+        >>> faulted = SimInterface.setup(backend="numpy", singleton=False)
+        >>> faulted.set_idv(1, 1)
+        >>> reference.simulate(10)
+        >>> faulted.simulate(10)
+        """
+        si = SimInterface() if singleton else SimInterface.new_instance()
+        si._attach_bridge(make_bridge(backend, **bridge_kwargs), save_interval=save_interval, signals=signals,
+                          seed=seed)
+        return si
@@ -0,0 +1,13 @@
+function [] = apply_block_changes(block_names, sp_params, idv_params)
+    % sets the setpoint blocks in block_names to the rows [before, after,
+    % duration, start time] of sp_params and, unless idv_params is empty,
+    % the IDVInput block to [before; after; step times]
+    for k = 1:numel(block_names)
+        set_sp_generic(block_names{k}, sp_params(k, 1), sp_params(k, 2), ...
+            sp_params(k, 3), sp_params(k, 4));
+    end
+    if ~isempty(idv_params)
+        set_idv_input_block_params(idv_params(1, :), idv_params(2, :), ...
+            idv_params(3, :));
+    end
+end
@@ -0,0 +1,10 @@
+function [] = capture_initial_workspace()
+    % stores a copy of all variables of the base workspace, to be restored
+    % by restore_initial_workspace
+    names = evalin('base', 'who');
+    workspace = struct();
+    for k = 1:numel(names)
+        workspace.(names{k}) = evalin('base', names{k});
+    end
+    initial_workspace_store('set', workspace);
+end
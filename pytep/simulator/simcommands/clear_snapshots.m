@@ -0,0 +1,4 @@
+function [] = clear_snapshots()
+    % removes all snapshots from the snapshot store
+    snapshot_store('clear');
+end
@@ -0,0 +1,5 @@
+function [] = export_snapshot(key, file_name)
+    % writes the snapshot with the given key to a .mat file
+    snapshot = snapshot_store('get', key);
+    save(file_name, 'snapshot', '-mat');
+end
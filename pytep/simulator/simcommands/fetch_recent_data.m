@@ -0,0 +1,13 @@
+function data = fetch_recent_data(t_current)
+    % returns all simulation data that was logged after t_current in one
+    % matrix with the columns [tout simout xmv setpoints OpCost idv_list]
+    tout = evalin('base', 'tout');
+    recent = tout > t_current;
+    simout = evalin('base', 'simout');
+    xmv = evalin('base', 'xmv');
+    setpoints = evalin('base', 'setpoints');
+    op_cost = evalin('base', 'OpCost');
+    idv_list = evalin('base', 'idv_list');
+    data = [tout(recent), simout(recent, :), xmv(recent, :), ...
+        setpoints(recent, :), op_cost(recent), idv_list(recent, :)];
+end
@@ -0,0 +1,19 @@
+function [data, cursor] = fetch_since(cursor, columns)
+    % returns the logged rows after row number cursor in one matrix with
+    % the columns [tout simout xmv setpoints OpCost idv_list] and the
+    % number of logged rows as the new cursor. If columns is given and not
+    % empty, only these columns of the matrix are returned.
+    tout = evalin('base', 'tout');
+    rows = (cursor + 1):numel(tout);
+    simout = evalin('base', 'simout');
+    xmv = evalin('base', 'xmv');
+    setpoints = evalin('base', 'setpoints');
+    op_cost = evalin('base', 'OpCost');
+    idv_list = evalin('base', 'idv_list');
+    data = [tout(rows), simout(rows, :), xmv(rows, :), ...
+        setpoints(rows, :), op_cost(rows), idv_list(rows, :)];
+    if nargin > 1 && ~isempty(columns)
+        data = data(:, columns);
+    end
+    cursor = numel(tout);
+end
@@ -0,0 +1,12 @@
+function [sp_params, idv_params] = get_block_params(block_names)
+    % returns the parameters of the setpoint blocks in block_names (one row
+    % [before, after, duration, start time] per block) and of the IDVInput
+    % block (3 by 28, [before; after; step times])
+    sp_params = zeros(numel(block_names), 4);
+    for k = 1:numel(block_names)
+        [before, after, duration, start_time] = get_sp_generic(block_names{k});
+        sp_params(k, :) = [before, after, duration, start_time];
+    end
+    [before, after, step_times] = get_idv_input_block_params();
+    idv_params = [before; after; step_times];
+end
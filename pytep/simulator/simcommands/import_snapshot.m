@@ -0,0 +1,6 @@
+function [key] = import_snapshot(file_name)
+    % loads a snapshot written by export_snapshot into the snapshot store
+    % and returns its key
+    loaded = load(file_name, '-mat', 'snapshot');
+    key = snapshot_store('add', loaded.snapshot);
+end
@@ -0,0 +1,17 @@
+function [varargout] = initial_workspace_store(command, varargin)
+    % keeps the copy of the initialized base workspace. The store is
+    % persistent, so the copy survives clearvars/reset_workspace.
+    %   initial_workspace_store('set', workspace)
+    %   workspace = initial_workspace_store('get')
+    persistent workspace
+    switch command
+        case 'set'
+            workspace = varargin{1};
+        case 'get'
+            if isempty(workspace)
+                error('pytep:noInitialWorkspace', ...
+                    'capture_initial_workspace has not been called.');
+            end
+            varargout{1} = workspace;
+    end
+end
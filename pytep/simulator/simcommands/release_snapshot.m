@@ -0,0 +1,4 @@
+function [] = release_snapshot(key)
+    % removes the snapshot with the given key from the snapshot store
+    snapshot_store('release', key);
+end
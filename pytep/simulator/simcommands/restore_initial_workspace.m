@@ -0,0 +1,13 @@
+function [] = restore_initial_workspace()
+    % replaces the base workspace by the copy stored with
+    % capture_initial_workspace and undoes a restored snapshot, so the next
+    % start begins at the initial state again
+    model = 'MultiLoop_mode3';
+    workspace = initial_workspace_store('get');
+    evalin('base', 'clearvars');
+    names = fieldnames(workspace);
+    for k = 1:numel(names)
+        assignin('base', names{k}, workspace.(names{k}));
+    end
+    set_param(model, 'InitialState', 'xInitial');
+end
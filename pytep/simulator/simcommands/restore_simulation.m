@@ -0,0 +1,25 @@
+function [logged_rows, snapshot_time] = restore_simulation(key)
+    % stops the active simulation and sets up the model so that the next
+    % start resumes from the snapshot with the given key. Returns the number
+    % of rows that the logs contain at the snapshot time once the simulation
+    % is started again, and the simulation time of the snapshot. Until the
+    % next start, tout still holds the logs of the discarded run.
+    model = 'MultiLoop_mode3';
+    snapshot = snapshot_store('get', key);
+    if ~strcmp(get_param(model, 'SimulationStatus'), 'stopped')
+        set_param(model, 'SimulationCommand', 'stop');
+    end
+    set_idv_input_block_params(snapshot.idv_before, snapshot.idv_after, ...
+        snapshot.idv_times);
+    for k = 1:numel(snapshot.sp_names)
+        params = snapshot.sp_params(k, :);
+        set_sp_generic(snapshot.sp_names{k}, params(1), params(2), ...
+            params(3), params(4));
+    end
+    assignin('base', 'pytep_initial_state', snapshot.operating_point);
+    set_param(model, 'InitialState', 'pytep_initial_state');
+    % the logs of the restarted simulation begin with the row at the snapshot
+    % time
+    logged_rows = 1;
+    snapshot_time = snapshot.time;
+end
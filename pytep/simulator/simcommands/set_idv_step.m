@@ -0,0 +1,9 @@
+function [] = set_idv_step(idv_idx, value, step_time)
+    % schedules a step of one idv to value at step_time
+    block_name = "MultiLoop_mode3/IDVInput";
+    after = str2num(get_param(block_name, "After"));
+    step_times = str2num(get_param(block_name, "Time"));
+    after(idv_idx) = value;
+    step_times(idv_idx) = step_time;
+    set_param(block_name, "After", mat2str(after), "Time", mat2str(step_times))
+end
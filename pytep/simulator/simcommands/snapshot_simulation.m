@@ -0,0 +1,19 @@
+function [key] = snapshot_simulation()
+    % stores the operating point of the paused model together with the
+    % parameters of the setpoint and IDV blocks and returns its key
+    model = 'MultiLoop_mode3';
+    snapshot.operating_point = get_param(model, 'CurrentOperatingPoint');
+    snapshot.time = evalin('base', 'tout(end)');
+    [snapshot.idv_before, snapshot.idv_after, snapshot.idv_times] = ...
+        get_idv_input_block_params();
+    snapshot.sp_names = {'ProductionSP', 'StripLevelSP', 'SepLevelSP', ...
+        'ReactorLevelSP', 'ReactorPressSP', 'MolePctGSP', 'YASP', 'YACSP', ...
+        'ReactorTempSP', 'RecycleValvePosSP', 'SteamValvePosSP', ...
+        'AgitatorSpeedSP'};
+    snapshot.sp_params = zeros(numel(snapshot.sp_names), 4);
+    for k = 1:numel(snapshot.sp_names)
+        [before, after, duration, start_time] = get_sp_generic(snapshot.sp_names{k});
+        snapshot.sp_params(k, :) = [before, after, duration, start_time];
+    end
+    key = snapshot_store('add', snapshot);
+end
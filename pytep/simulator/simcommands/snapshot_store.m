@@ -0,0 +1,33 @@
+function [varargout] = snapshot_store(command, varargin)
+    % keeps simulation snapshots in memory. The store is persistent, so
+    % snapshots survive clearvars/reset_workspace. Keys are never reused, a
+    % released key stays invalid after later adds and clears.
+    %   key = snapshot_store('add', snapshot)
+    %   snapshot = snapshot_store('get', key)
+    %   snapshot_store('release', key)
+    %   snapshot_store('clear')
+    persistent snapshots last_key
+    if isempty(last_key)
+        snapshots = containers.Map('KeyType', 'double', 'ValueType', 'any');
+        last_key = 0;
+    end
+    switch command
+        case 'add'
+            last_key = last_key + 1;
+            snapshots(last_key) = varargin{1};
+            varargout{1} = last_key;
+        case 'get'
+            key = varargin{1};
+            if ~isKey(snapshots, key)
+                error('pytep:unknownSnapshot', ...
+                    'Snapshot %d does not exist or was released.', key);
+            end
+            varargout{1} = snapshots(key);
+        case 'release'
+            if isKey(snapshots, varargin{1})
+                remove(snapshots, varargin{1});
+            end
+        case 'clear'
+            snapshots = containers.Map('KeyType', 'double', 'ValueType', 'any');
+    end
+end
@@ -0,0 +1,16 @@
+function [status] = wait_for_simulation(timeout)
+    % blocks inside MATLAB until the active simulation is paused (by the
+    % t_simpause assertion) or stopped, and returns the final status.
+    % The status checks happen in-process, pause() yields to the running
+    % simulation. Returns the current status after timeout seconds
+    % (timeout <= 0: wait indefinitely).
+    started = tic;
+    status = get_param(gcs, 'SimulationStatus');
+    while ~any(strcmp(status, {'paused', 'stopped'}))
+        if timeout > 0 && toc(started) > timeout
+            return
+        end
+        pause(0.005);
+        status = get_param(gcs, 'SimulationStatus');
+    end
+end
@@ -0,0 +1,879 @@
+"""Compiled time stepping loop of the :class:`~pytep.ensemble.Ensemble`.
+
+A base time step of the NumPy model consists of a few hundred small array operations for the measurements, the
+setpoint and IDVInput blocks, the controllers and the four model evaluations of the RK4 step, so a single plant spends
+almost all of its time in the overhead of the NumPy calls. This module compiles the whole loop of
+:func:`~pytep.ensemble.Ensemble.run_until` with numba. The plants are processed one at a time with scalar code that
+follows :class:`~pytep.temodel.TEProcess` and :class:`~pytep.controllers.MultiLoopController` operation by operation;
+these classes remain the reference implementation and are used whenever numba is not installed.
+
+Importing this module raises an ImportError if numba is not installed.
+"""
+import numba
+import numpy as np
+
+import pytep.temodel as temodel
+from pytep.temodel import _f32
+import pytep.controllers as controllers
+
+# constants of the model, numba freezes module level globals when compiling
+_XMW = temodel.XMW
+_AVP, _BVP, _CVP = temodel.AVP, temodel.BVP, temodel.CVP
+_AD, _BD, _CD = temodel.AD, temodel.BD, temodel.CD
+_LIQUID_COEFFICIENTS = temodel._LIQUID_COEFFICIENTS
+_VAPOR_COEFFICIENTS = temodel._VAPOR_COEFFICIENTS
+_VRNG = temodel.VRNG
+_VTR, _VTS, _VTC, _VTV = temodel.VTR, temodel.VTS, temodel.VTC, temodel.VTV
+_HTR = temodel.HTR
+_HWR, _HWS = temodel.HWR, temodel.HWS
+_SFR_FIXED = temodel.SFR_FIXED
+_CPFLMX, _CPPRMX = temodel.CPFLMX, temodel.CPPRMX
+_VTAU = temodel.VTAU
+_VST = temodel.VST
+_RG = temodel.RG
+_XST_FEED = temodel.XST_FEED[:24].reshape(3, 8).copy()
+_NOISE_STD = np.concatenate([temodel.XNS[:22], temodel.XNSADD[:8]])
+_GAS_STD = np.concatenate([temodel.XNS[22:36], temodel.XNSADD[:24]])
+_PRODUCT_STD = temodel.XNS[36:].copy()
+_HSPAN, _HZERO = temodel.HSPAN, temodel.HZERO
+_SSPAN, _SZERO, _SPSPAN = temodel.SSPAN, temodel.SZERO, temodel.SPSPAN
+_IDVWLK = temodel.IDVWLK
+_WLK_GROUP_0 = np.array(temodel._WLK_GROUPS[0])
+_WLK_GROUP_1 = np.array(temodel._WLK_GROUPS[1])
+_ANALYZER_GAS = temodel._ANALYZER_GAS
+_ANALYZER_PRODUCT = temodel._ANALYZER_PRODUCT
+_MULTIPLIER = temodel._LCG.MULTIPLIER
+_MODULUS = temodel._LCG.MODULUS
+_KFAC = _f32([8.501, 11.402, 11.795, .048, .0242])
+_SFR_IDLE = _f32([.9999, .999, .999, .99, .98])
+_K273 = _f32(273.15)
+_K100 = _f32(100.)
+_K150 = _f32(150.)
+_K760 = _f32(760.)
+_K101 = _f32(101.325)
+_K353 = _f32(35.3145)
+_K454 = _f32(.454)
+_K7_8 = _f32(7.8)
+_K500 = _f32(500.53)
+_K1_8 = _f32(1.8)
+_C359 = _f32(.359) / _f32(35.3145)
+_GPM = _f32(0.003785411784) * _f32(60.)
+_RR_A = _f32([31.5859536, 3.00094014, 53.4060443])
+_RR_B = _f32([20130.85052843482, 10065.42526421741, 30196.27579265224])
+_T_HOT, _T_HOT_OFFSET, _T_COLD = _f32(170.), _f32(120.262), _f32(5.292)
+_TMPFAC_A, _TMPFAC_B, _TMPFAC_C = _f32(363.744), _f32(177.), _f32(2.22579488)
+_K01 = _f32(.1)
+_K025, _K25 = _f32(.025), _f32(.25)
+_UAR_A, _UAR_B, _UAR_C = _f32(-.5), _f32(2.75), _f32(2.5)
+_K3528 = _f32(3528.73)
+_K404 = _f32(.404655)
+_LEVEL_R, _SPAN_R = _f32(84.6), _f32(666.7)
+_LEVEL_S, _SPAN_S = _f32(27.5), _f32(290.)
+_LEVEL_C = _f32(78.25)
+
+_KC = controllers._KC
+_TI = controllers._TI
+_LO = controllers._LO
+_HI = controllers._HI
+_MEAS = controllers._MEAS
+_XMV_LOOPS = controllers._XMV_LOOPS
+_KC_TRIM = controllers._KC_TRIM
+_TS_TRIM_TI = controllers._TS_TRIM / controllers._TI_TRIM
+_RATE_PRODUCTION = controllers._RATE_PRODUCTION
+_RATE_PCT_G = controllers._RATE_PCT_G
+_PURGE_PRICES = np.array([2.209, 6.177, 22.06, 14.56, 17.89, 30.44, 22.94])
+_PURGE_MEAS = np.array([28, 30, 31, 32, 33, 34, 35])
+_PRODUCT_PRICES = np.array([.2206, .1456, .1789])
+
+# compiled functions divide like NumPy, a division by zero gives inf or nan instead of an exception
+_jit = numba.njit(cache=True, error_model="numpy")
+
+# indices of the scalar process quantities in the work array q of _evaluate
+_PTR, _PTS, _PTV, _VLR, _VLS, _VLC, _DLS, _DLC, _TCR, _TCS, _TCC = range(11)
+_RH, _QUR, _QUS, _QUC, _CPDH, _FWR, _FWS, _TCWR, _TCWS, _TST0, _TST1, _TST2, _TST3 = range(11, 24)
+_N_Q = 24
+
+
+@_jit
+def _sum8(v):
+    # pairwise summation of numpy for 8 elements
+    return ((v[0] + v[1]) + (v[2] + v[3])) + ((v[4] + v[5]) + (v[6] + v[7]))
+
+
+@_jit
+def _coefficients(z, table, c):
+    """Enthalpy coefficients (4,) of the mixture z (8,), see temodel._enthalpy_coefficients"""
+    for k in range(4):
+        acc = 0.
+        for i in range(8):
+            acc += z[i] * table[i, k]
+        c[k] = acc
+
+
+@_jit
+def _polynomial(c, t):
+    return c[0] + t * (c[1] + t * (c[2] + t * c[3]))
+
+
+@_jit
+def _solve_temperature(c, h, t_guess):
+    """Newton iteration of temodel._solve_temperature for one temperature"""
+    c0, c1, c2, c3 = c[0] - h, c[1], c[2], c[3]
+    t = t_guess
+    for _ in range(100):
+        dt = -(c0 + t * (c1 + t * (c2 + t * c3))) / (c1 + t * (2. * c2 + t * 3. * c3))
+        t = t + dt
+        if abs(dt) < 1e-12:
+            return t
+    return t_guess
+
+
+@_jit
+def _density(x, t):
+    acc = np.empty(8)
+    for i in range(8):
+        acc[i] = x[i] * _XMW[i] / (_AD[i] + (_BD[i] + _CD[i] * t) * t)
+    return 1. / _sum8(acc)
+
+
+@_jit
+def _disturbances(t, adist, bdist, cdist, ddist, tlast, wlk):
+    for k in range(20):
+        h = t - tlast[k]
+        wlk[k] = adist[k] + h * (bdist[k] + h * (cdist[k] + h * ddist[k]))
+
+
+@_jit
+def _uniform(seeds, idx):
+    s = (seeds[idx] * _MULTIPLIER) % _MODULUS
+    seeds[idx] = s
+    return s / _MODULUS
+
+
+@_jit
+def _gaussian(seeds, idx, std, noise):
+    """Sum of 12 uniform numbers per entry of std, see temodel._LCG.gaussian"""
+    s = seeds[idx]
+    for j in range(std.size):
+        acc = 0.
+        for _ in range(12):
+            s = (s * _MULTIPLIER) % _MODULUS
+            acc += s / _MODULUS
+        noise[j] = (acc - 6.) * std[j]
+    seeds[idx] = s
+
+
+@_jit
+def _update_walk_group(idx, group, due, idvwlk, bounded, seeds, a, b, c, d, tlast, tnext):
+    """See TEProcess._update_walk_group"""
+    procs = np.empty(group.size, dtype=np.int64)
+    n_procs = 0
+    for k in group:
+        if due[k]:
+            procs[n_procs] = k
+            n_procs += 1
+    # insertion sort by the end of the current segment, including the indexing quirk of the C implementation
+    for i in range(1, n_procs):
+        proc = procs[i]
+        j = i
+        while j > 0 and tnext[j - 1] > tnext[proc]:
+            procs[j] = procs[j - 1]
+            j -= 1
+        procs[j] = proc
+    for p in range(n_procs):
+        k = procs[p]
+        h = tnext[k] - tlast[k]
+        s = a[k] + h * (b[k] + h * (c[k] + h * d[k]))
+        sp = b[k] + h * (c[k] * 2. + h * 3. * d[k])
+        tlast[k] = tnext[k]
+        if not bounded:
+            h = _HSPAN[k] * (2. * _uniform(seeds, idx) - 1.) + _HZERO[k]
+            s1 = _SSPAN[k] * (2. * _uniform(seeds, idx) - 1.) * idvwlk[k] + _SZERO[k]
+            s1p = _SPSPAN[k] * (2. * _uniform(seeds, idx) - 1.) * idvwlk[k]
+            a[k], b[k] = s, sp
+            c[k] = ((s1 - s) * 3. - h * (s1p + sp * 2.)) / (h * h)
+            d[k] = ((s - s1) * 2. + h * (s1p + sp)) / (h * (h * h))
+            tnext[k] = tlast[k] + h
+        elif s > .1:
+            a[k], b[k] = s, sp
+            c[k] = -(s * 3. + sp * .2) / .01
+            d[k] = (s * 2. + sp * .1) / .001
+            tnext[k] = tlast[k] + .1
+        else:
+            h = _HSPAN[k] * (2. * _uniform(seeds, idx) - 1.) + _HZERO[k]
+            a[k], b[k] = s, sp
+            c[k] = (idvwlk[k] - 2 * sp * h) / (h * h)
+            d[k] = sp / (h * h)
+            tnext[k] = tlast[k] + h
+
+
+@_jit
+def _update_disturbances(t, idx, idv, seeds, adist, bdist, cdist, ddist, tlast, tnext):
+    """See TEProcess._update_disturbances for a time t > 0"""
+    due = np.empty(20, dtype=np.bool_)
+    any_due = False
+    for k in range(20):
+        due[k] = t >= tnext[idx, k]
+        any_due |= due[k]
+    if not any_due:
+        return
+    idvwlk = np.empty(20)
+    for k in range(20):
+        idvwlk[k] = idv[idx, _IDVWLK[k]]
+    _update_walk_group(idx, _WLK_GROUP_0, due, idvwlk, False, seeds, adist[idx], bdist[idx], cdist[idx],
+                       ddist[idx], tlast[idx], tnext[idx])
+    _update_walk_group(idx, _WLK_GROUP_1, due, idvwlk, True, seeds, adist[idx], bdist[idx], cdist[idx], ddist[idx],
+                       tlast[idx], tnext[idx])
+
+
+@_jit
+def _evaluate(x, idv, wlk, tc, xst, fcm, ftm, hst, xmws, crxr, q, z, c):
+    """Process model of one plant for the disturbances wlk, see TEProcess._evaluate. Updates the temperatures tc (4,)
+    that seed the next evaluation and fills the work arrays."""
+    # disturbed feed conditions
+    xst[:, :] = 0.
+    xst[0:3] = _XST_FEED
+    xst[3, 0] = wlk[0] - idv[0] * .03 - idv[1] * .00243719
+    xst[3, 1] = wlk[1] + idv[1] * .005
+    xst[3, 2] = 1. - xst[3, 0] - xst[3, 1]
+    tst0 = wlk[2] + idv[2] * 5.
+    tst3 = wlk[3]
+    tcwr = wlk[4] + idv[3] * 5.
+    tcws = wlk[5] + idv[4] * 5.
+    r1f = wlk[6]
+    r2f = wlk[7]
+    tst2 = wlk[12]
+    tst1 = wlk[13]
+    vrng = _VRNG.copy()
+    vrng[2] = wlk[14]
+    vrng[0] = wlk[15]
+    vrng[1] = wlk[16]
+    vrng[3] = wlk[17]
+    vrng[9] = wlk[18]
+    vrng[10] = wlk[19]
+
+    # states, z holds the liquid compositions of reactor, separator and stripper and the vapor composition
+    etr, ets, etc, etv = x[8], x[17], x[26], x[35]
+    twr, tws = x[36], x[37]
+    for i in range(8):
+        z[0, i] = x[i] if i >= 3 else 0.
+        z[1, i] = x[9 + i] if i >= 3 else 0.
+        z[2, i] = x[18 + i]
+        z[3, i] = x[27 + i]
+    utlr = _sum8(z[0])
+    utls = _sum8(z[1])
+    utlc = _sum8(z[2])
+    utvv = _sum8(z[3])
+    for i in range(8):
+        z[0, i] = z[0, i] / utlr
+        z[1, i] = z[1, i] / utls
+        z[2, i] = z[2, i] / utlc
+        z[3, i] = z[3, i] / utvv
+    xlr, xls, xlc, xvv = z[0], z[1], z[2], z[3]
+
+    # temperatures, starting from the previous solution
+    for k in range(3):
+        _coefficients(z[k], _LIQUID_COEFFICIENTS, c[k])
+    _coefficients(xvv, _VAPOR_COEFFICIENTS, c[3])
+    c[3, 0] -= 3.57696e-6 * _K273
+    c[3, 1] -= 3.57696e-6
+    tc[0] = _solve_temperature(c[0], etr / utlr, tc[0])
+    tc[1] = _solve_temperature(c[1], ets / utls, tc[1])
+    tc[2] = _solve_temperature(c[2], etc / utlc, tc[2])
+    tc[3] = _solve_temperature(c[3], etv / utvv, tc[3])
+    tcr, tcs, tcc, tcv = tc[0], tc[1], tc[2], tc[3]
+    tkr = tcr + _K273
+    tks = tcs + _K273
+    tkv = tcv + _K273
+
+    dlr = _density(xlr, tcr)
+    dls = _density(xls, tcs)
+    dlc = _density(xlc, tcc)
+    vlr = utlr / dlr
+    vls = utls / dls
+    vlc = utlc / dlc
+    vvr = _VTR - vlr
+    vvs = _VTS - vls
+
+    # pressures, xst[7] and xst[8] hold the partial pressures until they are normalized
+    ppr = xst[7]
+    pps = xst[8]
+    for i in range(3):
+        ppr[i] = x[i] * _RG * tkr / vvr
+        pps[i] = x[9 + i] * _RG * tks / vvs
+    for i in range(3, 8):
+        ppr[i] = np.exp(_AVP[i] + _BVP[i] / (tcr + _CVP[i])) * xlr[i]
+        pps[i] = np.exp(_AVP[i] + _BVP[i] / (tcs + _CVP[i])) * xls[i]
+    ptr = _sum8(ppr)
+    pts = _sum8(pps)
+    ptv = utvv * _RG * tkv / _VTV
+
+    # reaction kinetics
+    rr0 = np.exp(_RR_A[0] - _RR_B[0] / tkr) * r1f
+    rr1 = np.exp(_RR_A[1] - _RR_B[1] / tkr) * r2f
+    rr2 = np.exp(_RR_A[2] - _RR_B[2] / tkr)
+    rr3 = rr2 * .767488334
+    if ppr[0] > 0. and ppr[2] > 0.:
+        rfac = ppr[0] ** 1.1544 * ppr[2] ** .3735
+    else:
+        rfac = 0.
+    rr0 *= rfac * ppr[3]
+    rr1 *= rfac * ppr[4]
+    rr2 *= ppr[0] * ppr[4]
+    rr3 *= ppr[0] * ppr[3]
+    rr0 *= vvr
+    rr1 *= vvr
+    rr2 *= vvr
+    rr3 *= vvr
+    crxr[0] = -rr0 - rr1 - rr2
+    crxr[1] = 0.
+    crxr[2] = -rr0 - rr1
+    crxr[3] = -rr0 - rr3 * 1.5
+    crxr[4] = -rr1 - rr2
+    crxr[5] = rr2 + rr3
+    crxr[6] = rr0
+    crxr[7] = rr1
+    rh = rr0 * _HTR[0] + rr1 * _HTR[1]
+
+    # stream compositions, indexed by stream number - 1
+    for i in range(8):
+        xst[7, i] = ppr[i] / ptr
+        xst[8, i] = pps[i] / pts
+        xst[5, i] = xvv[i]
+        xst[9, i] = xst[8, i]
+        xst[10, i] = xls[i]
+        xst[12, i] = xlc[i]
+    acc = np.empty(8)
+    for s in range(13):
+        for i in range(8):
+            acc[i] = xst[s, i] * _XMW[i]
+        xmws[s] = _sum8(acc)
+
+    hst[:] = 0.
+    cs = c[0]
+    for s, t in ((0, tst0), (1, tst1), (2, tst2), (3, tst3), (5, tcv), (7, tcr), (8, tcs)):
+        _coefficients(xst[s], _VAPOR_COEFFICIENTS, cs)
+        hst[s] = _polynomial(cs, t)
+    hst[9] = hst[8]
+    for s, t in ((10, tcs), (12, tcc)):
+        _coefficients(xst[s], _LIQUID_COEFFICIENTS, cs)
+        hst[s] = _polynomial(cs, t)
+
+    # flows
+    vpos = x[38:50]
+    ftm[:] = 0.
+    ftm[0] = vpos[0] * vrng[0] / _K100
+    ftm[1] = vpos[1] * vrng[1] / _K100
+    ftm[2] = vpos[2] * (1. - idv[5]) * vrng[2] / _K100
+    ftm[3] = vpos[3] * (1. - idv[6] * .2) * vrng[3] / _K100 + 1e-10
+    ftm[10] = vpos[6] * vrng[6] / _K100
+    ftm[12] = vpos[7] * vrng[7] / _K100
+    uac = vpos[8] * vrng[8] * (wlk[8] + 1.) / _K100
+    fwr = vpos[9] * vrng[9] / _K100
+    fws = vpos[10] * vrng[10] / _K100
+    agsp = (vpos[11] + _K150) / _K100
+    ftm[5] = np.sqrt(max(ptv - ptr, 0.)) * 1937.6 / xmws[5]
+    ftm[7] = np.sqrt(max(ptr - pts, 0.)) * 4574.21 * (1. - wlk[11] * .25) / xmws[7]
+    ftm[9] = vpos[5] * .151169 * np.sqrt(max(pts - _K760, 0.)) / xmws[9]
+
+    # compressor
+    pr = min(max(ptv / pts, 1.), _CPPRMX)
+    flcoef = _CPFLMX / 1.197
+    flms = _CPFLMX + flcoef * (1. - pr * (pr * pr))
+    cpdh = flms * (tcs + 273.15) * 1.8e-6 * 1.9872 * (ptv - pts) / (xmws[8] * pts)
+    flms = flms - vpos[4] * 53.349 * np.sqrt(max(ptv - pts, 0.))
+    flms = max(flms, .001)
+    ftm[8] = flms / xmws[8]
+    hst[8] += cpdh / ftm[8]
+
+    for s in range(13):
+        for i in range(8):
+            fcm[s, i] = xst[s, i] * ftm[s]
+
+    # stripper
+    if tcc > _T_HOT:
+        tmpfac = tcc - _T_HOT_OFFSET
+    elif tcc < _T_COLD:
+        tmpfac = _K01
+    else:
+        tmpfac = _TMPFAC_A / (_TMPFAC_B - tcc) - _TMPFAC_C
+    stripping = ftm[10] > _K01
+    vovrl = ftm[3] / ftm[10] * tmpfac
+    for i in range(8):
+        if i < 3:
+            sfr = _SFR_FIXED[i]
+        elif stripping:
+            sfr = vovrl * _KFAC[i - 3] / (vovrl * _KFAC[i - 3] + 1.)
+        else:
+            sfr = _SFR_IDLE[i - 3]
+        fin = fcm[3, i] + fcm[10, i]
+        fcm[4, i] = sfr * fin
+        fcm[11, i] = fin - fcm[4, i]
+    ftm[4] = _sum8(fcm[4])
+    ftm[11] = _sum8(fcm[11])
+    for i in range(8):
+        xst[4, i] = fcm[4, i] / ftm[4]
+        xst[11, i] = fcm[11, i] / ftm[11]
+    _coefficients(xst[4], _VAPOR_COEFFICIENTS, cs)
+    hst[4] = _polynomial(cs, tcc)
+    _coefficients(xst[11], _LIQUID_COEFFICIENTS, cs)
+    hst[11] = _polynomial(cs, tcc)
+    ftm[6] = ftm[5]
+    hst[6] = hst[5]
+    xst[6] = xst[5]
+    fcm[6] = fcm[5]
+
+    # heat transfer
+    if vlr / _K7_8 > 50.:
+        uarlev = 1.
+    elif vlr / _K7_8 < 10.:
+        uarlev = 0.
+    else:
+        uarlev = vlr * _K025 / _K7_8 - _K25
+    uar = uarlev * (agsp * agsp * _UAR_A + agsp * _UAR_B - _UAR_C) * .85549
+    qur = uar * (twr - tcr) * (1. - wlk[9] * .35)
+    d = ftm[7] / _K3528
+    d = d * d
+    uas = (1. - 1. / (d * d + 1.)) * _K404
+    qus = uas * (tws - tcr) * (1. - wlk[10] * .25)
+    quc = uac * (_K100 - tcc) if tcc < 100. else 0.
+
+    q[_PTR], q[_PTS], q[_PTV] = ptr, pts, ptv
+    q[_VLR], q[_VLS], q[_VLC], q[_DLS], q[_DLC] = vlr, vls, vlc, dls, dlc
+    q[_TCR], q[_TCS], q[_TCC] = tcr, tcs, tcc
+    q[_RH], q[_QUR], q[_QUS], q[_QUC], q[_CPDH] = rh, qur, qus, quc, cpdh
+    q[_FWR], q[_FWS], q[_TCWR], q[_TCWS] = fwr, fws, tcwr, tcws
+    q[_TST0], q[_TST1], q[_TST2], q[_TST3] = tst0, tst1, tst2, tst3
+
+
+@_jit
+def _process_derivatives(x, fcm, ftm, hst, crxr, q, yp):
+    """State derivatives yp[:38] of the evaluated model, see TEProcess.derivatives"""
+    for i in range(8):
+        yp[i] = fcm[6, i] - fcm[7, i] + crxr[i]
+        yp[9 + i] = fcm[7, i] - fcm[8, i] - fcm[9, i] - fcm[10, i]
+        yp[18 + i] = fcm[11, i] - fcm[12, i]
+        yp[27 + i] = fcm[0, i] + fcm[1, i] + fcm[2, i] + fcm[4, i] + fcm[8, i] - fcm[5, i]
+    hf = hst * ftm
+    yp[8] = hf[6] - hf[7] + q[_RH] + q[_QUR]
+    yp[17] = hf[7] - hf[8] - hf[9] - hf[10] + q[_QUS]
+    yp[26] = hf[3] + hf[10] - hf[4] - hf[12] + q[_QUC]
+    yp[35] = hf[0] + hf[1] + hf[2] + hf[4] + hf[8] - hf[5]
+    yp[36] = (q[_FWR] * _K500 * (q[_TCWR] - x[36]) - q[_QUR] * 1e6 / _K1_8) / _HWR
+    yp[37] = (q[_FWS] * _K500 * (q[_TCWS] - x[37]) - q[_QUS] * 1e6 / _K1_8) / _HWS
+
+
+@_jit
+def _valve_derivatives(t, x, vcv, isd, yp):
+    """Completes the derivatives with the valve dynamics and freezes shut down plants"""
+    for i in range(12):
+        yp[38 + i] = (vcv[i] - x[38 + i]) / _VTAU[i]
+    if t > 0. and isd != 0:
+        yp[:] = 0.
+
+
+@_jit
+def _derivatives(t, idx, x, idv, vcv, isd, tc, adist, bdist, cdist, ddist, tlast, work, yp):
+    wlk, xst, fcm, ftm, hst, xmws, crxr, q, z, c, xs = work
+    _disturbances(t, adist[idx], bdist[idx], cdist[idx], ddist[idx], tlast[idx], wlk)
+    _evaluate(x, idv, wlk, tc, xst, fcm, ftm, hst, xmws, crxr, q, z, c)
+    _process_derivatives(x, fcm, ftm, hst, crxr, q, yp)
+    _valve_derivatives(t, x, vcv, isd, yp)
+
+
+@_jit
+def _measure(t, idx, x, idv, tc, isd, seeds, xdel, xdeladd, xmeas, xmeasadd, gas_due, product_due, adist, bdist,
+             cdist, ddist, tlast, work, k1):
+    """Measurements of one plant, see TEProcess.outputs. Stores the process part of the derivatives at t in k1."""
+    wlk, xst, fcm, ftm, hst, xmws, crxr, q, z, c, xs = work
+    _disturbances(t, adist[idx], bdist[idx], cdist[idx], ddist[idx], tlast[idx], wlk)
+    _evaluate(x, idv, wlk, tc, xst, fcm, ftm, hst, xmws, crxr, q, z, c)
+    _process_derivatives(x, fcm, ftm, hst, crxr, q, k1)
+    vlr, vls, vlc = q[_VLR], q[_VLS], q[_VLC]
+
+    xm = xmeas[idx]
+    xm[0] = ftm[2] * _C359
+    xm[1] = ftm[0] * xmws[0] * _K454
+    xm[2] = ftm[1] * xmws[1] * _K454
+    xm[3] = ftm[3] * _C359
+    xm[4] = ftm[8] * _C359
+    xm[5] = ftm[5] * _C359
+    xm[6] = (q[_PTR] - _K760) / _K760 * _K101
+    xm[7] = (vlr - _LEVEL_R) / _SPAN_R * _K100
+    xm[8] = q[_TCR]
+    xm[9] = ftm[9] * _C359
+    xm[10] = q[_TCS]
+    xm[11] = (vls - _LEVEL_S) / _SPAN_S * _K100
+    xm[12] = (q[_PTS] - _K760) / _K760 * _K101
+    xm[13] = ftm[10] / q[_DLS] / _K353
+    xm[14] = (vlc - _LEVEL_C) / _VTC * _K100
+    xm[15] = (q[_PTV] - _K760) / _K760 * _K101
+    xm[16] = ftm[12] / q[_DLC] / _K353
+    xm[17] = q[_TCC]
+    xm[18] = q[_QUC] * 1040. * _K454
+    xm[19] = q[_CPDH] * 293.07
+    xm[20] = x[36]
+    xm[21] = x[37]
+
+    xa = xmeasadd[idx]
+    xa[0] = q[_TST2]
+    xa[1] = q[_TST0]
+    xa[2] = q[_TST1]
+    xa[3] = q[_TST3]
+    xa[4] = q[_TCWR]
+    xa[5] = q[_FWR] * _GPM
+    xa[6] = q[_TCWS]
+    xa[7] = q[_FWS] * _GPM
+
+    # shutdown constraints, the last violated constraint wins
+    code = 0
+    if xm[6] > 3e3:
+        code = 1
+    if vlr / _K353 > 24.:
+        code = 2
+    if vlr / _K353 < 2.:
+        code = 3
+    if xm[8] > 175.:
+        code = 4
+    if vls / _K353 > 12.:
+        code = 5
+    if vls / _K353 < 1.:
+        code = 6
+    if vlc / _K353 > 8.:
+        code = 7
+    if vlc / _K353 < 1.:
+        code = 8
+    isd[idx] = code
+
+    noise = np.empty(38)
+    if t > 0. and code == 0:
+        _gaussian(seeds, idx, _NOISE_STD, noise)
+        for j in range(22):
+            xm[j] += noise[j]
+        for j in range(8):
+            xa[j] += noise[22 + j]
+
+    # sampled analyzers with dead time
+    xcmp = np.empty(19)
+    xcmpadd = np.empty(24)
+    for i in range(6):
+        xcmp[i] = xst[6, i] * _K100
+        xcmpadd[i] = xst[2, i] * _K100
+        xcmpadd[6 + i] = xst[0, i] * _K100
+        xcmpadd[12 + i] = xst[1, i] * _K100
+        xcmpadd[18 + i] = xst[3, i] * _K100
+    for i in range(8):
+        xcmp[6 + i] = xst[9, i] * _K100
+    for i in range(5):
+        xcmp[14 + i] = xst[12, 3 + i] * _K100
+    xd, xda = xdel[idx], xdeladd[idx]
+    if t == 0.:
+        xd[22:] = xcmp
+        xm[22:] = xcmp
+        xda[:] = xcmpadd
+        xa[8:] = xcmpadd
+    if gas_due:
+        _gaussian(seeds, idx, _GAS_STD, noise)
+        for j in range(14):
+            xm[22 + j] = xd[22 + j] + noise[j]
+            xd[22 + j] = xcmp[j]
+        for j in range(24):
+            xa[8 + j] = xda[j] + noise[14 + j]
+            xda[j] = xcmpadd[j]
+    if product_due:
+        _gaussian(seeds, idx, _PRODUCT_STD, noise)
+        for j in range(5):
+            xm[36 + j] = xd[36 + j] + noise[j]
+            xd[36 + j] = xcmp[14 + j]
+
+
+@_jit
+def _setpoint_output(block, t):
+    before, after, duration, start = block[0], block[1], block[2], block[3]
+    if duration > 0:
+        ramp = (after - before) / max(duration, 0.1) * (t - start) if t >= start else 0.
+        return min(max(before + ramp, min(before, after)), max(before, after))
+    return after if t >= start else before
+
+
+@_jit
+def _control(idx, xm, sp, ts, trim, first, u, e, e_trim, r1, r4, rate_sp, xmv):
+    """Multiloop controllers of one plant, see MultiLoopController.step. rate_sp (n, 2) holds the rate limited
+    production and %G setpoints."""
+    if first:
+        rate_sp[idx, 0] = sp[0]
+        rate_sp[idx, 1] = sp[5]
+    else:
+        y = rate_sp[idx, 0]
+        rate_sp[idx, 0] = min(max(sp[0], y - _RATE_PRODUCTION * ts), y + _RATE_PRODUCTION * ts)
+        y = rate_sp[idx, 1]
+        rate_sp[idx, 1] = min(max(sp[5], y - _RATE_PCT_G * ts), y + _RATE_PCT_G * ts)
+    production_sp, pct_g_sp = rate_sp[idx, 0], rate_sp[idx, 1]
+
+    if trim:
+        y_a = 100 * xm[22] / (xm[22] + xm[24])
+        y_ac = xm[22] + xm[24]
+        e0 = sp[6] - y_a
+        e1 = sp[7] - y_ac
+        delta0 = _KC_TRIM[0] * (e0 + _TS_TRIM_TI[0] * e0 - e_trim[idx, 0])
+        delta1 = _KC_TRIM[1] * (e1 + _TS_TRIM_TI[1] * e1 - e_trim[idx, 1])
+        e_trim[idx, 0] = e0
+        e_trim[idx, 1] = e1
+        r1[idx] = r1[idx] + delta0
+        r4[idx] = r4[idx] - delta0 + delta1
+
+    ui = u[idx]
+    fp = 100 / 22.89 * production_sp + ui[9]
+    e_adj = ui[11]
+    r2 = ((1.5192e-3 * pct_g_sp + 5.9446e-1) * pct_g_sp + 2.7690e-1) - 32 * e_adj / fp
+    r3 = ((-1.1377e-3 * pct_g_sp + -8.0893e-1) * pct_g_sp + 9.1060e+1) + 46 * e_adj / fp
+
+    setpoint = np.empty(15)
+    setpoint[0] = r2 * fp
+    setpoint[1] = r3 * fp
+    setpoint[2] = r1[idx] * fp
+    setpoint[3] = r4[idx] * fp
+    setpoint[4] = ui[12] * fp
+    setpoint[5] = ui[13] * fp
+    setpoint[6] = ui[14] * fp
+    setpoint[7] = sp[8]
+    setpoint[8] = ui[10]
+    setpoint[9] = production_sp
+    setpoint[10] = sp[3]
+    setpoint[11] = pct_g_sp
+    setpoint[12] = sp[4]
+    setpoint[13] = sp[2]
+    setpoint[14] = sp[1]
+
+    for j in range(9):
+        xmv[_XMV_LOOPS[j]] = ui[j]
+    xmv[4] = min(max(sp[9] + min(-2 * (ui[8] - 90), 0), 0), 100)
+    xmv[8] = sp[10]
+    xmv[11] = sp[11]
+
+    ei = e[idx]
+    for j in range(15):
+        err = setpoint[j] - xm[_MEAS[j]]
+        ui[j] = min(max(ui[j] + _KC[j] * (err + ts / _TI[j] * err - ei[j]), _LO[j]), _HI[j])
+        ei[j] = err
+
+
+@_jit
+def _hourly_cost(xm, xmv):
+    purge = 0.
+    for j in range(7):
+        purge += xm[_PURGE_MEAS[j]] * _PURGE_PRICES[j]
+    product = xm[36] * _PRODUCT_PRICES[0] + xm[37] * _PRODUCT_PRICES[1] + xm[38] * _PRODUCT_PRICES[2]
+    return .0318 * xm[18] + .0536 * xm[19] + .44791 * xm[9] * purge + product * 4.541 * xmv[7]
+
+
+@_jit
+def _step(t, dt, idx, x, xmv, idv, vcv, isd, tc, adist, bdist, cdist, ddist, tlast, work, k1, reuse_k1):
+    """Valve update and RK4 step of one plant, see TEProcess.step"""
+    # valves, honoring sticky valves
+    v = vcv[idx]
+    for i in range(12):
+        if i == 9:
+            ivst = idv[idx, 13]
+        elif i == 10:
+            ivst = idv[idx, 14]
+        elif i == 4 or i == 6 or i == 7 or i == 8:
+            ivst = idv[idx, 18]
+        else:
+            ivst = 0.
+        if t == 0. or abs(v[i] - xmv[idx, i]) > _VST * ivst:
+            v[i] = xmv[idx, i]
+        v[i] = min(max(v[i], 0.), 100.)
+
+    xi = x[idx]
+    xs = work[10]
+    k2 = np.empty(50)
+    k3 = np.empty(50)
+    k4 = np.empty(50)
+    if reuse_k1:
+        _valve_derivatives(t, xi, v, isd[idx], k1)
+    else:
+        _derivatives(t, idx, xi, idv[idx], v, isd[idx], tc[idx], adist, bdist, cdist, ddist, tlast, work, k1)
+    for i in range(50):
+        xs[i] = xi[i] + dt / 2 * k1[i]
+    _derivatives(t + dt / 2, idx, xs, idv[idx], v, isd[idx], tc[idx], adist, bdist, cdist, ddist, tlast, work, k2)
+    for i in range(50):
+        xs[i] = xi[i] + dt / 2 * k2[i]
+    _derivatives(t + dt / 2, idx, xs, idv[idx], v, isd[idx], tc[idx], adist, bdist, cdist, ddist, tlast, work, k3)
+    for i in range(50):
+        xs[i] = xi[i] + dt * k3[i]
+    _derivatives(t + dt, idx, xs, idv[idx], v, isd[idx], tc[idx], adist, bdist, cdist, ddist, tlast, work, k4)
+    for i in range(50):
+        xi[i] = xi[i] + dt / 6 * (k1[i] + 2 * k2[i] + 2 * k3[i] + k4[i])
+
+
+@_jit
+def _run(first_tick, last_tick, stop_on_shutdown, ts_base, save_every, trim_every, clock,
+         x, xmv, idv, isd, vcv, tc, xdel, xdeladd, xmeas, xmeasadd, meas_seeds, proc_seeds,
+         adist, bdist, cdist, ddist, tlast, tnext,
+         u, e, e_trim, r1, r4, rate_sp, sp_blocks, idv_blocks, shutdown_time,
+         log_time, log_process_data, log_xmv, log_setpoints, log_idv, log_cost):
+    """Processes the ticks first_tick to last_tick, see Ensemble.run_until.
+
+    clock holds [plant time, time of the next gas analysis, time of the next product analysis, controller ticks] and
+    is updated in place, like all state arrays.
+
+    Returns
+    -------
+    tick : int
+        Next tick to process
+    n_logged : int
+        Number of rows written to the log arrays
+    completed : bool
+        False if the run was stopped because of a shutdown
+    """
+    n = x.shape[0]
+    # work arrays of the model evaluations, shared by all plants
+    work = (np.empty(20), np.empty((13, 8)), np.empty((13, 8)), np.empty(13), np.empty(13), np.empty(13), np.empty(8),
+            np.empty(_N_Q), np.empty((4, 8)), np.empty((4, 4)), np.empty(50))
+    k1 = np.empty((n, 50))
+    sp = np.empty(12)
+    new_idv = np.empty(28)
+    n_logged = 0
+    tick = first_tick
+    while tick <= last_tick:
+        t = tick * ts_base
+        plant_time = clock[0]
+
+        # plant outputs, the analyzer clocks are shared by all plants
+        if plant_time == 0.:
+            for idx in range(n):
+                adist[idx] = _SZERO
+                bdist[idx] = 0.
+                cdist[idx] = 0.
+                ddist[idx] = 0.
+                tlast[idx] = 0.
+                tnext[idx] = .1
+            clock[1] = _ANALYZER_GAS
+            clock[2] = _ANALYZER_PRODUCT
+        gas_due = plant_time >= clock[1]
+        product_due = plant_time >= clock[2]
+        controller_ticks = int(clock[3])
+        trim = controller_ticks % trim_every == 0
+        save = tick % save_every == 0
+        for idx in range(n):
+            if plant_time != 0.:
+                _update_disturbances(plant_time, idx, idv, proc_seeds, adist, bdist, cdist, ddist, tlast, tnext)
+            _measure(plant_time, idx, x[idx], idv[idx], tc[idx], isd, meas_seeds, xdel, xdeladd, xmeas, xmeasadd,
+                     gas_due, product_due, adist, bdist, cdist, ddist, tlast, work, k1[idx])
+
+            # setpoint and IDVInput blocks and controllers
+            for j in range(12):
+                sp[j] = _setpoint_output(sp_blocks[idx, j], t)
+            _control(idx, xmeas[idx], sp, ts_base, trim, controller_ticks == 0, u, e, e_trim, r1, r4, rate_sp,
+                     xmv[idx])
+            if save:
+                log_time[n_logged] = t
+                log_process_data[n_logged, idx] = xmeas[idx]
+                log_xmv[n_logged, idx] = xmv[idx]
+                log_setpoints[n_logged, idx] = sp
+                log_setpoints[n_logged, idx, 0] = rate_sp[idx, 0]
+                log_setpoints[n_logged, idx, 5] = rate_sp[idx, 1]
+                for j in range(28):
+                    log_idv[n_logged, idx, j] = (idv_blocks[idx, 1, j] if t >= idv_blocks[idx, 2, j]
+                                                 else idv_blocks[idx, 0, j])
+                log_cost[n_logged, idx] = _hourly_cost(xmeas[idx], xmv[idx])
+        if gas_due:
+            clock[1] += _ANALYZER_GAS
+        if product_due:
+            clock[2] += _ANALYZER_PRODUCT
+        clock[3] += 1
+        if save:
+            n_logged += 1
+
+        shutdown = False
+        for idx in range(n):
+            if isd[idx] != 0 and np.isnan(shutdown_time[idx]) and t > 0.1:
+                shutdown_time[idx] = t
+                shutdown = True
+        if shutdown and stop_on_shutdown:
+            return tick, n_logged, False
+
+        # inputs of the next step, a change of the disturbances invalidates the model evaluation of the outputs
+        idv_changed = False
+        for idx in range(n):
+            for j in range(28):
+                value = idv_blocks[idx, 1, j] if t >= idv_blocks[idx, 2, j] else idv_blocks[idx, 0, j]
+                new_idv[j] = min(max(float(np.float32(value)), 0.), 1.)
+            for j in range(28):
+                if new_idv[j] != idv[idx, j]:
+                    idv_changed = True
+                idv[idx, j] = new_idv[j]
+        for idx in range(n):
+            _step(plant_time, ts_base, idx, x, xmv, idv, vcv, isd, tc, adist, bdist, cdist, ddist, tlast, work,
+                  k1[idx], not idv_changed)
+        clock[0] = plant_time + ts_base
+        tick += 1
+    return tick, n_logged, True
+
+
+def run_until(ensemble, last_tick, stop_on_shutdown):
+    """Compiled equivalent of the loop of :func:`~pytep.ensemble.Ensemble.run_until`. Advances the plant and the
+    controllers of the ensemble in place and appends the logged rows to its log.
+
+    Parameters
+    ----------
+    ensemble : Ensemble
+    last_tick : int
+        Last base time step to process
+    stop_on_shutdown : bool
+        Stop as soon as any member shuts down after t = 0.1 h
+
+    Returns
+    -------
+    bool
+        False if the simulation was stopped because of a shutdown, True otherwise
+    """
+    plant, controller = ensemble._plant, ensemble._controller
+    n, first_tick, save_every = ensemble.n, ensemble._tick, ensemble._save_every
+    n_saves = max(last_tick // save_every - (first_tick - 1) // save_every, 0) if last_tick >= first_tick else 0
+    log_time = np.empty(n_saves)
+    log_process_data = np.empty((n_saves, n, 41))
+    log_xmv = np.empty((n_saves, n, 12))
+    log_setpoints = np.empty((n_saves, n, 12))
+    log_idv = np.empty((n_saves, n, 28))
+    log_cost = np.empty((n_saves, n))
+
+    clock = np.array([plant.time, plant._tgas, plant._tprod, controller._ticks], dtype=float)
+    rate_sp = np.empty((n, 2))
+    if controller.production_sp is not None:
+        rate_sp[:, 0] = controller.production_sp
+        rate_sp[:, 1] = controller.pct_g_sp
+    # the plant and controllers are updated in place, their arrays must be writable and contiguous
+    for obj, names in [(plant, ["x", "xmv", "idv", "_vcv", "_tc", "_xdel", "_xdeladd", "_xmeas", "_xmeasadd",
+                                "_adist", "_bdist", "_cdist", "_ddist", "_tlast", "_tnext"]),
+                       (controller, ["_u", "_e", "_e_trim", "_r1", "_r4"])]:
+        for name in names:
+            setattr(obj, name, np.array(getattr(obj, name), dtype=float, order="C"))
+    plant.isd = np.array(plant.isd, dtype=np.int64)
+
+    tick, n_logged, completed = _run(
+        first_tick, last_tick, stop_on_shutdown, ensemble.ts_base, save_every, controller._trim_every, clock,
+        plant.x, plant.xmv, plant.idv, plant.isd, plant._vcv, plant._tc, plant._xdel, plant._xdeladd,
+        plant._xmeas, plant._xmeasadd, plant._measnoise.seeds, plant._procdist.seeds,
+        plant._adist, plant._bdist, plant._cdist, plant._ddist, plant._tlast, plant._tnext,
+        controller._u, controller._e, controller._e_trim, controller._r1, controller._r4, rate_sp,
+        ensemble._sp_blocks, ensemble._idv_blocks, ensemble.shutdown_time,
+        log_time, log_process_data, log_xmv, log_setpoints, log_idv, log_cost,
+    )
+
+    plant.time, plant._tgas, plant._tprod = clock[0], clock[1], clock[2]
+    plant._proc = None
+    controller._ticks = int(clock[3])
+    if controller._ticks > 0:
+        controller.production_sp = rate_sp[:, 0].copy()
+        controller.pct_g_sp = rate_sp[:, 1].copy()
+    ensemble._tick = tick
+    log = ensemble._log
+    log["time"].extend(log_time[:n_logged].tolist())
+    for name, rows in [("process_data", log_process_data), ("xmv", log_xmv), ("setpoints", log_setpoints),
+                       ("idv", log_idv), ("cost", log_cost)]:
+        log[name].extend(rows[:n_logged])
+    if n_logged:
+        ensemble._results.clear()
+    return completed
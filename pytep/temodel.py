@@ -0,0 +1,813 @@
+"""NumPy implementation of the Tennessee Eastman process model.
+
+This is a port of the S-function in ``simulator/temexd_mod.c`` (``teinit``, ``tefunc`` and ``tesub1_`` - ``tesub8_``)
+as it is configured in the MultiLoop_mode3 Simulink model (MSFlag 227: additional measurements, disturbance outputs,
+separate random streams for measurement noise and process disturbances, sorted recalculation of the random
+disturbance processes and continuous IDV values in [0, 1]).
+
+All plant quantities carry a leading batch dimension, so a single :class:`TEProcess` advances ``n`` independent
+copies of the plant in lockstep. The random number generators of the original code are reproduced per plant, using
+the same double precision linear congruential generator.
+"""
+import functools
+import math
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def _f32_scalar(value):
+    return float(np.float32(value))
+
+
+def _f32(value):
+    """Rounds a constant to single precision, mirroring the ``(float)`` casts of the C implementation."""
+    if isinstance(value, (int, float)):
+        # cached, the model evaluation rounds the same constants on every call
+        return _f32_scalar(value)
+    return np.asarray(value, dtype=np.float32).astype(np.float64)
+
+
+N_STATES = 50
+N_XMEAS = 41
+N_XMEAS_ADD = 32
+N_XMEAS_DIST = 21
+N_XMV = 12
+N_IDV = 28
+
+# component data
+XMW = _f32([2., 25.4, 28., 32., 46., 48., 62., 76.])
+AVP = _f32([0., 0., 0., 15.92, 16.35, 16.35, 16.43, 17.21])
+BVP = _f32([0., 0., 0., -1444., -2114., -2114., -2748., -3318.])
+CVP = _f32([0., 0., 0., 259., 265.5, 265.5, 232.9, 249.6])
+AD = _f32([1., 1., 1., 23.3, 33.9, 32.8, 49.9, 50.5])
+BD = _f32([0., 0., 0., -.07, -.0957, -.0995, -.0191, -.0541])
+CD = _f32([0., 0., 0., -2e-4, -1.52e-4, -2.33e-4, -4.25e-4, -1.5e-4])
+AH = np.array([1e-6, 1e-6, 1e-6, 9.6e-7, 5.73e-7, 6.52e-7, 5.15e-7, 4.71e-7])
+BH = np.array([0., 0., 0., 8.7e-9, 2.41e-9, 2.18e-9, 5.65e-10, 8.7e-10])
+CH = np.array([0., 0., 0., 4.81e-11, 1.82e-11, 1.94e-11, 3.82e-12, 2.62e-12])
+AV = np.array([1e-6, 1e-6, 1e-6, 8.67e-5, 1.6e-4, 1.6e-4, 2.25e-4, 2.09e-4])
+AG = np.array([3.411e-6, 3.799e-7, 2.491e-7, 3.567e-7, 3.463e-7, 3.93e-7, 1.7e-7, 1.5e-7])
+BG = np.array([7.18e-10, 1.08e-9, 1.36e-11, 8.51e-10, 8.96e-10, 1.02e-9, 0., 0.])
+CG = np.array([6e-13, -3.98e-13, -3.93e-14, -3.12e-13, -3.27e-13, -3.12e-13, 0., 0.])
+# enthalpy polynomials per component, h_i(t) = sum_k coefficient_ik * t**k (``tesub1_``)
+_LIQUID_COEFFICIENTS = np.stack([np.zeros(8), 1.8 * AH, 1.8 * BH / 2., 1.8 * CH / 3.], axis=-1) * XMW[:, None]
+_VAPOR_COEFFICIENTS = np.stack([AV, 1.8 * AG, 1.8 * BG / 2., 1.8 * CG / 3.], axis=-1) * XMW[:, None]
+
+# mode 1 steady state used by teinit
+DEFAULT_STATE = _f32([
+    10.40491389, 4.363996017, 7.570059737, .4230042431, 24.15513437, 2.942597645, 154.3770655, 159.186596,
+    2.808522723, 63.75581199, 26.74026066, 46.38532432, .2464521543, 15.20484404, 1.852266172, 52.44639459,
+    41.20394008, .569931776, .4306056376, 0., .9056036089, 0., .7509759687, 0., 48.27726193, 39.38459028,
+    .3755297257, 107.7562698, 29.77250546, 88.32481135, 23.03929507, 62.85848794, 5.546318688, 11.92244772,
+    5.555448243, .9218489762, 94.59927549, 77.29698353, 63.05263039, 53.97970677, 24.64355755, 61.30192144,
+    22.21, 40.06374673, 38.1003437, 46.53415582, 47.44573456, 41.10581288, 18.11349055, 50.,
+])
+DEFAULT_STATE[[19, 21, 23]] = [.0079906200783, .016054258216, .088582855955]
+
+# process equipment
+VRNG = _f32([400., 400., 100., 1500., 0., 0., 1500., 1e3, .03, 1e3, 1200., 0.])
+VTR = _f32(1300.)
+VTS = _f32(3500.)
+VTC = _f32(156.5)
+VTV = _f32(5e3)
+HTR = np.array([.06899381054, .05])
+HWR = _f32(7060.)
+HWS = _f32(11138.)
+SFR_FIXED = np.concatenate([_f32([.995, .991, .99]), [0., 0., 0., 0., 0.]])
+CPFLMX = _f32(280275.)
+CPPRMX = _f32(1.3)
+VTAU = _f32([8., 8., 6., 9., 7., 5., 5., 5., 120., 5., 5., 5.]) / _f32(3600.)
+VST = 2.
+RG = _f32(998.9)
+
+# compositions and temperatures of the feed streams 1 - 4 (D, E, A and A+C feed)
+XST_FEED = np.zeros(32)
+XST_FEED[[1, 3]] = _f32([1e-4, .9999])
+XST_FEED[[12, 13]] = _f32([.9999, 1e-4])
+XST_FEED[[16, 17]] = _f32([.9999, 1e-4])
+XST_FEED[[24, 25, 26]] = _f32([.485, .005, .51])
+TST_FEED = _f32(45.)
+
+# measurement noise standard deviations
+XNS = np.array([
+    .0012, 18., 22., .05, .2, .21, .3, .5, .01, .0017, .01, 1., .3, .125, 1., .3, .115, .01, 1.15, .2, .01, .01,
+    .25, .1, .25, .1, .25, .025, .25, .1, .25, .1, .25, .025, .05, .05, .01, .01, .01, .5, .5,
+])
+XNSADD = np.array([.01, .01, .01, .01, .01, .125, .01, .125, .01, .01] + [.25, .1, .25, .1, .25, .025] * 4)
+
+# random walk disturbance processes (idv 8 - 12 and 13 - 28)
+HSPAN = np.array([.2, .7, .25, .7, .15, .15, 1., 1., .4, 1.5, 2., 1.5, .15, .25, .15, .25, .25, .7, .1, .1])
+HZERO = np.array([.5, 1., .5, 1., .25, .25, 2., 2., .5, 2., 3., 2., .25, .5, .25, .5, .5, 1., .2, .2])
+SSPAN = np.array([.03, .003, 10., 10., 10., 10., .25, .25, .25, 0., 0., 0., 10., 10., 5., 20., 20., 75., 50., 60.])
+SZERO = np.array([.485, .005, 45., 45., 35., 40., 1., 1., 0., 0., 0., 0., 45., 45., 100., 400., 400., 1500., 1e3,
+              1200.])
+SPSPAN = np.zeros(20)
+IDVWLK = np.array([7, 7, 8, 9, 10, 11, 12, 12, 15, 16, 17, 19, 20, 21, 22, 23, 24, 25, 26, 27])
+_WLK_GROUPS = (list(range(9)) + list(range(12, 20)), [9, 10, 11])
+
+DEFAULT_SEED = 1431655765.
+
+# sampling intervals of the gas and product analyzers in hours
+_ANALYZER_GAS = float(np.float32(.1))
+_ANALYZER_PRODUCT = float(np.float32(.25))
+
+SHUTDOWN_MESSAGES = {
+    1: "High Reactor Pressure!! Shutting down.",
+    2: "High Reactor Liquid Level!! Shutting down.",
+    3: "Low Reactor Liquid Level!! Shutting down.",
+    4: "High Reactor Temperature!! Shutting down.",
+    5: "High Separator Liquid Level!! Shutting down.",
+    6: "Low Separator Liquid Level!! Shutting down.",
+    7: "High Stripper Liquid Level!! Shutting down.",
+    8: "Low Stripper Liquid Level!! Shutting down.",
+}
+
+
+# streams (index = stream number - 1) whose enthalpy is evaluated with the temperatures of the feeds and units
+_VAPOR_STREAMS = [0, 1, 2, 3, 5, 7, 8]
+_LIQUID_STREAMS = [10, 12]
+
+
+def _enthalpy_coefficients(z, ity):
+    """Polynomial coefficients (..., 4) of the mixture enthalpy in the temperature, lowest order first"""
+    c = z @ (_VAPOR_COEFFICIENTS if ity else _LIQUID_COEFFICIENTS)
+    if ity == 2:
+        c[..., 0] -= 3.57696e-6 * _f32(273.15)
+        c[..., 1] -= 3.57696e-6
+    return c
+
+
+def enthalpy(z, t, ity):
+    """Specific enthalpy of a mixture (``tesub1_``)
+
+    Parameters
+    ----------
+    z : np.array
+        Mole fractions (..., 8)
+    t : np.array
+        Temperature in deg C (...)
+    ity : int
+        0 for liquid, 1 for vapor and 2 for vapor at constant volume
+
+    Returns
+    -------
+    np.array
+        Enthalpy (...)
+    """
+    return _polynomial(_enthalpy_coefficients(z, ity), t)
+
+
+def _polynomial(c, t):
+    return c[..., 0] + t * (c[..., 1] + t * (c[..., 2] + t * c[..., 3]))
+
+
+def temperature(z, h, t_guess, ity):
+    """Solves :func:`enthalpy` for the temperature with Newton's method (``tesub2_``)
+
+    Parameters
+    ----------
+    z : np.array
+        Mole fractions (..., 8)
+    h : np.array
+        Specific enthalpy (...)
+    t_guess : np.array
+        Initial temperature guess. Returned for every element that does not converge within 100 iterations.
+    ity : int
+        See :func:`enthalpy`
+
+    Returns
+    -------
+    np.array
+        Temperature in deg C (...)
+    """
+    return _solve_temperature(_enthalpy_coefficients(z, ity), h, t_guess)
+
+
+def _solve_temperature(c, h, t_guess):
+    """Newton iteration of :func:`temperature` for the enthalpy coefficients c (..., 4)"""
+    c0, c1, c2, c3 = c[..., 0] - h, c[..., 1], c[..., 2], c[..., 3]
+    t = np.array(t_guess, dtype=float)
+    active = np.ones(t.shape, dtype=bool)
+    for _ in range(100):
+        dt = -(c0 + t * (c1 + t * (c2 + t * c3))) / (c1 + t * (2. * c2 + t * 3. * c3))
+        t = np.where(active, t + dt, t)
+        active &= ~(np.abs(dt) < 1e-12)
+        if not active.any():
+            return t
+    return np.where(active, t_guess, t)
+
+
+def density(x, t):
+    """Liquid density of a mixture (``tesub4_``)"""
+    t = t[..., None]
+    return 1. / np.sum(x * XMW / (AD + (BD + CD * t) * t), axis=-1)
+
+
+class _LCG:
+    """The random number generator of ``tesub7_`` for a batch of independent seeds."""
+
+    MULTIPLIER = 9228907.
+    MODULUS = 4294967296.
+
+    def __init__(self, seeds):
+        self.seeds = np.array(seeds, dtype=float)
+
+    def uniform(self, idx):
+        """Draws one number in [0, 1) for plant ``idx``"""
+        s = math.fmod(self.seeds[idx] * self.MULTIPLIER, self.MODULUS)
+        self.seeds[idx] = s
+        return s / self.MODULUS
+
+    def symmetric(self, idx):
+        """Draws one number in [-1, 1) for plant ``idx``"""
+        return 2. * self.uniform(idx) - 1.
+
+    def gaussian(self, std, active):
+        """Approximately normal noise as the sum of 12 uniform numbers (``tesub6_``)
+
+        Parameters
+        ----------
+        std : np.array
+            Standard deviations (k,), drawn in this order
+        active : np.array
+            Boolean mask (n,) of the plants whose generator is advanced. Inactive plants receive zeros.
+
+        Returns
+        -------
+        np.array
+            Noise (n, k)
+        """
+        n, k = active.size, len(std)
+        noise = np.zeros((n, k))
+        if n <= 8:
+            mult, mod, fmod = self.MULTIPLIER, self.MODULUS, math.fmod
+            for idx in np.flatnonzero(active):
+                s = self.seeds[idx]
+                row = noise[idx]
+                for j in range(k):
+                    acc = 0.
+                    for _ in range(12):
+                        s = fmod(s * mult, mod)
+                        acc += s / mod
+                    row[j] = (acc - 6.) * std[j]
+                self.seeds[idx] = s
+            return noise
+        s = self.seeds[active]
+        draws = np.empty((k * 12, s.size))
+        wraps = np.empty_like(s)
+        for row in draws:
+            # s - MODULUS * floor(s / MODULUS) is exact for the power of two modulus and much faster than np.fmod
+            np.multiply(s, self.MULTIPLIER, out=s)
+            np.multiply(s, 1. / self.MODULUS, out=wraps)
+            np.floor(wraps, out=wraps)
+            wraps *= self.MODULUS
+            s -= wraps
+            row[:] = s
+        self.seeds[active] = s
+        # dividing by the power of two modulus is exact, so the sums match the sequential accumulation above
+        acc = draws.reshape(k, 12, -1).sum(axis=1) / self.MODULUS
+        noise[active] = (acc.T - 6.) * std
+        return noise
+
+
+class TEProcess:
+    """Tennessee Eastman process for a batch of ``n`` plants.
+
+    Parameters
+    ----------
+    n : int, optional
+        Number of plants, by default 1
+    x0 : np.array, optional
+        Initial state (50,) or (n, 50), by default the mode 1 steady state of ``teinit``
+    seed : float or np.array, optional
+        Seed(s) for the random number generators, by default the seed of ``teinit``
+    """
+
+    def __init__(self, n=1, x0=None, seed=None):
+        self.n = n
+        self.x = np.empty((n, N_STATES))
+        self.xmv = np.empty((n, N_XMV))
+        self.idv = np.zeros((n, N_IDV))
+        self.time = 0.
+        self.reset(x0, seed)
+
+    def reset(self, x0=None, seed=None):
+        """Resets the plants to their initial state at t = 0 (``teinit`` and ``mdlInitializeConditions``)
+
+        Parameters
+        ----------
+        x0 : np.array, optional
+            Initial state (50,) or (n, 50), by default the mode 1 steady state of ``teinit``
+        seed : float or np.array, optional
+            Seed(s) for the random number generators, by default the seed of ``teinit``
+        """
+        n = self.n
+        seed = DEFAULT_SEED if seed is None else seed
+        seeds = np.broadcast_to(np.asarray(seed, dtype=float), (n,))
+        self._measnoise = _LCG(seeds)
+        self._procdist = _LCG(seeds)
+        self._reset_disturbances()
+        self.time = 0.
+        self.idv[:] = 0.
+        self.isd = np.zeros(n, dtype=int)
+        self._vcv = np.empty((n, N_XMV))
+        self._tc = np.empty((n, 4))
+        self._xdel = np.zeros((n, N_XMEAS))
+        self._xdeladd = np.zeros((n, 24))
+        self._xmeas = np.zeros((n, N_XMEAS))
+        self._xmeasadd = np.zeros((n, N_XMEAS_ADD))
+        self._tgas = _ANALYZER_GAS
+        self._tprod = _ANALYZER_PRODUCT
+        self._proc = None
+        # teinit evaluates the model once at the default state, which seeds the temperature iterations
+        self.x[:] = DEFAULT_STATE
+        self.xmv[:] = DEFAULT_STATE[38:]
+        self._vcv[:] = self.xmv
+        self._tc[:] = 0.
+        self._evaluate(self.time, self.x)
+        if x0 is not None:
+            self.x[:] = x0
+            self.xmv[:] = self.x[:, 38:]
+
+    def _reset_disturbances(self):
+        n = self.n
+        self._adist = np.tile(SZERO, (n, 1))
+        self._bdist = np.zeros((n, 20))
+        self._cdist = np.zeros((n, 20))
+        self._ddist = np.zeros((n, 20))
+        self._tlast = np.zeros((n, 20))
+        self._tnext = np.full((n, 20), .1)
+
+    @property
+    def shutdown(self):
+        """Boolean mask (n,) of the plants for which a shutdown constraint was violated"""
+        return self.isd != 0
+
+    def set_inputs(self, xmv, idv):
+        """Sets the manipulated variables and disturbance activations (``getcurr`` and ``setidv``)
+
+        Parameters
+        ----------
+        xmv : np.array
+            Manipulated variables (12,) or (n, 12)
+        idv : np.array
+            Disturbance activations (28,) or (n, 28) between 0 and 1
+        """
+        self.xmv[:] = xmv
+        idv = np.broadcast_to(np.clip(_f32(idv), 0., 1.), self.idv.shape)
+        if not np.array_equal(idv, self.idv):
+            # the cached model evaluation of the current major step depends on the disturbances
+            self._proc = None
+        self.idv[:] = idv
+
+    # random walk disturbances
+
+    def _disturbances(self, t):
+        """Evaluates the 20 cubic random walk processes at time t (``tesub8_``), (n, 20)"""
+        h = t - self._tlast
+        return self._adist + h * (self._bdist + h * (self._cdist + h * self._ddist))
+
+    def _update_disturbances(self, t):
+        """Starts new random walk segments for all processes whose segment ended before t"""
+        if t == 0.:
+            self._reset_disturbances()
+            return
+        due = t >= self._tnext
+        if not due.any():
+            return
+        for idx in np.flatnonzero(due.any(axis=1)):
+            idvwlk = self.idv[idx, IDVWLK]
+            for group_no, group in enumerate(_WLK_GROUPS):
+                self._update_walk_group(idx, [i for i in group if due[idx, i]], idvwlk, group_no == 1)
+
+    def _update_walk_group(self, idx, procs, idvwlk, bounded):
+        tnext = self._tnext[idx]
+        # insertion sort by the end of the current segment, including the indexing quirk of the C implementation
+        for i in range(1, len(procs)):
+            proc = procs[i]
+            j = i
+            while j > 0 and tnext[j - 1] > tnext[proc]:
+                procs[j] = procs[j - 1]
+                j -= 1
+            procs[j] = proc
+        a, b, c, d, tlast = self._adist[idx], self._bdist[idx], self._cdist[idx], self._ddist[idx], self._tlast[idx]
+        for k in procs:
+            h = tnext[k] - tlast[k]
+            s = a[k] + h * (b[k] + h * (c[k] + h * d[k]))
+            sp = b[k] + h * (c[k] * 2. + h * 3. * d[k])
+            tlast[k] = tnext[k]
+            if not bounded:
+                h = HSPAN[k] * self._procdist.symmetric(idx) + HZERO[k]
+                s1 = SSPAN[k] * self._procdist.symmetric(idx) * idvwlk[k] + SZERO[k]
+                s1p = SPSPAN[k] * self._procdist.symmetric(idx) * idvwlk[k]
+                a[k], b[k] = s, sp
+                c[k] = ((s1 - s) * 3. - h * (s1p + sp * 2.)) / (h * h)
+                d[k] = ((s - s1) * 2. + h * (s1p + sp)) / (h * (h * h))
+                tnext[k] = tlast[k] + h
+            elif s > .1:
+                a[k], b[k] = s, sp
+                c[k] = -(s * 3. + sp * .2) / .01
+                d[k] = (s * 2. + sp * .1) / .001
+                tnext[k] = tlast[k] + .1
+            else:
+                h = HSPAN[k] * self._procdist.symmetric(idx) + HZERO[k]
+                a[k], b[k] = s, sp
+                c[k] = (idvwlk[k] - 2 * sp * h) / (h * h)
+                d[k] = sp / (h * h)
+                tnext[k] = tlast[k] + h
+
+    # process model
+
+    def _evaluate(self, t, x):
+        """Evaluates the process model (the process part of ``tefunc``)
+
+        Parameters
+        ----------
+        t : float
+            Simulation time in hours
+        x : np.array
+            States (n, 50)
+
+        Returns
+        -------
+        dict
+            Process quantities needed for the measurements and the state derivatives
+        """
+        idv = self.idv
+        wlk = self._disturbances(t)
+
+        # disturbed feed conditions
+        xst_a_c = np.empty((self.n, 8))
+        xst_a_c[:, 0] = wlk[:, 0] - idv[:, 0] * .03 - idv[:, 1] * .00243719
+        xst_a_c[:, 1] = wlk[:, 1] + idv[:, 1] * .005
+        xst_a_c[:, 2] = 1. - xst_a_c[:, 0] - xst_a_c[:, 1]
+        xst_a_c[:, 3:] = 0.
+        tst0 = wlk[:, 2] + idv[:, 2] * 5.
+        tst3 = wlk[:, 3]
+        tcwr = wlk[:, 4] + idv[:, 3] * 5.
+        tcws = wlk[:, 5] + idv[:, 4] * 5.
+        r1f = wlk[:, 6]
+        r2f = wlk[:, 7]
+        tst2 = wlk[:, 12]
+        tst1 = wlk[:, 13]
+        vrng = np.tile(VRNG, (self.n, 1))
+        vrng[:, [2, 0, 1, 3, 9, 10]] = wlk[:, 14:20]
+
+        # states
+        ucvr = x[:, 0:8].copy()
+        ucvs = x[:, 9:17].copy()
+        uclr = x[:, 0:8].copy()
+        ucls = x[:, 9:17].copy()
+        uclr[:, :3] = 0.
+        ucls[:, :3] = 0.
+        uclc = x[:, 18:26]
+        ucvv = x[:, 27:35]
+        etr, ets, etc, etv = x[:, 8], x[:, 17], x[:, 26], x[:, 35]
+        twr, tws = x[:, 36], x[:, 37]
+        vpos = x[:, 38:50]
+
+        utlr = uclr.sum(axis=1)
+        utls = ucls.sum(axis=1)
+        utlc = uclc.sum(axis=1)
+        utvv = ucvv.sum(axis=1)
+        xlr = uclr / utlr[:, None]
+        xls = ucls / utls[:, None]
+        xlc = uclc / utlc[:, None]
+        xvv = ucvv / utvv[:, None]
+
+        # temperatures of reactor, separator, stripper (liquid) and vapor space, solved together and starting from
+        # the previous solution as in the C implementation
+        liquids = np.stack([xlr, xls, xlc], axis=1)
+        c = np.concatenate([_enthalpy_coefficients(liquids, 0), _enthalpy_coefficients(xvv[:, None], 2)], axis=1)
+        h = np.stack([etr / utlr, ets / utls, etc / utlc, etv / utvv], axis=1)
+        self._tc = tc = _solve_temperature(c, h, self._tc)
+        tcr, tcs, tcc, tcv = tc[:, 0], tc[:, 1], tc[:, 2], tc[:, 3]
+        tkr = tcr + _f32(273.15)
+        tks = tcs + _f32(273.15)
+        tkv = tcv + _f32(273.15)
+
+        dlr, dls, dlc = density(liquids, tc[:, :3]).T
+        vlr = utlr / dlr
+        vls = utls / dls
+        vlc = utlc / dlc
+        vvr = VTR - vlr
+        vvs = VTS - vls
+
+        # pressures
+        ppr = np.empty((self.n, 8))
+        pps = np.empty((self.n, 8))
+        ppr[:, :3] = ucvr[:, :3] * RG * tkr[:, None] / vvr[:, None]
+        pps[:, :3] = ucvs[:, :3] * RG * tks[:, None] / vvs[:, None]
+        ppr[:, 3:] = np.exp(AVP[3:] + BVP[3:] / (tcr[:, None] + CVP[3:])) * xlr[:, 3:]
+        pps[:, 3:] = np.exp(AVP[3:] + BVP[3:] / (tcs[:, None] + CVP[3:])) * xls[:, 3:]
+        ptr = ppr.sum(axis=1)
+        pts = pps.sum(axis=1)
+        ptv = utvv * RG * tkv / VTV
+        xvr = ppr / ptr[:, None]
+        xvs = pps / pts[:, None]
+
+        # reaction kinetics
+        rr = np.empty((self.n, 4))
+        rr[:, 0] = np.exp(_f32(31.5859536) - _f32(20130.85052843482) / tkr) * r1f
+        rr[:, 1] = np.exp(_f32(3.00094014) - _f32(10065.42526421741) / tkr) * r2f
+        rr[:, 2] = np.exp(_f32(53.4060443) - _f32(30196.27579265224) / tkr)
+        rr[:, 3] = rr[:, 2] * .767488334
+        feasible = (ppr[:, 0] > 0.) & (ppr[:, 2] > 0.)
+        with np.errstate(invalid="ignore"):
+            rfac = np.where(feasible, np.power(ppr[:, 0], 1.1544) * np.power(ppr[:, 2], .3735), 0.)
+        rr[:, 0] *= rfac * ppr[:, 3]
+        rr[:, 1] *= rfac * ppr[:, 4]
+        rr[:, 2] *= ppr[:, 0] * ppr[:, 4]
+        rr[:, 3] *= ppr[:, 0] * ppr[:, 3]
+        rr *= vvr[:, None]
+        crxr = np.empty((self.n, 8))
+        crxr[:, 0] = -rr[:, 0] - rr[:, 1] - rr[:, 2]
+        crxr[:, 1] = 0.
+        crxr[:, 2] = -rr[:, 0] - rr[:, 1]
+        crxr[:, 3] = -rr[:, 0] - rr[:, 3] * 1.5
+        crxr[:, 4] = -rr[:, 1] - rr[:, 2]
+        crxr[:, 5] = rr[:, 2] + rr[:, 3]
+        crxr[:, 6] = rr[:, 0]
+        crxr[:, 7] = rr[:, 1]
+        rh = rr[:, 0] * HTR[0] + rr[:, 1] * HTR[1]
+
+        # stream compositions, indexed by stream number - 1
+        xst = np.zeros((self.n, 13, 8))
+        xst[:, 0:3] = XST_FEED[:24].reshape(3, 8)
+        xst[:, 3] = xst_a_c
+        xst[:, 5] = xvv
+        xst[:, 7] = xvr
+        xst[:, 8] = xvs
+        xst[:, 9] = xvs
+        xst[:, 10] = xls
+        xst[:, 12] = xlc
+        xmws = np.sum(xst * XMW, axis=2)
+
+        hst = np.empty((self.n, 13))
+        vapor_temperatures = np.stack([tst0, tst1, tst2, tst3, tcv, tcr, tcs], axis=1)
+        hst[:, _VAPOR_STREAMS] = enthalpy(xst[:, _VAPOR_STREAMS], vapor_temperatures, 1)
+        hst[:, 9] = hst[:, 8]
+        hst[:, _LIQUID_STREAMS] = enthalpy(xst[:, _LIQUID_STREAMS], np.stack([tcs, tcc], axis=1), 0)
+
+        # flows
+        ftm = np.zeros((self.n, 13))
+        ftm[:, 0] = vpos[:, 0] * vrng[:, 0] / _f32(100.)
+        ftm[:, 1] = vpos[:, 1] * vrng[:, 1] / _f32(100.)
+        ftm[:, 2] = vpos[:, 2] * (1. - idv[:, 5]) * vrng[:, 2] / _f32(100.)
+        ftm[:, 3] = vpos[:, 3] * (1. - idv[:, 6] * .2) * vrng[:, 3] / _f32(100.) + 1e-10
+        ftm[:, 10] = vpos[:, 6] * vrng[:, 6] / _f32(100.)
+        ftm[:, 12] = vpos[:, 7] * vrng[:, 7] / _f32(100.)
+        uac = vpos[:, 8] * vrng[:, 8] * (wlk[:, 8] + 1.) / _f32(100.)
+        fwr = vpos[:, 9] * vrng[:, 9] / _f32(100.)
+        fws = vpos[:, 10] * vrng[:, 10] / _f32(100.)
+        agsp = (vpos[:, 11] + _f32(150.)) / _f32(100.)
+        ftm[:, 5] = np.sqrt(np.maximum(ptv - ptr, 0.)) * 1937.6 / xmws[:, 5]
+        ftm[:, 7] = np.sqrt(np.maximum(ptr - pts, 0.)) * 4574.21 * (1. - wlk[:, 11] * .25) / xmws[:, 7]
+        ftm[:, 9] = vpos[:, 5] * .151169 * np.sqrt(np.maximum(pts - _f32(760.), 0.)) / xmws[:, 9]
+
+        # compressor
+        pr = np.minimum(np.maximum(ptv / pts, 1.), CPPRMX)
+        flcoef = CPFLMX / 1.197
+        flms = CPFLMX + flcoef * (1. - pr * (pr * pr))
+        cpdh = flms * (tcs + 273.15) * 1.8e-6 * 1.9872 * (ptv - pts) / (xmws[:, 8] * pts)
+        flms = flms - vpos[:, 4] * 53.349 * np.sqrt(np.maximum(ptv - pts, 0.))
+        flms = np.maximum(flms, .001)
+        ftm[:, 8] = flms / xmws[:, 8]
+        hst[:, 8] += cpdh / ftm[:, 8]
+
+        fcm = xst * ftm[:, :, None]
+
+        # stripper
+        sfr = np.tile(SFR_FIXED, (self.n, 1))
+        sfr[:, 6:] = [.058, .0301]
+        stripping = ftm[:, 10] > _f32(.1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tmpfac = np.where(
+                tcc > _f32(170.),
+                tcc - _f32(120.262),
+                np.where(tcc < _f32(5.292), _f32(.1), _f32(363.744) / (_f32(177.) - tcc) - _f32(2.22579488)),
+            )
+            vovrl = (ftm[:, 3] / ftm[:, 10] * tmpfac)[:, None]
+            kfac = _f32([8.501, 11.402, 11.795, .048, .0242])
+            sfr[:, 3:] = np.where(
+                stripping[:, None], vovrl * kfac / (vovrl * kfac + 1.), _f32([.9999, .999, .999, .99, .98])
+            )
+        fin = fcm[:, 3] + fcm[:, 10]
+        fcm[:, 4] = sfr * fin
+        fcm[:, 11] = fin - fcm[:, 4]
+        ftm[:, 4] = fcm[:, 4].sum(axis=1)
+        ftm[:, 11] = fcm[:, 11].sum(axis=1)
+        xst[:, 4] = fcm[:, 4] / ftm[:, 4, None]
+        xst[:, 11] = fcm[:, 11] / ftm[:, 11, None]
+        hst[:, 4] = enthalpy(xst[:, 4], tcc, 1)
+        hst[:, 11] = enthalpy(xst[:, 11], tcc, 0)
+        ftm[:, 6] = ftm[:, 5]
+        hst[:, 6] = hst[:, 5]
+        xst[:, 6] = xst[:, 5]
+        fcm[:, 6] = fcm[:, 5]
+
+        # heat transfer
+        uarlev = np.where(
+            vlr / _f32(7.8) > 50., 1., np.where(vlr / _f32(7.8) < 10., 0., vlr * _f32(.025) / _f32(7.8) - _f32(.25))
+        )
+        uar = uarlev * (agsp * agsp * _f32(-.5) + agsp * _f32(2.75) - _f32(2.5)) * .85549
+        qur = uar * (twr - tcr) * (1. - wlk[:, 9] * .35)
+        d = ftm[:, 7] / _f32(3528.73)
+        d = d * d
+        uas = (1. - 1. / (d * d + 1.)) * _f32(.404655)
+        qus = uas * (tws - tcr) * (1. - wlk[:, 10] * .25)
+        quc = np.where(tcc < 100., uac * (_f32(100.) - tcc), 0.)
+
+        return dict(
+            wlk=wlk, xst=xst, ftm=ftm, fcm=fcm, hst=hst, xmws=xmws, crxr=crxr, rh=rh, qur=qur, qus=qus, quc=quc,
+            cpdh=cpdh, ptr=ptr, pts=pts, ptv=ptv, vlr=vlr, vls=vls, vlc=vlc, dls=dls, dlc=dlc, tcr=tcr, tcs=tcs,
+            tcc=tcc, twr=twr, tws=tws, tcwr=tcwr, tcws=tcws, fwr=fwr, fws=fws, tst0=tst0, tst1=tst1, tst2=tst2,
+            tst3=tst3, r1f=r1f, r2f=r2f, vrng=vrng, xst_a_c=xst_a_c,
+        )
+
+    def derivatives(self, t, x, proc=None):
+        """State derivatives of all plants (derivative part of ``tefunc``)
+
+        Parameters
+        ----------
+        t : float
+            Simulation time in hours
+        x : np.array
+            States (n, 50)
+        proc : dict, optional
+            Result of a previous model evaluation at (t, x)
+
+        Returns
+        -------
+        np.array
+            Time derivatives of the states (n, 50)
+        """
+        if proc is None:
+            proc = self._evaluate(t, x)
+        fcm, ftm, hst = proc["fcm"], proc["ftm"], proc["hst"]
+        yp = np.empty_like(x)
+        yp[:, 0:8] = fcm[:, 6] - fcm[:, 7] + proc["crxr"]
+        yp[:, 9:17] = fcm[:, 7] - fcm[:, 8] - fcm[:, 9] - fcm[:, 10]
+        yp[:, 18:26] = fcm[:, 11] - fcm[:, 12]
+        yp[:, 27:35] = fcm[:, 0] + fcm[:, 1] + fcm[:, 2] + fcm[:, 4] + fcm[:, 8] - fcm[:, 5]
+        hf = hst * ftm
+        yp[:, 8] = hf[:, 6] - hf[:, 7] + proc["rh"] + proc["qur"]
+        yp[:, 17] = hf[:, 7] - hf[:, 8] - hf[:, 9] - hf[:, 10] + proc["qus"]
+        yp[:, 26] = hf[:, 3] + hf[:, 10] - hf[:, 4] - hf[:, 12] + proc["quc"]
+        yp[:, 35] = hf[:, 0] + hf[:, 1] + hf[:, 2] + hf[:, 4] + hf[:, 8] - hf[:, 5]
+        yp[:, 36] = (proc["fwr"] * _f32(500.53) * (proc["tcwr"] - proc["twr"]) - proc["qur"] * 1e6 / _f32(1.8)) / HWR
+        yp[:, 37] = (proc["fws"] * _f32(500.53) * (proc["tcws"] - proc["tws"]) - proc["qus"] * 1e6 / _f32(1.8)) / HWS
+        yp[:, 38:] = (self._vcv - x[:, 38:]) / VTAU
+        if t > 0.:
+            yp[self.isd != 0] = 0.
+        return yp
+
+    def _update_valves(self, t):
+        """Moves the commanded valve positions towards the manipulated variables, honoring sticky valves"""
+        ivst = np.zeros((self.n, N_XMV))
+        ivst[:, 9] = self.idv[:, 13]
+        ivst[:, 10] = self.idv[:, 14]
+        ivst[:, [4, 6, 7, 8]] = self.idv[:, 18, None]
+        move = np.abs(self._vcv - self.xmv) > VST * ivst
+        if t == 0.:
+            move[:] = True
+        self._vcv = np.clip(np.where(move, self.xmv, self._vcv), 0., 100.)
+
+    def outputs(self):
+        """Evaluates the measurements of all plants at the current time (output part of ``tefunc``)
+
+        Measurement noise is drawn and the sampled analyzers are advanced, so this should be called exactly once per
+        major time step.
+
+        Returns
+        -------
+        xmeas : np.array
+            Process measurements (n, 41)
+        xmeasadd : np.array
+            Additional measurements (n, 32)
+        xmeasdist : np.array
+            Disturbance outputs (n, 21)
+        """
+        t = self.time
+        self._update_disturbances(t)
+        proc = self._evaluate(t, self.x)
+        self._proc = proc
+        ftm, xmws, xst = proc["ftm"], proc["xmws"], proc["xst"]
+        vlr, vls, vlc = proc["vlr"], proc["vls"], proc["vlc"]
+        c359 = _f32(.359) / _f32(35.3145)
+
+        xmeas = self._xmeas
+        xmeas[:, 0] = ftm[:, 2] * c359
+        xmeas[:, 1] = ftm[:, 0] * xmws[:, 0] * _f32(.454)
+        xmeas[:, 2] = ftm[:, 1] * xmws[:, 1] * _f32(.454)
+        xmeas[:, 3] = ftm[:, 3] * c359
+        xmeas[:, 4] = ftm[:, 8] * c359
+        xmeas[:, 5] = ftm[:, 5] * c359
+        xmeas[:, 6] = (proc["ptr"] - _f32(760.)) / _f32(760.) * _f32(101.325)
+        xmeas[:, 7] = (vlr - _f32(84.6)) / _f32(666.7) * _f32(100.)
+        xmeas[:, 8] = proc["tcr"]
+        xmeas[:, 9] = ftm[:, 9] * c359
+        xmeas[:, 10] = proc["tcs"]
+        xmeas[:, 11] = (vls - _f32(27.5)) / _f32(290.) * _f32(100.)
+        xmeas[:, 12] = (proc["pts"] - _f32(760.)) / _f32(760.) * _f32(101.325)
+        xmeas[:, 13] = ftm[:, 10] / proc["dls"] / _f32(35.3145)
+        xmeas[:, 14] = (vlc - _f32(78.25)) / VTC * _f32(100.)
+        xmeas[:, 15] = (proc["ptv"] - _f32(760.)) / _f32(760.) * _f32(101.325)
+        xmeas[:, 16] = ftm[:, 12] / proc["dlc"] / _f32(35.3145)
+        xmeas[:, 17] = proc["tcc"]
+        xmeas[:, 18] = proc["quc"] * 1040. * _f32(.454)
+        xmeas[:, 19] = proc["cpdh"] * 293.07
+        xmeas[:, 20] = proc["twr"]
+        xmeas[:, 21] = proc["tws"]
+
+        gpm = _f32(0.003785411784) * _f32(60.)
+        xmeasadd = self._xmeasadd
+        xmeasadd[:, 0] = proc["tst2"]
+        xmeasadd[:, 1] = proc["tst0"]
+        xmeasadd[:, 2] = proc["tst1"]
+        xmeasadd[:, 3] = proc["tst3"]
+        xmeasadd[:, 4] = proc["tcwr"]
+        xmeasadd[:, 5] = proc["fwr"] * gpm
+        xmeasadd[:, 6] = proc["tcws"]
+        xmeasadd[:, 7] = proc["fws"] * gpm
+
+        # shutdown constraints, the last violated constraint wins
+        isd = np.zeros(self.n, dtype=int)
+        for code, violated in enumerate([
+            xmeas[:, 6] > 3e3,
+            vlr / _f32(35.3145) > 24.,
+            vlr / _f32(35.3145) < 2.,
+            xmeas[:, 8] > 175.,
+            vls / _f32(35.3145) > 12.,
+            vls / _f32(35.3145) < 1.,
+            vlc / _f32(35.3145) > 8.,
+            vlc / _f32(35.3145) < 1.,
+        ], start=1):
+            isd[violated] = code
+        self.isd = isd
+
+        if t > 0.:
+            noise = self._measnoise.gaussian(np.concatenate([XNS[:22], XNSADD[:8]]), isd == 0)
+            xmeas[:, :22] += noise[:, :22]
+            xmeasadd[:, :8] += noise[:, 22:]
+
+        # sampled analyzers with dead time
+        xcmp = np.concatenate([xst[:, 6, :6], xst[:, 9], xst[:, 12, 3:]], axis=1) * _f32(100.)
+        xcmpadd = np.concatenate([xst[:, 2, :6], xst[:, 0, :6], xst[:, 1, :6], xst[:, 3, :6]], axis=1) * _f32(100.)
+        if t == 0.:
+            self._xdel[:, 22:] = xcmp
+            xmeas[:, 22:] = xcmp
+            self._xdeladd[:] = xcmpadd
+            xmeasadd[:, 8:] = xcmpadd
+            self._tgas = _ANALYZER_GAS
+            self._tprod = _ANALYZER_PRODUCT
+        everyone = np.ones(self.n, dtype=bool)
+        if t >= self._tgas:
+            noise = self._measnoise.gaussian(np.concatenate([XNS[22:36], XNSADD[:24]]), everyone)
+            xmeas[:, 22:36] = self._xdel[:, 22:36] + noise[:, :14]
+            self._xdel[:, 22:36] = xcmp[:, :14]
+            xmeasadd[:, 8:] = self._xdeladd + noise[:, 14:]
+            self._xdeladd[:] = xcmpadd
+            self._tgas += _ANALYZER_GAS
+        if t >= self._tprod:
+            noise = self._measnoise.gaussian(XNS[36:], everyone)
+            xmeas[:, 36:] = self._xdel[:, 36:] + noise
+            self._xdel[:, 36:] = xcmp[:, 14:]
+            self._tprod += _ANALYZER_PRODUCT
+
+        xmeasdist = np.empty((self.n, N_XMEAS_DIST))
+        xmeasdist[:, 0:3] = proc["xst_a_c"][:, :3] * 100
+        xmeasdist[:, 3] = proc["tst0"]
+        xmeasdist[:, 4] = proc["tst3"]
+        xmeasdist[:, 5] = proc["tcwr"]
+        xmeasdist[:, 6] = proc["tcws"]
+        xmeasdist[:, 7] = proc["r1f"]
+        xmeasdist[:, 8] = proc["r2f"]
+        xmeasdist[:, 9:13] = proc["wlk"][:, 8:12]
+        xmeasdist[:, 13] = proc["tst2"]
+        xmeasdist[:, 14] = proc["tst1"]
+        xmeasdist[:, 15:19] = proc["vrng"][:, [2, 0, 1, 3]] * _f32(.454)
+        xmeasdist[:, 19:21] = proc["vrng"][:, [9, 10]] * gpm
+        return xmeas.copy(), xmeasadd.copy(), xmeasdist
+
+    def step(self, dt):
+        """Integrates all plants over one time step with the classical Runge-Kutta method
+
+        The manipulated variables and disturbance activations are held constant over the step. Plants that are shut
+        down keep their state.
+
+        Parameters
+        ----------
+        dt : float
+            Step size in hours
+        """
+        t, x = self.time, self.x
+        self._update_valves(t)
+        k1 = self.derivatives(t, x, self._proc)
+        k2 = self.derivatives(t + dt / 2, x + dt / 2 * k1)
+        k3 = self.derivatives(t + dt / 2, x + dt / 2 * k2)
+        k4 = self.derivatives(t + dt, x + dt * k3)
+        self.x = x + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        self.time = t + dt
+        self._proc = None
@@ -0,0 +1,20 @@
+import asyncio
+
+from pytep.async_siminterface import AsyncSimInterface
+
+
+def test_concurrent_plants():
+    plants = [AsyncSimInterface.setup(backend="numpy") for _ in range(2)]
+
+    async def run():
+        await plants[1].set_idv(1, 1.0)
+        await asyncio.gather(*[plant.simulate(0.2) for plant in plants])
+        await asyncio.gather(*[plant.simulate(0.1) for plant in plants])
+
+    asyncio.run(run())
+    assert plants[0] is not plants[1]
+    for plant in plants:
+        assert plant.process_data.shape == (7, 42)
+        assert plant.current_sim_time() == 0.3
+    assert plants[0].get_idv(1) == 0
+    assert plants[1].get_idv(1) == 1
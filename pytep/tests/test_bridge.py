@@ -41,3 +41,28 @@ def test_setpoint_change():
     assert setpoints[-1, 0] == 24
 
 
+def test_block_mirror_matches_simulink():
+    b = bridge
+    b.reset_simulink_blocks()
+    b.apply_changes({
+        "ProductionSP": {"after": 24, "duration": 5, "start_time": 5},
+        "ReactorPressSP": {"after": 2750, "start_time": 1},
+        "idv": {1: (1.0, 2.0)},
+    })
+    assert b.get_production_sp() == tuple(b._eng.get_sp_generic("ProductionSP", nargout=4))
+    assert b.get_reactor_press_sp() == tuple(b._eng.get_sp_generic("ReactorPressSP", nargout=4))
+    values_before, values_after, step_times = b._eng.get_idv_input_block_params(nargout=3)
+    assert np.array_equal(b.get_idv_input_block_params()[1], np.asarray(values_after))
+    assert np.array_equal(b.get_idv_input_block_params()[2], np.asarray(step_times))
+    b.reset_simulink_blocks()
+    assert b.get_production_sp() == tuple(b._eng.get_sp_generic("ProductionSP", nargout=4))
+
+
+def test_matrix_shape_and_column_order():
+    b = bridge
+    matrix = np.arange(20 * 41, dtype=float).reshape(20, 41)
+    b.set_workspace_variable('matrix', matrix)
+    assert b._eng.eval("matrix(2, 1)", nargout=1) == matrix[1, 0]
+    var = b.get_workspace_variable('matrix')
+    assert var.shape == (20, 41)
+    assert (var == matrix).all()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from pytep.utils.columnstore import ColumnStore, MemmapColumnStore
+
+
+def test_append_across_chunks():
+    store = ColumnStore(["a", "b"], initial_capacity=4)
+    rows = np.arange(40.).reshape(20, 2)
+    for k in range(0, 20, 3):
+        store.append(rows[k:k + 3])
+    assert len(store) == 20
+    assert np.array_equal(store.to_array(), rows)
+    assert np.array_equal(store.last(), rows[-1])
+    assert store.last_value("b") == 39.
+    assert list(store.tail(2).index) == [18, 19]
+
+
+def test_frame_is_cached_until_append():
+    store = ColumnStore(["cost"])
+    store.append(1.)
+    frame = store.frame()
+    assert store.frame() is frame
+    store.append([[2.], [3.]])
+    assert store.frame() is not frame
+    assert list(store["cost"]) == [1., 2., 3.]
+
+
+def test_memmap_store_grows_and_is_shared(tmp_path):
+    store = MemmapColumnStore(["a", "b"], tmp_path / "table.dat", chunk_rows=4)
+    rows = np.arange(40.).reshape(20, 2)
+    for k in range(0, 20, 3):
+        store.append(rows[k:k + 3])
+    assert len(store) == 20
+    assert np.array_equal(store.to_array(), rows)
+    assert np.shares_memory(store.frame().values, store._data)
+    assert list(store.tail(2).index) == [18, 19]
+
+    reader = MemmapColumnStore.open(tmp_path / "table.dat")
+    assert np.array_equal(reader.to_array(), rows)
+    store.append([[-1., -2.]])
+    reader.refresh()
+    assert reader.last_value("b") == -2.
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+
+from pytep.datasets import fault_campaign, generate_dataset, load_run, main
+
+
+def test_campaign_runs():
+    runs = fault_campaign(idvs=[1, 2], magnitudes=[0.5, 1.], onsets=[1.], seeds=[1, 2])
+    assert len(runs) == 2 * (1 + 2 * 2)
+    assert len({run["run_id"] for run in runs}) == len(runs)
+
+
+def test_generate_and_resume(tmp_path):
+    runs = fault_campaign(idvs=[1], onsets=[0.1], seeds=[1, 2], duration=0.3)
+    messages = []
+    manifest = generate_dataset(tmp_path, runs, workers=2, backend="numpy", report=messages.append)
+    assert all(entry["status"] == "done" for entry in manifest["runs"].values())
+    assert len(messages) == 1 + len(runs)
+
+    archive = load_run(tmp_path, "idv01_mag1_onset0.1_seed1")
+    idv = archive.frame("idv_data")
+    assert archive.n_rows == 7
+    assert idv["IDV1"].values[0] == 0 and idv["IDV1"].values[-1] == 1
+    assert archive.metadata["seed"] == 1.
+    normal = load_run(tmp_path, "normal_seed2").frame("process_data")
+    assert not np.array_equal(normal.values, load_run(tmp_path, "normal_seed1").frame("process_data").values)
+
+    # an interrupted campaign only simulates the missing runs
+    manifest["runs"]["normal_seed2"]["status"] = "pending"
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    messages = []
+    generate_dataset(tmp_path, runs, workers=1, backend="numpy", report=messages.append)
+    assert messages[0] == "3 of 4 runs already done, simulating 1 runs"
+    assert "normal_seed2" in messages[1]
+
+
+def test_cli(tmp_path):
+    args = [str(tmp_path), "--idv", "3", "--seeds", "1", "--duration", "0.1", "--workers", "1", "--backend", "numpy"]
+    assert main(args) == 0
+    assert sorted(p.name for p in (tmp_path / "runs").iterdir()) == ["idv03_mag1_onset1_seed1", "normal_seed1"]
@@ -0,0 +1,30 @@
+import os
+
+import numpy as np
+
+from pytep.enginepool import EnginePool, run_scenario
+
+
+def _die_once(bridge, scenario):
+    # simulates an engine crash on the first attempt of a job
+    if not os.path.exists(scenario["marker"]):
+        open(scenario["marker"], "w").close()
+        os._exit(1)
+    return run_scenario(bridge, scenario)
+
+
+def test_map_returns_results_in_order():
+    scenarios = [{"duration": 0.1, "setpoints": {"ReactorPressSP": {"after": press}}} for press in [2800, 2750, 2700]]
+    with EnginePool(workers=2, backend="numpy") as pool:
+        results = pool.map(scenarios)
+    assert [r["setpoints"][-1, 4] for r in results] == [2800, 2750, 2700]
+    assert results[0]["simout"].shape == (3, 41)
+    assert isinstance(results[0]["tout"], np.ndarray)
+
+
+def test_dead_worker_is_replaced(tmp_path):
+    scenario = {"duration": 0.1, "marker": str(tmp_path / "marker")}
+    with EnginePool(workers=1, backend="numpy") as pool:
+        results = pool.map([scenario], func=_die_once)
+        assert pool.replaced_workers == 1
+    assert results[0]["tout"].shape == (3, 1)
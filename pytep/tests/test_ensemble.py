@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import pytep.ensemble as ensemble
+from pytep.numpy_bridge import NumpyBridge
+
+
+def test_result_shapes_and_labels():
+    ens = ensemble.Ensemble(3, seeds=[1000., 1001., 1002.])
+    ens.simulate(0.2)
+    assert ens.time.shape == (5,)
+    assert ens.process_data.shape == (3, 5, 41)
+    assert ens.manipulated_variables.shape == (3, 5, 12)
+    assert ens.setpoint_data.shape == (3, 5, 12)
+    assert ens.idv_data.shape == (3, 5, 28)
+    assert ens.operating_cost.shape == (3, 5)
+    assert len(ens.process_data_labels) == 41
+    assert len(ens.xmv_labels) == 12
+
+
+def test_members_follow_own_schedules():
+    ens = ensemble.Ensemble(3)
+    ens.set_idv(1, 1.0, start_time=0.1, members=[1])
+    ens.set_setpoint('ReactorPressSP', after=[2800., 2750., 2700.], start_time=0.1)
+    ens.simulate(0.2)
+    idv1 = ens.idv_data[:, -1, 0]
+    pressure_sp = ens.setpoint_data[:, -1, 4]
+    assert list(idv1) == [0., 1., 0.]
+    assert list(pressure_sp) == [2800., 2750., 2700.]
+    assert (ens.idv_data[:, :2, 0] == 0).all()
+
+
+def test_matches_single_plant_bridge():
+    seeds = np.array([1000., 1234.])
+    ens = ensemble.Ensemble(2, seeds=seeds)
+    ens.simulate(0.2)
+    bridge = NumpyBridge()
+    bridge.set_workspace_variable('seed', 1234.)
+    bridge.set_simpause_time(0.2)
+    bridge.run_until_paused()
+    # batched reductions may round differently than single plant ones
+    assert np.allclose(ens.process_data[1], bridge.get_workspace_variable('simout'), rtol=1e-9)
+    assert np.allclose(ens.manipulated_variables[1], bridge.get_workspace_variable('xmv'), rtol=1e-9)
+
+
+def test_compiled_loop_matches_numpy():
+    pytest.importorskip("numba")
+    results = []
+    for compiled in [False, True]:
+        ens = ensemble.Ensemble(3, seeds=[1000., 1001., 1002.], compiled=compiled)
+        ens.set_idv(8, 1.0, start_time=0.1, members=[1])
+        ens.set_setpoint('ReactorPressSP', after=2750., duration=0.2, start_time=0.1, members=[2])
+        ens.run_until(0.12)
+        ens.run_until(0.3)
+        results.append(ens)
+    numpy_ens, compiled_ens = results
+    assert compiled_ens.ticks == numpy_ens.ticks
+    assert np.array_equal(compiled_ens.time, numpy_ens.time)
+    assert np.array_equal(compiled_ens.setpoint_data, numpy_ens.setpoint_data)
+    assert np.array_equal(compiled_ens.idv_data, numpy_ens.idv_data)
+    assert np.allclose(compiled_ens.process_data, numpy_ens.process_data, rtol=1e-9)
+    assert np.allclose(compiled_ens.manipulated_variables, numpy_ens.manipulated_variables, rtol=1e-9)
@@ -0,0 +1,205 @@
+import time
+
+import numpy as np
+import pytest
+
+from pytep.fakeengine import EngineError, FakeEngine, MatlabExecutionError, double
+from pytep.matlab_bridge import MatlabBridge
+from pytep.siminterface import BaseSimInterface, make_bridge
+
+si = BaseSimInterface()
+si._attach_bridge(make_bridge("fake"))
+
+
+def test_fake_double_conversion():
+    value = double([[1., 2., 3.], [4., 5., 6.]])
+    assert value.size == (2, 3)
+    assert list(value._data) == [1., 4., 2., 5., 3., 6.]
+    assert value[1] == [4., 5., 6.]
+    assert np.array_equal(np.asarray(value), [[1., 2., 3.], [4., 5., 6.]])
+
+
+def test_simulate_and_update():
+    si.reset()
+    si.simulate(1)
+    assert list(si.process_data["time"].values) == [round(0.05 * k, 10) for k in range(21)]
+    assert si.process_data.shape == (21, 42)
+    assert si.manipulated_variables.shape == (21, 12)
+    assert si.operating_cost().shape == (21, 1)
+    assert np.all(si.process_data["Reactor Pressure"].values > 2700)
+    si.simulate(0.5)
+    assert si.current_sim_time() == 1.5
+    assert len(si.process_data) == 31
+
+
+def test_commands_appear_in_logged_data():
+    si.reset()
+    si.simulate(1)
+    si.set_idv(3, 1)
+    si.ramp_setpoint("ProductionSP", target_val=24, duration=1)
+    si.simulate(2)
+    sim_time = si.process_data["time"].values
+    idv3 = si._idv_data.frame()["IDV3"].values
+    assert np.all(idv3[sim_time <= 1] == 0)
+    assert np.all(idv3[sim_time > 1.01] == 1)
+    assert si.get_idv(3) == 1
+    assert si.current_setpoint_value("ProductionSP") == 24
+    ramp = si._setpoint_data.frame()["ProductionSP"].values
+    assert ramp[sim_time == 1.5] == (22.89 + 24) / 2
+
+
+def test_snapshot_restore():
+    si.reset()
+    si.simulate(2)
+    snapshot = si.snapshot()
+    si.simulate(1)
+    expected = si.process_data.copy()
+    si.restore(snapshot)
+    si.simulate(1)
+    assert len(si.process_data) == len(expected)
+    assert np.allclose(si.process_data.values, expected.values)
+
+
+def test_commands_after_restore():
+    si.reset()
+    si.simulate(1)
+    snapshot = si.snapshot()
+    si.simulate(1)
+    si.restore(snapshot)
+    si.set_idv(4, 1)
+    si.ramp_setpoint("ReactorPressSP", target_val=2750, duration=0.5)
+    si.simulate(1)
+    engine = si._matlab_bridge._eng
+    assert engine._idv_block["After"][3] == 1
+    assert si._matlab_bridge._sp_mirror["ReactorPressSP"] == engine._sp_blocks["ReactorPressSP"]
+    assert si._idv_data.frame()["IDV4"].values[-1] == 1
+    assert si._setpoint_data.frame()["ReactorPressSP"].values[-1] == 2750
+
+
+def test_default_start_time_after_restore():
+    bridge = MatlabBridge(engine=FakeEngine())
+    bridge.set_simpause_time(1)
+    bridge.run_until_paused()
+    operating_point = bridge.save_operating_point()
+    bridge.set_simpause_time(2)
+    bridge.run_until_paused()
+    bridge.restore_operating_point(operating_point)
+    bridge.set_reactor_press_sp(after=2750)
+    bridge.apply_changes({"ProductionSP": {"after": 24.}})
+    assert bridge.get_sp_block_params("ReactorPressSP")[3] == 1
+    assert bridge.get_sp_block_params("ProductionSP")[3] == 1
+    bridge.set_simpause_time(1.5)
+    bridge.run_until_paused()
+    assert bridge.current_time() == 1.5
+
+
+def test_failed_apply_changes_keeps_mirror(monkeypatch):
+    bridge = MatlabBridge(engine=FakeEngine())
+
+    def fail(*args, **kwargs):
+        raise MatlabExecutionError("apply_block_changes failed")
+
+    monkeypatch.setattr(bridge._eng, "apply_block_changes", fail)
+    with pytest.raises(MatlabExecutionError):
+        bridge.apply_changes({"ReactorPressSP": {"after": 2750.}, "idv": {1: (1., 0.5)}})
+    _, values_after, step_times = bridge.get_idv_input_block_params()
+    assert values_after[0, 0] == 0 and step_times[0, 0] == 0
+    assert bridge.get_reactor_press_sp()[1] == 2800
+
+
+def test_seed_changes_data():
+    si.reset(seed=1)
+    si.simulate(0.5)
+    first = si.process_data.values.copy()
+    si.reset(seed=2)
+    si.simulate(0.5)
+    assert not np.allclose(si.process_data.values, first)
+
+
+def test_fetch_since_columns():
+    bridge = MatlabBridge(engine=FakeEngine())
+    bridge.set_simpause_time(1)
+    bridge.run_until_paused()
+    data, cursor = bridge.fetch_since(0)
+    assert data.shape == (21, 95)
+    assert cursor == 21
+    bridge.set_logged_columns([0, 5])
+    bridge.set_simpause_time(2)
+    bridge.run_until_paused()
+    data, cursor = bridge.fetch_since(cursor)
+    assert data.shape == (20, 2)
+    assert np.allclose(data[:, 0], np.arange(21, 41) * 0.05)
+    assert cursor == 41
+
+
+def test_single_engine_call_per_fetch():
+    engine = FakeEngine()
+    bridge = MatlabBridge(engine=engine)
+    bridge.set_simpause_time(1)
+    bridge.run_until_paused()
+    engine.calls.clear()
+    bridge.fetch_since(0)
+    bridge.get_production_sp()
+    bridge.get_idv_input_block_params()
+    assert dict(engine.calls) == {"fetch_since": 1}
+
+
+def test_sim_speed():
+    bridge = MatlabBridge(engine=FakeEngine(sim_speed=20))
+    bridge.set_simpause_time(2)
+    start = time.perf_counter()
+    future = bridge.run_until_paused(background=True)
+    assert bridge.get_sim_status() == "running"
+    assert future.result() == "paused"
+    assert time.perf_counter() - start >= 0.09
+
+
+@pytest.mark.parametrize("error", [MatlabExecutionError, EngineError])
+def test_wait_falls_back_to_polling(monkeypatch, error):
+    engine = FakeEngine(sim_speed=20)
+    bridge = MatlabBridge(engine=engine)
+
+    def fail(*args, **kwargs):
+        raise error("wait_for_simulation failed")
+
+    monkeypatch.setattr(engine, "wait_for_simulation", fail)
+    bridge.set_simpause_time(1)
+    bridge.run_until_paused()
+    assert bridge.get_sim_status() == "paused"
+    assert engine.calls["get_simulation_status"] > 2
+
+
+def test_reset_restores_initial_workspace():
+    si.reset(reload=True)
+    si.simulate(1)
+    expected = si.process_data.copy()
+    si.set_idv(2, 1)
+    si.ramp_setpoint("ProductionSP", target_val=24, duration=1)
+    si._matlab_bridge.set_workspace_variable("Ts_base", 1e-3)
+    si.simulate(1)
+    engine = si._matlab_bridge._eng
+    engine.calls.clear()
+    si.reset()
+    assert engine.calls["eval"] == 0
+    assert engine.calls["restore_initial_workspace"] == 1
+    assert engine.calls["apply_block_changes"] == 1
+    assert si.get_idv(2) == 0
+    assert si.current_setpoint_value("ProductionSP") == 22.89
+    assert si._matlab_bridge.get_workspace_variable("Ts_base") == 5e-4
+    si.simulate(1)
+    assert np.allclose(si.process_data.values, expected.values)
+
+
+def test_reset_skips_unchanged_blocks():
+    si.reset()
+    si.simulate(0.5)
+    engine = si._matlab_bridge._eng
+    engine.calls.clear()
+    si.reset()
+    assert engine.calls["apply_block_changes"] == 0
+    si.ramp_setpoint("ReactorPressSP", target_val=2750, duration=1)
+    sp_blocks = dict(engine._sp_blocks)
+    si.reset()
+    assert engine.calls["apply_block_changes"] == 1
+    changed = [name for name in sp_blocks if engine._sp_blocks[name] != sp_blocks[name]]
+    assert changed == ["ReactorPressSP"]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from pytep.siminterface import SimInterface
+from pytep.utils.plant_metadata import plant_metadata
+
+reference = SimInterface.setup(backend="fake", singleton=False)
+faulted = SimInterface.setup(backend="fake", singleton=False)
+
+
+def test_instances_are_independent():
+    assert reference is not faulted
+    assert reference._matlab_bridge is not faulted._matlab_bridge
+    reference.reset()
+    faulted.reset()
+    reference.simulate(1)
+    faulted.set_idv(3, 1)
+    faulted.ramp_setpoint("ProductionSP", target_val=24, duration=1)
+    faulted.simulate(2)
+    assert reference.current_sim_time() == 1
+    assert faulted.current_sim_time() == 2
+    assert reference.get_idv(3) == 0
+    assert faulted.get_idv(3) == 1
+    assert reference.current_setpoint_value("ProductionSP") == 22.89
+    reference.simulate(1)
+    assert not np.allclose(reference.process_data.values, faulted.process_data.values)
+
+
+def test_setup_keeps_singleton_by_default():
+    shared = SimInterface()
+    # the shared instance may be set up by other test modules, its state is restored afterwards
+    state = dict(shared.__dict__)
+    try:
+        assert SimInterface.setup(backend="fake") is shared
+        assert SimInterface() is shared
+        assert shared is not reference and shared is not faulted
+    finally:
+        shared.__dict__.clear()
+        shared.__dict__.update(state)
+
+
+def test_metadata_is_shared():
+    metadata = plant_metadata()
+    assert plant_metadata() is metadata
+    assert reference._process_units is faulted._process_units is metadata["process_var_units"]
+    assert reference.process_data_labels() == list(metadata["process_var_labels"])
+    assert reference.get_var_unit("Reactor Pressure") == faulted.get_var_unit("Reactor Pressure")
+    assert reference.setpoint_labels == list(metadata["setpoint_labels"])
@@ -0,0 +1,52 @@
+import json
+
+from pytep.siminterface import BaseSimInterface, make_bridge
+from pytep.utils.instrumentation import InstrumentedEngine
+
+si = BaseSimInterface()
+si._attach_bridge(make_bridge("fake"))
+
+
+def test_stats_of_engine_calls_and_phases():
+    si.reset()
+    si.simulate(0.1)
+    si.enable_instrumentation()
+    for _ in range(5):
+        si.simulate(0.1)
+    stats = si.stats()
+    assert stats["fetch_since"]["count"] == 5
+    assert stats["fetch_since"]["category"] == "engine"
+    assert stats["fetch_since"]["bytes"] > 5 * 2 * 95 * 8
+    assert stats["update"]["count"] == 5
+    assert stats["update.fetch"]["count"] == 5
+    assert stats["simulate.run"]["count"] == 5
+    for name in ["update", "fetch_since"]:
+        entry = stats[name]
+        assert 0 < entry["p50"] <= entry["p99"] <= entry["max"] <= entry["total"]
+    assert stats["update"]["total"] >= stats["update.fetch"]["total"]
+    si.disable_instrumentation()
+
+
+def test_chrome_trace(tmp_path):
+    si.reset()
+    instrumentation = si.enable_instrumentation(max_events=5)
+    si.simulate(0.5)
+    trace_path = tmp_path / "trace.json"
+    si.write_trace(trace_path)
+    with open(trace_path) as trace_file:
+        trace = json.load(trace_file)
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert len(events) == 5
+    assert trace["otherData"]["dropped_events"] == instrumentation.dropped_events > 0
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in events)
+    si.disable_instrumentation()
+
+
+def test_disable_unwraps_engine():
+    si.enable_instrumentation()
+    assert isinstance(si._matlab_bridge._eng, InstrumentedEngine)
+    si.disable_instrumentation()
+    assert not isinstance(si._matlab_bridge._eng, InstrumentedEngine)
+    count = si.stats()["update"]["count"] if "update" in si.stats() else 0
+    si.simulate(0.1)
+    assert si.stats().get("update", {"count": 0})["count"] == count
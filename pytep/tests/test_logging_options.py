@@ -0,0 +1,43 @@
+import numpy as np
+
+from pytep.siminterface import BaseSimInterface, make_bridge
+
+signals = ["Reactor Pressure", "Reactor Temperature", "ProductionSP", "cost"]
+si = BaseSimInterface()
+si._attach_bridge(make_bridge("numpy"), save_interval=0.1, signals=signals)
+
+
+def test_selected_signals_only():
+    si.reset()
+    si.simulate(0.5)
+    assert si.process_data_labels() == ["time", "Reactor Pressure", "Reactor Temperature"]
+    assert list(si.manipulated_variables.columns) == []
+    assert np.allclose(si.process_data["time"].values, [0., 0.1, 0.2, 0.3, 0.4, 0.5])
+    recent, _ = si._matlab_bridge.fetch_since(0)
+    assert recent.shape == (6, 5)
+
+
+def test_commands_without_logged_columns():
+    si.reset()
+    si.simulate(0.2)
+    si.set_idv(1, 1)
+    si.ramp_setpoint("ReactorPressSP", target_val=2750, duration=0.2)
+    si.simulate(0.3)
+    assert si.get_idv(1) == 1
+    assert si.get_idv(2) == 0
+    assert si.current_setpoint_value("ReactorPressSP") == 2750
+    assert si.current_setpoint_value("ProductionSP") == si._setpoint_data.last_value("ProductionSP")
+
+
+def test_short_ramp_without_logged_column():
+    si.reset()
+    si.simulate(0.2)
+    si.ramp_setpoint("ReactorPressSP", target_val=2750, duration=0.02, delay=0.05)
+    si.simulate(0.1)
+    # the model ramps over at least 0.1 h, halfway after 0.05 h
+    before, after = si._matlab_bridge.get_sp_block_params("ReactorPressSP")[:2]
+    assert np.isclose(si.current_setpoint_value("ReactorPressSP"), (before + after) / 2)
+    ensemble = si._matlab_bridge._ensemble
+    sp_idx = ensemble.setpoint_labels.index("ReactorPressSP")
+    assert np.isclose(si.current_setpoint_value("ReactorPressSP"),
+                      ensemble.setpoint_outputs(si.current_sim_time())[0, sp_idx])
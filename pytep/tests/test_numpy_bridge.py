@@ -0,0 +1,164 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pytep.numpy_bridge as numpy_bridge
+
+
+bridge = numpy_bridge.NumpyBridge()
+
+
+@pytest.fixture(scope="module")
+def matlab_reference():
+    """Logged process data (t, xmeas) of the Simulink model in mode 1 with the default seed, from 5 h to 15 h"""
+    reference = pd.read_pickle(pathlib.Path(numpy_bridge.__file__).parent / "simout" / "pv_all.pkl").values
+    return reference[reference[:, 0] <= 15. + 1e-9]
+
+
+def test_sim_status_query():
+    bridge.stop_simulation()
+    status_before_start = bridge.get_sim_status()
+    bridge.set_simpause_time(0.1)
+    bridge.start_simulation()
+    status_after_sim = bridge.get_sim_status()
+    bridge.set_simpause_time(0.2)
+    bridge.continue_simulation()
+    status_after_sim2 = bridge.get_sim_status()
+    bridge.stop_simulation()
+    status_after_stop = bridge.get_sim_status()
+
+    assert status_before_start == 'stopped'
+    assert status_after_sim == 'paused'
+    assert status_after_sim2 == 'paused'
+    assert status_after_stop == 'stopped'
+
+
+def test_logged_data():
+    bridge.stop_simulation()
+    bridge.set_simpause_time(0.5)
+    bridge.run_until_paused()
+    tout = bridge.get_workspace_variable('tout')
+    assert tout.shape == (11, 1)
+    assert np.allclose(tout[:, 0], np.arange(11) * 0.05)
+    assert bridge.get_workspace_variable('simout').shape == (11, 41)
+    assert bridge.get_workspace_variable('xmv').shape == (11, 12)
+    assert bridge.get_workspace_variable('setpoints').shape == (11, 12)
+    assert bridge.get_workspace_variable('idv_list').shape == (11, 28)
+    assert bridge.get_workspace_variable('OpCost').shape == (11, 1)
+
+
+def test_steady_state_is_kept():
+    bridge.stop_simulation()
+    bridge.set_simpause_time(0.5)
+    bridge.run_until_paused()
+    simout = bridge.get_workspace_variable('simout')
+    assert abs(simout[-1, 6] - 2800) < 10  # reactor pressure
+    assert abs(simout[-1, 7] - 65) < 2  # reactor level
+    assert abs(simout[-1, 8] - 122.9) < 0.5  # reactor temperature
+
+
+def test_isolate_recent_data():
+    bridge.stop_simulation()
+    bridge.set_simpause_time(0.2)
+    bridge.run_until_paused()
+    bridge.set_simpause_time(0.4)
+    bridge.run_until_paused()
+    bridge.isolate_recent_data_in_workspace(0.2)
+    latest_tout = bridge.get_workspace_variable('latest_tout')
+    assert np.allclose(latest_tout[:, 0], [0.25, 0.3, 0.35, 0.4])
+    assert bridge.get_workspace_variable('latest_simout').shape == (4, 41)
+
+
+def test_setpoint_change():
+    bridge.stop_simulation()
+    bridge.reset_simulink_blocks()
+    bridge.set_reactor_press_sp(after=2750, start_time=0.1)
+    bridge.set_simpause_time(0.2)
+    bridge.run_until_paused()
+    setpoints = bridge.get_workspace_variable('setpoints')
+    assert setpoints[1, 4] == 2800
+    assert setpoints[-1, 4] == 2750
+    bridge.reset_simulink_blocks()
+
+
+def test_reset_workspace():
+    seed_init = bridge.get_workspace_variable('seed')
+    bridge.set_workspace_variable('seed', 15000)
+    seed_15000 = bridge.get_workspace_variable('seed')
+    bridge.reset_workspace()
+    seed_after_reset = bridge.get_workspace_variable('seed')
+    assert seed_15000 == 15000
+    assert seed_init == seed_after_reset
+
+
+def test_fetch_recent_data():
+    bridge.stop_simulation()
+    bridge.set_simpause_time(0.2)
+    bridge.run_until_paused()
+    recent = bridge.fetch_recent_data(0.1)
+    assert recent.shape == (2, 1 + 41 + 12 + 12 + 1 + 28)
+    assert np.allclose(recent[:, 0], [0.15, 0.2])
+    assert np.array_equal(recent[:, 1:42], bridge.get_workspace_variable('simout')[-2:])
+
+
+def test_fetch_since_cursor():
+    bridge.stop_simulation()
+    bridge.set_simpause_time(0.1)
+    bridge.run_until_paused()
+    _, cursor = bridge.fetch_since(0)
+    bridge.set_simpause_time(0.2)
+    bridge.run_until_paused()
+    recent, new_cursor = bridge.fetch_since(cursor)
+    assert cursor == 3 and new_cursor == 5
+    assert np.allclose(recent[:, 0], [0.15, 0.2])
+
+
+def test_fetch_since_matches_workspace():
+    bridge.stop_simulation()
+    chunks = []
+    cursor = 0
+    for pause_time in [0.1, 0.2, 0.35]:
+        bridge.set_simpause_time(pause_time)
+        bridge.run_until_paused()
+        chunk, cursor = bridge.fetch_since(cursor)
+        chunks.append(chunk)
+    fetched = np.vstack(chunks)
+    columns = [bridge.get_workspace_variable(name) for name in ["tout", "simout", "xmv", "setpoints", "OpCost",
+                                                               "idv_list"]]
+    assert cursor == 8
+    assert np.array_equal(fetched, np.hstack(columns))
+
+
+def test_apply_changes():
+    bridge.stop_simulation()
+    bridge.reset_simulink_blocks()
+    bridge.apply_changes({
+        "ReactorPressSP": {"after": 2750, "start_time": 0.1},
+        "ProductionSP": {"after": 24, "duration": 5, "start_time": 0.1},
+        "idv": {1: (1.0, 0.15)},
+    })
+    assert bridge.get_reactor_press_sp() == (2800, 2750, 0, 0.1)
+    assert bridge.get_production_sp()[1:] == (24, 5, 0.1)
+    _, values_after, step_times = bridge.get_idv_input_block_params()
+    assert values_after[0, 0] == 1.0 and step_times[0, 0] == 0.15
+    bridge.set_simpause_time(0.2)
+    bridge.run_until_paused()
+    setpoints = bridge.get_workspace_variable('setpoints')
+    assert setpoints[-1, 4] == 2750
+    bridge.reset_simulink_blocks()
+    assert bridge.get_reactor_press_sp()[1] == 2800
+
+
+def test_matches_matlab_reference(matlab_reference):
+    # ode45 and RK4 do not track each other sample by sample, the statistics of the trajectories are compared
+    reference_bridge = numpy_bridge.NumpyBridge()
+    reference_bridge.set_simpause_time(15.)
+    reference_bridge.run_until_paused()
+    tout = reference_bridge.get_workspace_variable('tout')[:, 0]
+    simout = reference_bridge.get_workspace_variable('simout')[tout >= 5. - 1e-9]
+    reference_std = matlab_reference[:, 1:].std(axis=0)
+    assert np.allclose(tout[tout >= 5. - 1e-9], matlab_reference[:, 0])
+    assert (np.abs(simout.mean(axis=0) - matlab_reference[:, 1:].mean(axis=0)) < 1.5 * reference_std).all()
+    assert (simout.std(axis=0) < 1.5 * reference_std).all()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from pytep.prefixcache import CachedSimInterface
+from pytep.siminterface import BaseSimInterface, SimInterface, make_bridge
+
+si = SimInterface.setup(backend="numpy")
+
+
+def test_shared_prefix_is_simulated_once(tmp_path):
+    cached = CachedSimInterface(si, tmp_path)
+    results = []
+    for idv_idx in [1, 2, 1]:
+        cached.reset()
+        cached.simulate(0.1)
+        cached.set_idv(idv_idx, 1.0)
+        cached.simulate(0.1)
+        results.append(cached.process_data.values.copy())
+    # prefix: 1 miss, 2 hits; faults: idv 1 and 2 miss, repeated idv 1 hits
+    assert cached.hits == 3
+    assert cached.misses == 3
+    assert np.array_equal(results[0], results[2])
+    assert results[2].shape == (5, 42)
+    assert cached.sim.get_idv(1) == 1
+
+
+def test_lru_eviction(tmp_path):
+    cached = CachedSimInterface(si, tmp_path, max_size_bytes=1)
+    cached.simulate(0.1)
+    cached.simulate(0.1)
+    assert cached.stats()["entries"] == 1
+
+
+def test_logging_configuration_is_part_of_the_key(tmp_path):
+    cached = CachedSimInterface(si, tmp_path)
+    cached.simulate(0.2)
+    sparse = BaseSimInterface()
+    sparse._attach_bridge(make_bridge("numpy"), save_interval=0.1, signals=["Reactor Pressure"])
+    sparse_cached = CachedSimInterface(sparse, tmp_path)
+    sparse_cached.simulate(0.2)
+    assert sparse_cached.misses == 1
+    assert list(sparse_cached.process_data.columns) == ["time", "Reactor Pressure"]
+    assert np.allclose(sparse_cached.process_data["time"].values, [0., 0.1, 0.2])
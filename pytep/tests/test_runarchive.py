@@ -0,0 +1,48 @@
+import numpy as np
+
+from pytep.runarchive import RunArchive, RunArchiveWriter
+from pytep.siminterface import SimInterface
+
+si = SimInterface.setup(backend="numpy")
+
+groups = {"process_data": ["time", "a", "b"], "cost_data": ["cost"]}
+
+
+def test_chunks_and_columns(tmp_path):
+    rows = np.arange(40, dtype=float).reshape(10, 4)
+    with RunArchiveWriter(tmp_path, groups, units={"time": "h"}, chunk_rows=4) as writer:
+        writer.append(rows[:3])
+        writer.append(rows[3:])
+        assert writer.n_rows == 10
+    archive = RunArchive(tmp_path)
+    assert archive.n_chunks == 3
+    assert archive.units == {"time": "h"}
+    assert np.array_equal(archive.frame().values, rows)
+    assert list(archive.frame("cost_data").columns) == ["time", "cost"]
+    assert np.array_equal(archive.frame(columns=["b"])["b"].values, rows[:, 2])
+
+
+def test_incomplete_chunks_are_ignored(tmp_path):
+    writer = RunArchiveWriter(tmp_path, groups, chunk_rows=4)
+    writer.append(np.ones((6, 4)))
+    (tmp_path / "chunk-000001.npz.tmp").write_bytes(b"interrupted")
+    archive = RunArchive(tmp_path)
+    assert archive.n_rows == 4
+
+    writer = RunArchiveWriter(tmp_path, groups, chunk_rows=4, mode="a")
+    writer.append(np.zeros((2, 4)))
+    writer.close()
+    assert RunArchive(tmp_path).n_rows == 6
+
+
+def test_siminterface_archive(tmp_path):
+    si.reset()
+    si.start_archive(tmp_path, chunk_rows=8)
+    si.simulate(0.5)
+    si.simulate(0.5)
+    si.stop_archive()
+    archive = RunArchive(tmp_path)
+    assert archive.n_rows == len(si.process_data)
+    assert np.array_equal(archive.frame("process_data").values, si.process_data.values)
+    assert np.array_equal(archive.frame(columns=["cost"])["cost"].values, si.operating_cost().values.ravel())
+    assert archive.units["time"] == "h"
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pytep.scenario import Scenario, SetpointRamp, IdvStep, compile_scenario, run_compiled, run_segmented
+from pytep.siminterface import SimInterface
+
+si = SimInterface.setup(backend="numpy")
+
+initial_setpoints = {"ReactorPressSP": 2800., "ReactorLevelSP": 65.}
+
+
+def test_compile_merges_independent_events():
+    scenario = Scenario(10, [SetpointRamp("ReactorPressSP", 2750., 1., 2.), IdvStep(1, 1., 2.),
+                             SetpointRamp("ReactorLevelSP", 60., 4.)])
+    segments = compile_scenario(scenario, initial_setpoints, np.zeros(28))
+    assert len(segments) == 1
+    assert segments[0].setpoint_blocks["ReactorPressSP"] == (2800., 2750., 2., 1.)
+    assert segments[0].idv_steps[1] == (0., 1., 2.)
+
+
+def test_compile_splits_repeated_block():
+    scenario = Scenario(10, [SetpointRamp("ReactorPressSP", 2750., 1., 2.), SetpointRamp("ReactorPressSP", 2800., 5.)])
+    segments = compile_scenario(scenario, initial_setpoints, np.zeros(28))
+    assert [segment.end_time for segment in segments] == [3., 10.]
+    assert segments[1].setpoint_blocks["ReactorPressSP"] == (2750., 2800., 0., 5.)
+    with pytest.raises(ValueError):
+        overlapping = Scenario(10, [SetpointRamp("ReactorPressSP", 2750., 1., 2.),
+                                    SetpointRamp("ReactorPressSP", 2800., 2.)])
+        compile_scenario(overlapping, initial_setpoints, np.zeros(28))
+
+
+def test_compile_keeps_pending_change_of_earlier_segment():
+    # IDV1 steps at 0.25 in the first segment, which ends at 0.1 with the first ramp of ReactorPressSP
+    scenario = Scenario(0.5, [SetpointRamp("ReactorPressSP", 2790., 0.05, 0.05), IdvStep(1, 1., 0.25),
+                              SetpointRamp("ReactorPressSP", 2780., 0.3), IdvStep(1, 0., 0.4)])
+    segments = compile_scenario(scenario, initial_setpoints, np.zeros(28))
+    assert [segment.end_time for segment in segments] == [0.1, 0.25, 0.5]
+    assert segments[0].idv_steps[1] == (0., 1., 0.25)
+    assert segments[2].idv_steps[1] == (1., 0., 0.4)
+
+    compiled = SimInterface.setup(backend="fake", singleton=False)
+    segmented = SimInterface.setup(backend="fake", singleton=False)
+    run_compiled(compiled, scenario)
+    run_segmented(segmented, scenario)
+    time = compiled.timed_var("time").values[:, 0]
+    assert np.array_equal(time, segmented.timed_var("time").values[:, 0])
+    # the segmented run applies changes one base time step late, so the samples at the event times differ
+    between_events = ~np.isin(np.round(time, 6), [event.start_time for event in scenario.events])
+    for data in ["_setpoint_data", "_idv_data"]:
+        assert np.array_equal(getattr(compiled, data).frame().values[between_events],
+                              getattr(segmented, data).frame().values[between_events])
+
+
+def test_compiled_run_follows_schedule():
+    scenario = Scenario.from_dict({
+        "duration": 0.4,
+        "setpoints": [{"label": "ReactorPressSP", "target": 2790., "start_time": 0.1, "duration": 0.1},
+                      {"label": "ReactorPressSP", "target": 2780., "start_time": 0.25}],
+        "idv": [{"idv_idx": 1, "value": 1., "start_time": 0.15}],
+    })
+    assert run_compiled(si, scenario) == 2
+    assert si.process_data.shape == (9, 42)
+    assert np.allclose(si.timed_var("time").values[:, 0], np.arange(9) * 0.05)
+    assert np.allclose(si._setpoint_data["ReactorPressSP"], [2800, 2800, 2800, 2795, 2790, 2780, 2780, 2780, 2780])
+    assert list(si._idv_data["IDV1"]) == [0, 0, 0, 1, 1, 1, 1, 1, 1]
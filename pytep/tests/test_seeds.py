@@ -0,0 +1,41 @@
+import numpy as np
+
+from pytep.enginepool import EnginePool
+from pytep.siminterface import SimInterface
+from pytep.utils.seeds import derive_seed, derive_seeds
+
+si = SimInterface.setup(backend="numpy")
+
+
+def test_derived_seeds():
+    seeds = derive_seeds(2024, 100)
+    assert seeds[:10] == derive_seeds(2024, 10)
+    assert seeds[42] == derive_seed(2024, 42)
+    assert len(set(seeds)) == 100
+    assert all(seed % 2 == 1 and 0 < seed < 2 ** 31 for seed in seeds)
+    assert derive_seeds(2025, 10) != seeds[:10]
+
+
+def test_reset_with_seed():
+    si.reset(seed=derive_seed(1, 0))
+    si.simulate(0.2)
+    first = si.process_data.values.copy()
+    si.reset(seed=derive_seed(1, 1))
+    si.simulate(0.2)
+    second = si.process_data.values.copy()
+    si.reset(seed=derive_seed(1, 0))
+    si.simulate(0.2)
+    assert np.array_equal(si.process_data.values, first)
+    assert not np.array_equal(second, first)
+    si.reset()
+    assert si._matlab_bridge.get_workspace_variable("seed") == 1000
+
+
+def test_campaign_independent_of_workers():
+    scenarios = [{"duration": 0.1, "idv": {idx: (1., 0.)}} for idx in [1, 2, 3]]
+    with EnginePool(workers=1, backend="numpy") as pool:
+        serial = pool.map(scenarios, master_seed=7)
+    with EnginePool(workers=3, backend="numpy") as pool:
+        parallel = pool.map(scenarios, master_seed=7)
+    for a, b in zip(serial, parallel):
+        assert np.array_equal(a["simout"], b["simout"])
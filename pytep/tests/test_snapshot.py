@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from pytep.prefixcache import CachedSimInterface
+from pytep.siminterface import SimInterface
+
+si = SimInterface.setup(backend="numpy")
+fake_si = SimInterface.setup(backend="fake", singleton=False)
+
+
+def test_restore_reproduces_continuation():
+    si.reset()
+    si.simulate(0.2)
+    snapshot = si.snapshot()
+    si.simulate(0.1)
+    reference = si.process_data.values.copy()
+
+    si.restore(snapshot)
+    assert si.current_sim_time() == snapshot.sim_time
+    si.set_idv(1, 1.0)
+    si.simulate(0.1)
+    assert si.get_idv(1) == 1
+
+    si.restore(snapshot)
+    si.simulate(0.1)
+    assert si.get_idv(1) == 0
+    assert np.array_equal(si.process_data.values, reference)
+
+
+def test_memmap_history(tmp_path):
+    si.reset()
+    si.simulate(0.2)
+    si.use_memmap_history(tmp_path)
+    snapshot = si.snapshot()
+    si.simulate(0.2)
+    reference = si.process_data.values.copy()
+    si.restore(snapshot)
+    si.simulate(0.2)
+    assert np.array_equal(si.process_data.values, reference)
+    assert si.timed_var("Reactor Pressure").shape == (9, 2)
+    si._load_dataframes()
+    si.reset()
+
+
+def test_release_and_reset_free_the_snapshot_store():
+    engine = fake_si._matlab_bridge._eng
+    fake_si.reset()
+    fake_si.simulate(0.2)
+    released = fake_si.snapshot()
+    kept = fake_si.snapshot()
+    fake_si.release(released)
+    fake_si.release(released)
+    assert len(engine._snapshots) == 1
+    with pytest.raises(ValueError):
+        fake_si.restore(released)
+    fake_si.restore(kept)
+    fake_si.reset()
+    assert len(engine._snapshots) == 0
+    with pytest.raises(ValueError):
+        fake_si.restore(kept)
+
+
+def test_prefix_cache_keeps_no_snapshots(tmp_path):
+    engine = fake_si._matlab_bridge._eng
+    cached = CachedSimInterface(fake_si, tmp_path)
+    cached.simulate(0.1)
+    cached.reset()
+    cached.simulate(0.1)
+    cached.set_idv(1, 1.0)
+    cached.simulate(0.1)
+    assert cached.hits == 1
+    assert len(engine._snapshots) == 0
@@ -0,0 +1,31 @@
+import numpy as np
+
+from pytep.siminterface import SimInterface
+
+si = SimInterface.setup(backend="numpy")
+
+
+def test_stream_matches_simulate():
+    si.reset()
+    si.simulate(0.6)
+    reference = np.hstack([si.process_data.values, si.manipulated_variables.values])
+
+    si.reset()
+    chunks = list(si.stream(step=0.2, until=0.6))
+    assert len(chunks) == 3
+    streamed = np.concatenate(chunks, axis=0)
+    assert streamed.shape[1] == len(si.stream_labels()) == 95
+    assert np.array_equal(streamed[:, :54], reference)
+    assert len(si.process_data) == 1
+    assert si.current_sim_time() == 0.6
+
+
+def test_commands_between_chunks():
+    si.reset()
+    idv1 = si.stream_labels().index("IDV1")
+    for chunk in si.stream(step=0.2, until=0.6):
+        if si.current_sim_time() == 0.2:
+            si.set_idv(1, 1)
+    assert chunk[-1, idv1] == 1
+    assert si.get_idv(1) == 1
+    si.reset()
@@ -0,0 +1,243 @@
+import json
+import os
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnStore:
+    """Append-only table of float rows with labelled columns, used for the time series histories of the SimInterface.
+
+    Rows are written into preallocated chunks. A full chunk is kept as it is and a new chunk with twice its capacity
+    is started, so appending never copies the existing history. The DataFrame view of the data is built on request
+    and cached until the next append.
+
+    Parameters
+    ----------
+    columns : list
+        Column labels
+    initial_capacity : int, optional
+        Number of rows of the first chunk, by default 1024
+    """
+
+    def __init__(self, columns, initial_capacity=1024):
+        self.columns = list(columns)
+        self._initial_capacity = initial_capacity
+        self.clear()
+
+    def clear(self):
+        """Removes all rows"""
+        self._chunks = []
+        self._current = np.empty((self._initial_capacity, len(self.columns)))
+        self._fill = 0
+        self._n_rows = 0
+        self._frame = None
+
+    def copy(self):
+        """Independent copy of the table"""
+        other = ColumnStore(self.columns, self._initial_capacity)
+        other.append(self.to_array())
+        return other
+
+    def __len__(self):
+        return self._n_rows
+
+    def append(self, rows):
+        """Appends rows to the table
+
+        Parameters
+        ----------
+        rows : array_like
+            (k, n_columns) array, a single row or a scalar for a single-column table
+        """
+        rows = np.asarray(rows, dtype=float)
+        # 2d input keeps its number of rows, so that tables without columns count their rows as well
+        rows = rows.reshape(rows.shape[0] if rows.ndim == 2 else -1, len(self.columns))
+        start = 0
+        while start < rows.shape[0]:
+            capacity = self._current.shape[0]
+            n_take = min(capacity - self._fill, rows.shape[0] - start)
+            self._current[self._fill:self._fill + n_take] = rows[start:start + n_take]
+            self._fill += n_take
+            start += n_take
+            if self._fill == capacity:
+                self._chunks.append(self._current)
+                self._current = np.empty((2 * capacity, len(self.columns)))
+                self._fill = 0
+        self._n_rows += rows.shape[0]
+        if rows.shape[0] > 0:
+            self._frame = None
+
+    def last(self):
+        """Most recent row (n_columns,). Raises an IndexError if the table is empty."""
+        if self._fill > 0:
+            return self._current[self._fill - 1].copy()
+        if self._chunks:
+            return self._chunks[-1][-1].copy()
+        raise IndexError("ColumnStore is empty.")
+
+    def last_value(self, column):
+        """Most recent value of a column"""
+        return self.last()[self.columns.index(column)]
+
+    def to_array(self):
+        """Copy of all rows as a (n_rows, n_columns) array"""
+        return np.concatenate(self._chunks + [self._current[:self._fill]], axis=0)
+
+    def frame(self):
+        """All rows as a DataFrame. The DataFrame is cached until the next append."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(data=self.to_array(), columns=self.columns)
+        return self._frame
+
+    def tail(self, n=1):
+        """DataFrame of the last n rows, indexed by their row numbers"""
+        n = min(n, self._n_rows)
+        rows = self.to_array()[self._n_rows - n:] if n > self._fill else self._current[self._fill - n:self._fill]
+        return pd.DataFrame(data=rows.copy(), columns=self.columns, index=range(self._n_rows - n, self._n_rows))
+
+    def __getitem__(self, key):
+        return self.frame()[key]
+
+
+class MemmapColumnStore:
+    """Append-only table of float rows in a memory-mapped file, with the interface of :class:`ColumnStore`.
+
+    The rows are stored in the file ``path`` (float64, row-major), which grows by ``chunk_rows`` rows whenever it is
+    full. The number of valid rows and the column labels are kept in ``path.json``, which is updated after the rows
+    are written. Only the pages that are accessed are held in memory, and :func:`frame` returns a DataFrame on top of
+    the mapped data instead of a copy. Another process can follow the table read-only with :func:`open`.
+
+    Parameters
+    ----------
+    columns : list
+        Column labels
+    path : string or pathlib.Path
+        Path of the data file. An existing table at this path is replaced.
+    chunk_rows : int, optional
+        Number of rows the file grows by, by default 8192 (about 400 simulated hours at Ts_save = 0.05 h)
+    """
+
+    def __init__(self, columns, path, chunk_rows=8192):
+        self.columns = list(columns)
+        self.path = pathlib.Path(path)
+        self._chunk_rows = chunk_rows
+        self._read_only = False
+        self.clear()
+
+    @classmethod
+    def open(cls, path):
+        """Opens a table written by another MemmapColumnStore read-only. :func:`refresh` picks up new rows."""
+        store = cls.__new__(cls)
+        store.path = pathlib.Path(path)
+        store._read_only = True
+        with open(store._header_path(), "r") as header_file:
+            header = json.load(header_file)
+        store.columns = header["columns"]
+        store._chunk_rows = header["chunk_rows"]
+        store._data = None
+        store._n_rows = 0
+        store.refresh()
+        return store
+
+    def refresh(self):
+        """Reads the number of rows from the header, for read-only tables that are written by another process"""
+        with open(self._header_path(), "r") as header_file:
+            n_rows = json.load(header_file)["n_rows"]
+        if self._data is None or n_rows > self._data.shape[0]:
+            self._map(self.path.stat().st_size // (8 * len(self.columns)))
+        if n_rows != self._n_rows:
+            self._n_rows = n_rows
+            self._frame = None
+
+    def _header_path(self):
+        return self.path.with_name(self.path.name + ".json")
+
+    def _write_header(self):
+        header = {"columns": self.columns, "n_rows": self._n_rows, "chunk_rows": self._chunk_rows}
+        tmp_path = self.path.with_name(self.path.name + ".json.tmp")
+        tmp_path.write_text(json.dumps(header))
+        os.replace(tmp_path, self._header_path())
+
+    def _map(self, capacity):
+        mode = "r" if self._read_only else "r+"
+        self._data = np.memmap(self.path, dtype=float, mode=mode, shape=(capacity, len(self.columns)))
+        self._frame = None
+
+    def _resize(self, capacity):
+        self._data = None  # release the mapping before the file is resized
+        with open(self.path, "ab") as data_file:
+            data_file.truncate(capacity * len(self.columns) * 8)
+        self._map(capacity)
+
+    def clear(self):
+        """Removes all rows"""
+        if self._read_only:
+            raise PermissionError("MemmapColumnStore is opened read-only.")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._data = None
+        with open(self.path, "wb"):
+            pass
+        self._n_rows = 0
+        self._resize(self._chunk_rows)
+        self._write_header()
+
+    def copy(self):
+        """Independent in-memory copy of the table as a ColumnStore"""
+        other = ColumnStore(self.columns)
+        other.append(self.to_array())
+        return other
+
+    def __len__(self):
+        return self._n_rows
+
+    def append(self, rows):
+        """Appends rows to the table
+
+        Parameters
+        ----------
+        rows : array_like
+            (k, n_columns) array, a single row or a scalar for a single-column table
+        """
+        if self._read_only:
+            raise PermissionError("MemmapColumnStore is opened read-only.")
+        rows = np.asarray(rows, dtype=float).reshape(-1, len(self.columns))
+        if rows.shape[0] == 0:
+            return
+        n_rows = self._n_rows + rows.shape[0]
+        if n_rows > self._data.shape[0]:
+            self._resize(-(-n_rows // self._chunk_rows) * self._chunk_rows)
+        self._data[self._n_rows:n_rows] = rows
+        self._n_rows = n_rows
+        self._frame = None
+        self._write_header()
+
+    def last(self):
+        """Most recent row (n_columns,). Raises an IndexError if the table is empty."""
+        if self._n_rows == 0:
+            raise IndexError("MemmapColumnStore is empty.")
+        return np.array(self._data[self._n_rows - 1])
+
+    def last_value(self, column):
+        """Most recent value of a column"""
+        return self.last()[self.columns.index(column)]
+
+    def to_array(self):
+        """Copy of all rows as a (n_rows, n_columns) array"""
+        return np.array(self._data[:self._n_rows])
+
+    def frame(self):
+        """All rows as a DataFrame on top of the mapped data. The DataFrame is cached until the next append."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(data=self._data[:self._n_rows], columns=self.columns, copy=False)
+        return self._frame
+
+    def tail(self, n=1):
+        """DataFrame of the last n rows, indexed by their row numbers"""
+        n = min(n, self._n_rows)
+        rows = np.array(self._data[self._n_rows - n:self._n_rows])
+        return pd.DataFrame(data=rows, columns=self.columns, index=range(self._n_rows - n, self._n_rows))
+
+    def __getitem__(self, key):
+        return self.frame()[key]
@@ -0,0 +1,290 @@
+"""Opt-in recording of call counts, latencies and transferred bytes, with an export to the Chrome trace format (also
+read by Perfetto)."""
+import array
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class _NullSpan:
+    """Span that records nothing, used while the instrumentation is disabled"""
+
+    nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, instrumentation, name, category):
+        self._instrumentation = instrumentation
+        self._name = name
+        self._category = category
+        self.nbytes = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._instrumentation.record(self._name, self._start, time.perf_counter() - self._start, self.nbytes,
+                                     self._category)
+        return False
+
+
+def payload_bytes(value):
+    """Estimated number of bytes of a value that is passed to or returned by the engine"""
+    if value is None:
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    size = getattr(value, "size", None)
+    if isinstance(size, tuple):  # matlab.double
+        return 8 * int(np.prod(size))
+    if isinstance(value, (bool, int, float, np.number)):
+        return 8
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(payload_bytes(item) for item in value)
+    return 0
+
+
+class Instrumentation:
+    """Records the duration and the transferred bytes of named calls.
+
+    Statistics are kept for all calls. The events of the timeline are kept up to max_events, later events are only
+    counted in dropped_events.
+
+    Parameters
+    ----------
+    max_events : int, optional
+        Maximum number of events kept for :func:`write_chrome_trace`, by default 100000
+
+    Examples
+    --------
+    >>> instrumentation = si.enable_instrumentation()
+    >>> si.simulate(10)
+    >>> si.stats()["fetch_since"]["p90"]
+    >>> instrumentation.write_chrome_trace("pytep_trace.json")  # open in chrome://tracing or ui.perfetto.dev
+    """
+
+    def __init__(self, max_events=100000):
+        self.max_events = max_events
+        self.enabled = True
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Removes all recorded calls"""
+        self._durations = dict()
+        self._bytes = dict()
+        self._categories = dict()
+        self._events = []
+        self.dropped_events = 0
+
+    def record(self, name, start, duration, nbytes=0, category="pytep"):
+        """Records a call
+
+        Parameters
+        ----------
+        name : string
+            Name of the call, e.g. the engine function
+        start : float
+            time.perf_counter() at the start of the call
+        duration : float
+            Duration in seconds
+        nbytes : int, optional
+            Number of bytes transferred, by default 0
+        category : string, optional
+            Category of the call in the timeline, by default 'pytep'
+        """
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = array.array("d")
+                self._bytes[name] = 0
+                self._categories[name] = category
+            durations.append(duration)
+            self._bytes[name] += nbytes
+            if len(self._events) < self.max_events:
+                self._events.append((name, category, start, duration, threading.get_ident(), nbytes))
+            else:
+                self.dropped_events += 1
+
+    def span(self, name, category="pytep"):
+        """Context manager that records the duration of its block. The attribute nbytes can be set inside the block.
+
+        Returns a span that records nothing while the instrumentation is disabled.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, category)
+
+    def stats(self):
+        """Statistics of the recorded calls by name
+
+        Returns
+        -------
+        dict
+            Names mapped to dicts with 'category', 'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max' (seconds) and
+            'bytes' (total number of bytes transferred)
+        """
+        with self._lock:
+            recorded = {name: (np.array(durations), self._bytes[name], self._categories[name])
+                        for name, durations in self._durations.items()}
+        stats = dict()
+        for name, (durations, nbytes, category) in recorded.items():
+            p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+            stats[name] = {
+                "category": category,
+                "count": len(durations),
+                "total": float(durations.sum()),
+                "mean": float(durations.mean()),
+                "p50": float(p50),
+                "p90": float(p90),
+                "p99": float(p99),
+                "max": float(durations.max()),
+                "bytes": int(nbytes),
+            }
+        return stats
+
+    def chrome_trace(self):
+        """Timeline of the recorded calls in the Chrome trace event format
+
+        Returns
+        -------
+        dict
+            JSON serializable trace with one complete event ('X') per call
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+        trace_events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "pytep"}}]
+        for name, category, start, duration, tid, nbytes in events:
+            trace_events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": 1e6 * (start - self._origin),
+                "dur": 1e6 * duration,
+                "pid": pid,
+                "tid": tid,
+                "args": {"bytes": nbytes},
+            })
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped_events}}
+
+    def write_chrome_trace(self, path):
+        """Writes the timeline to a JSON file for chrome://tracing or https://ui.perfetto.dev
+
+        Parameters
+        ----------
+        path : string or pathlib.Path
+        """
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+class InstrumentedEngine:
+    """Proxy of a MATLAB engine that records every function call and workspace access of the engine in an
+    :class:`Instrumentation`. Background calls are recorded from the call until their result is available.
+
+    Parameters
+    ----------
+    engine : matlab.engine.MatlabEngine
+    instrumentation : Instrumentation
+    """
+
+    def __init__(self, engine, instrumentation):
+        self.engine = engine
+        self.workspace = _InstrumentedWorkspace(engine.workspace, instrumentation)
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        function = getattr(self.engine, name)
+        if not callable(function):
+            return function
+        instrumentation = self._instrumentation
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            if kwargs.get("background"):
+                return _record_when_done(result, instrumentation, name, start, payload_bytes(args))
+            instrumentation.record(name, start, time.perf_counter() - start,
+                                   payload_bytes(args) + payload_bytes(result), "engine")
+            return result
+
+        return call
+
+
+class _InstrumentedWorkspace:
+    def __init__(self, workspace, instrumentation):
+        self._workspace = workspace
+        self._instrumentation = instrumentation
+
+    def __getitem__(self, name):
+        start = time.perf_counter()
+        value = self._workspace[name]
+        self._instrumentation.record("workspace.get", start, time.perf_counter() - start, payload_bytes(value),
+                                     "engine")
+        return value
+
+    def __setitem__(self, name, value):
+        start = time.perf_counter()
+        self._workspace[name] = value
+        self._instrumentation.record("workspace.set", start, time.perf_counter() - start, payload_bytes(value),
+                                     "engine")
+
+    def __contains__(self, name):
+        return name in self._workspace
+
+
+def _record_when_done(future, instrumentation, name, start, nbytes):
+    name = name + " (background)"
+    if hasattr(future, "add_done_callback"):
+        # concurrent.futures.Future, recorded by a callback so that the type of the future is kept
+        def done(finished):
+            result = None if finished.cancelled() or finished.exception() else finished.result()
+            instrumentation.record(name, start, time.perf_counter() - start, nbytes + payload_bytes(result), "engine")
+
+        future.add_done_callback(done)
+        return future
+    return _InstrumentedFuture(future, instrumentation, name, start, nbytes)
+
+
+class _InstrumentedFuture:
+    """Future of a background engine call, recorded when its result is fetched"""
+
+    def __init__(self, future, instrumentation, name, start, nbytes):
+        self._future = future
+        self._instrumentation = instrumentation
+        self._name = name
+        self._start = start
+        self._nbytes = nbytes
+        self._recorded = False
+
+    def done(self):
+        return self._future.done()
+
+    def cancel(self):
+        return self._future.cancel()
+
+    def result(self, timeout=None):
+        result = self._future.result(timeout)
+        if not self._recorded:
+            self._recorded = True
+            self._instrumentation.record(self._name, self._start, time.perf_counter() - self._start,
+                                         self._nbytes + payload_bytes(result), "engine")
+        return result
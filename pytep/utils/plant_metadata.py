@@ -0,0 +1,50 @@
+"""Labels and units of the plant signals, shared by the simulation interfaces and the NumPy backend."""
+import pathlib
+import pickle
+import threading
+
+import pandas as pd
+
+# labels and units of the plant by setupinfo directory, loaded once per process and shared by all interfaces
+_metadata_registry = dict()
+_metadata_lock = threading.Lock()
+
+
+def plant_metadata(setupinfo_path=None):
+    """Labels and units of the plant signals. They are unpickled once per process and the same objects are shared by all
+    simulation interfaces, so they must not be modified.
+
+    Parameters
+    ----------
+    setupinfo_path : string or pathlib.Path, optional
+        Directory of the pickled labels and units, by default the setupinfo directory of pytep
+
+    Returns
+    -------
+    dict
+        'process_var_labels', 'xmv_labels', 'setpoint_labels' and 'idv_labels' (tuples) and 'process_var_units' and
+        'xmv_units' (DataFrames with one row of units, columns labelled like the variables)
+    """
+    setupinfo_path = pathlib.Path(__file__).parent.parent / "setupinfo" if setupinfo_path is None else setupinfo_path
+    key = str(pathlib.Path(setupinfo_path).resolve())
+    with _metadata_lock:
+        if key not in _metadata_registry:
+            _metadata_registry[key] = _load_metadata(pathlib.Path(setupinfo_path))
+        return _metadata_registry[key]
+
+
+def _load_metadata(setupinfo_path):
+    def load(name):
+        with open(setupinfo_path / name, "rb") as pickle_file:
+            return pickle.load(pickle_file)
+
+    pv_labels = tuple(load("process_var_labels.pkl"))
+    xmv_labels = tuple(load("xmv_labels.pkl"))
+    return {
+        "process_var_labels": pv_labels,
+        "xmv_labels": xmv_labels,
+        "setpoint_labels": tuple(load("setpoint_labels.pkl")),
+        "idv_labels": tuple(load("idv_labels.pkl")),
+        "process_var_units": pd.DataFrame(data=[load("process_var_units.pkl")], columns=list(pv_labels)),
+        "xmv_units": pd.DataFrame(data=[load("xmv_units.pkl")], columns=list(xmv_labels)),
+    }
@@ -0,0 +1,38 @@
+import numpy as np
+
+# The random number generator of the TE model is a multiplicative congruential generator modulo 2**32 on doubles.
+# Derived seeds are odd (full period) and below 2**31.
+_SEED_BITS = 31
+
+
+def derive_seed(master_seed, index):
+    """Derives the seed of run number index from a master seed.
+
+    The seed only depends on master_seed and index, so a campaign reproduces the same seeds regardless of the number
+    of runs, workers or the order in which the runs are scheduled. Seeds of different indices are statistically
+    independent (numpy.random.SeedSequence).
+
+    Parameters
+    ----------
+    master_seed : int
+        Seed of the whole campaign
+    index : int
+        Number of the run
+
+    Returns
+    -------
+    int
+        Seed for the 'seed' workspace variable of the model
+    """
+    state = np.random.SeedSequence(master_seed, spawn_key=(index,)).generate_state(1, dtype=np.uint32)[0]
+    return int(state >> (32 - _SEED_BITS)) | 1
+
+
+def derive_seeds(master_seed, n):
+    """Seeds of the runs 0 to n - 1, see :func:`derive_seed`
+
+    Returns
+    -------
+    list
+    """
+    return [derive_seed(master_seed, index) for index in range(n)]
@@ -5,3 +5,7 @@ class Singleton(type):
         if cls not in cls._instances:
             cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
+
+    def new_instance(cls, *args, **kwargs):
+        """Creates an instance that is independent of the shared instance returned by the constructor"""
+        return super(Singleton, cls).__call__(*args, **kwargs)
@@ -0,0 +1,55 @@
+"""Measures the throughput of the conversion between np.arrays and matlab.double in both directions, for the
+element-wise conversion (tolist / np.asarray) and the buffer based conversion of pytep.engineutils. The arrays have
+the shape of simout (41 columns, 20 samples per simulated hour). A round trip through the MATLAB workspace is
+measured as well, to check that shapes and column order are preserved.
+
+Usage: python bench_matlab_conversion.py
+"""
+import time
+
+import numpy as np
+
+import pytep.engineutils as engineutils
+
+SAMPLES_PER_HOUR = 20  # Ts_save = 0.05 h
+HOURS = [10, 100, 1000]
+REPEATS = 5
+
+
+def throughput(func, n_bytes):
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return n_bytes / np.median(latencies) / 1e6
+
+
+def main():
+    import matlab
+    from pytep.matlab_bridge import MatlabBridge
+    print("conversion path: {}".format(engineutils._detect_conversion_path(matlab.double)))
+    print("{:>6} {:>10} {:>16} {:>16} {:>16} {:>16}".format(
+        "hours", "MB", "to matlab (list)", "to matlab (buf)", "to numpy (list)", "to numpy (buf)"))
+    for hours in HOURS:
+        simout = np.random.default_rng(0).random((hours * SAMPLES_PER_HOUR, 41))
+        n_bytes = simout.nbytes
+        as_matlab = matlab.double(simout.tolist())
+        rates = [
+            throughput(lambda: matlab.double(simout.tolist()), n_bytes),
+            throughput(lambda: engineutils.to_matlab_double(simout, matlab.double), n_bytes),
+            throughput(lambda: np.asarray(as_matlab, dtype=float), n_bytes),
+            throughput(lambda: engineutils.to_numpy(as_matlab), n_bytes),
+        ]
+        print("{:>6} {:>10.2f} ".format(hours, n_bytes / 1e6) + " ".join("{:>11.1f} MB/s".format(r) for r in rates))
+
+    bridge = MatlabBridge()
+    simout = np.random.default_rng(1).random((SAMPLES_PER_HOUR, 41))
+    bridge.set_workspace_variable("simout_roundtrip", simout)
+    assert np.array_equal(bridge.get_workspace_variable("simout_roundtrip"), simout)
+    assert bridge._eng.eval("isequal(size(simout_roundtrip), [20 41])", nargout=1)
+    print("round trip through the workspace: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compares the wall time of a scenario run as compiled block schedules (pytep.scenario.run_compiled) with the same
+scenario run the interactive way, with a pause and a data fetch at every event (run_segmented).
+
+Usage: python bench_scenario.py [numpy|matlab] [duration in hours]
+"""
+import sys
+import time
+
+from pytep.scenario import Scenario, SetpointRamp, IdvStep, run_compiled, run_segmented
+from pytep.siminterface import SimInterface
+
+
+def make_scenario(duration):
+    events = [
+        SetpointRamp("ProductionSP", 23.5, 0.1 * duration, 0.1 * duration),
+        IdvStep(1, 1., 0.2 * duration),
+        SetpointRamp("ReactorPressSP", 2750., 0.3 * duration, 0.1 * duration),
+        IdvStep(4, 1., 0.5 * duration),
+        SetpointRamp("ProductionSP", 22.89, 0.6 * duration, 0.1 * duration),
+        SetpointRamp("ReactorPressSP", 2800., 0.8 * duration),
+    ]
+    return Scenario(duration, events)
+
+
+def main(backend="numpy", duration=2.):
+    si = SimInterface.setup(backend=backend)
+    scenario = make_scenario(float(duration))
+    start = time.perf_counter()
+    n_segments = run_compiled(si, scenario)
+    compiled = time.perf_counter() - start
+    start = time.perf_counter()
+    run_segmented(si, scenario)
+    segmented = time.perf_counter() - start
+    print("scenario: {} h, {} events".format(scenario.duration, len(scenario.events)))
+    print("segmented: {:8.3f} s ({} pauses and fetches)".format(segmented, len(scenario.events)))
+    print("compiled:  {:8.3f} s ({} pauses, 1 fetch)".format(compiled, n_segments - 1))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
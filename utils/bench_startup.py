@@ -0,0 +1,29 @@
+"""Measures the time to the first simulate() call: import of pytep, setup of the SimInterface and a first short
+simulation. Run it in a fresh interpreter for every measurement.
+
+Usage: python bench_startup.py [numpy|matlab] [shared session name]
+
+To measure the warm start, start MATLAB, run matlab.engine.shareEngine('pytep') and pass 'pytep' as session name.
+"""
+import sys
+import time
+
+
+def main(backend="numpy", session=None):
+    start = time.perf_counter()
+    from pytep.siminterface import SimInterface
+    imported = time.perf_counter()
+    bridge_kwargs = dict() if session is None else {"session": session}
+    si = SimInterface.setup(backend=backend, **bridge_kwargs)
+    set_up = time.perf_counter()
+    si.simulate(0.05)
+    simulated = time.perf_counter()
+    print("matlab.engine imported: {}".format("matlab.engine" in sys.modules))
+    print("import pytep.siminterface: {:8.3f} s".format(imported - start))
+    print("SimInterface.setup:        {:8.3f} s".format(set_up - imported))
+    print("first simulate(0.05):      {:8.3f} s".format(simulated - set_up))
+    print("time to first simulate:    {:8.3f} s".format(simulated - start))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
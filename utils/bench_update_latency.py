@@ -0,0 +1,57 @@
+"""Compares the latency of the time-mask fetch (fetch_recent_data) with the cursor fetch (fetch_since) for growing
+simulation histories. The workspace is filled with synthetic histories, so no long simulation runs are needed.
+
+Usage: python bench_update_latency.py [numpy|matlab]
+"""
+import sys
+import time
+
+import numpy as np
+
+SAMPLES_PER_HOUR = 20  # Ts_save = 0.05 h
+NEW_ROWS = SAMPLES_PER_HOUR  # one simulated hour between two updates
+HOURS = [10, 100, 500, 1000, 2000]
+REPEATS = 20
+
+
+def make_bridge(backend):
+    if backend == "matlab":
+        from pytep.matlab_bridge import MatlabBridge
+        return MatlabBridge()
+    from pytep.numpy_bridge import NumpyBridge
+    return NumpyBridge()
+
+
+def fill_workspace(bridge, hours):
+    n_rows = hours * SAMPLES_PER_HOUR + 1
+    rng = np.random.default_rng(0)
+    bridge.set_workspace_variable("tout", np.arange(n_rows, dtype=float).reshape(-1, 1) / SAMPLES_PER_HOUR)
+    for name, width in [("simout", 41), ("xmv", 12), ("setpoints", 12), ("OpCost", 1), ("idv_list", 28)]:
+        bridge.set_workspace_variable(name, rng.random((n_rows, width)))
+    return n_rows
+
+
+def median_latency(func):
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return np.median(latencies)
+
+
+def main(backend="numpy"):
+    bridge = make_bridge(backend)
+    print("{:>8} {:>22} {:>22}".format("hours", "fetch_recent_data [ms]", "fetch_since [ms]"))
+    for hours in HOURS:
+        n_rows = fill_workspace(bridge, hours)
+        ref_time = (n_rows - 1 - NEW_ROWS) / SAMPLES_PER_HOUR
+        cursor = n_rows - NEW_ROWS
+        assert bridge.fetch_since(cursor)[0].shape == bridge.fetch_recent_data(ref_time).shape
+        mask_latency = median_latency(lambda: bridge.fetch_recent_data(ref_time))
+        cursor_latency = median_latency(lambda: bridge.fetch_since(cursor))
+        print("{:>8} {:>22.3f} {:>22.3f}".format(hours, 1e3 * mask_latency, 1e3 * cursor_latency))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,244 @@
+"""Benchmark suite of the SimInterface. The results are written to a JSON file, so that they can be compared across
+commits with --compare.
+
+Cases:
+    simulate        simulated hours per wall second of simulate() at several step sizes
+    update          latency of update() after one simulated hour, as a function of the accumulated history
+    commands        latency of set_idv and ramp_setpoint
+    save_all        throughput of save_all
+    reset           latency of reset() after a run with setpoint and idv changes, restoring the cached initial
+                    workspace (restore) and reloading it with the initialization script (reload)
+    peak_rss        growth of the peak RSS of the python process per simulated hour (in a fresh process)
+
+By default the MATLAB engine is used when it is installed and the fake engine (pytep.fakeengine) otherwise. With the
+fake engine, the cases measure the python side of the MATLAB backend only. The numpy backend simulates about 30
+hours per second with numba installed; without numba it simulates about 0.1 hours per second and a full run on it
+takes days, use --quick.
+
+Usage: python benchmarks.py [--backend auto|matlab|numpy|fake] [--quick] [--output FILE] [--compare BASELINE]
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pytep.siminterface import BaseSimInterface, make_bridge
+
+RESULTS_VERSION = 1
+SETTINGS = {
+    "full": {"sim_hours": 20., "steps": [0.05, 0.5, 5.], "history_hours": [10, 100, 500, 900], "update_repeats": 5,
+             "command_repeats": 50, "save_hours": 100., "rss_hours": 900., "reset_repeats": 20},
+    "quick": {"sim_hours": 2., "steps": [0.05, 0.5], "history_hours": [10, 50], "update_repeats": 3,
+              "command_repeats": 20, "save_hours": 10., "rss_hours": 10., "reset_repeats": 5},
+}
+
+
+def resolve_backend(backend):
+    if backend != "auto":
+        return backend
+    try:
+        import matlab.engine  # noqa: F401
+        return "matlab"
+    except ImportError:
+        return "fake"
+
+
+def new_sim(backend):
+    si = BaseSimInterface()
+    si._attach_bridge(make_bridge(backend))
+    return si
+
+
+def metric(name, value, unit, higher_is_better):
+    return {"name": name, "value": float(value), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_simulate(si, settings):
+    results = []
+    for step in settings["steps"]:
+        si.reset()
+        n_steps = int(round(settings["sim_hours"] / step))
+        start = time.perf_counter()
+        for _ in range(n_steps):
+            si.simulate(step)
+        elapsed = time.perf_counter() - start
+        results.append(metric("simulate.step={:g}h".format(step), n_steps * step / elapsed, "sim h/s", True))
+    return results
+
+
+def bench_update(si, settings):
+    results = []
+    si.reset()
+    for hours in settings["history_hours"]:
+        # the history reaches the given length with the last of the measured updates
+        duration = hours - si.current_sim_time() - settings["update_repeats"]
+        if duration > 0:
+            si.simulate(duration)
+        latencies = []
+        for _ in range(settings["update_repeats"]):
+            si.extend_simulation(1.)
+            si._matlab_bridge.run_until_paused()
+            start = time.perf_counter()
+            si.update()
+            latencies.append(time.perf_counter() - start)
+        results.append(metric("update.history={}h".format(hours), 1e3 * np.median(latencies), "ms", False))
+    return results
+
+
+def bench_commands(si, settings):
+    si.reset()
+    si.simulate(0.1)
+    commands = {
+        "set_idv": lambda idx: si.set_idv(idx % 28 + 1, idx % 2),
+        "ramp_setpoint": lambda idx: si.ramp_setpoint("ProductionSP", target_val=22.89 + 0.01 * (idx % 2),
+                                                      duration=1.),
+    }
+    results = []
+    for name, command in commands.items():
+        latencies = []
+        for idx in range(settings["command_repeats"]):
+            start = time.perf_counter()
+            command(idx)
+            latencies.append(time.perf_counter() - start)
+        results.append(metric("commands.{}".format(name), 1e3 * np.median(latencies), "ms", False))
+    return results
+
+
+def bench_save_all(si, settings):
+    si.reset()
+    si.simulate(settings["save_hours"])
+    with tempfile.TemporaryDirectory() as save_dir:
+        start = time.perf_counter()
+        si.save_all(save_dir)
+        elapsed = time.perf_counter() - start
+        size = sum(path.stat().st_size for path in pathlib.Path(save_dir).iterdir())
+    return [metric("save_all.throughput", size / elapsed / 1e6, "MB/s", True),
+            metric("save_all.rows", len(si.process_data) / elapsed, "rows/s", True)]
+
+
+def bench_reset(si, settings):
+    results = []
+    for name, reload in [("restore", False), ("reload", True)]:
+        latencies = []
+        for _ in range(settings["reset_repeats"]):
+            si.reset()
+            si.simulate(0.1)
+            si.set_idv(1, 1)
+            si.ramp_setpoint("ProductionSP", target_val=24, duration=1.)
+            si.simulate(0.1)
+            start = time.perf_counter()
+            si.reset(reload=reload)
+            latencies.append(time.perf_counter() - start)
+        results.append(metric("reset.{}".format(name), 1e3 * np.median(latencies), "ms", False))
+    return results
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_rss(backend, hours):
+    si = new_sim(backend)
+    si.reset()
+    si.simulate(0.1)
+    before = _peak_rss_bytes()
+    if before is None:
+        return None
+    si.simulate(hours)
+    return before, _peak_rss_bytes()
+
+
+def bench_peak_rss(backend, settings):
+    # measured in a fresh interpreter, the peak of the earlier cases would hide the growth
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        peaks = pool.apply(_peak_rss, (backend, settings["rss_hours"]))
+    if peaks is None:
+        return []
+    before, after = peaks
+    return [metric("peak_rss.total", after / 1e6, "MB", False),
+            metric("peak_rss.per_sim_hour", (after - before) / settings["rss_hours"] / 1e3, "kB/sim h", False)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=pathlib.Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(backend, quick=False):
+    settings = SETTINGS["quick" if quick else "full"]
+    si = new_sim(backend)
+    metrics = []
+    for case in [bench_simulate, bench_update, bench_commands, bench_save_all, bench_reset]:
+        metrics += case(si, settings)
+    metrics += bench_peak_rss(backend, settings)
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "backend": backend,
+        "settings": "quick" if quick else "full",
+        "platform": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                     "system": platform.system()},
+        "metrics": metrics,
+    }
+
+
+def compare(results, baseline, threshold=0.1):
+    """Prints the metrics next to the baseline. Changes beyond the threshold (relative) are marked as faster or
+    slower."""
+    base_values = {entry["name"]: entry["value"] for entry in baseline["metrics"]}
+    print("baseline: {} ({}), current: {} ({})".format(baseline.get("commit"), baseline.get("backend"),
+                                                       results.get("commit"), results.get("backend")))
+    for entry in results["metrics"]:
+        base = base_values.get(entry["name"])
+        if base is None or base == 0:
+            print("{:<28} {:>12.4g} {:<10} (no baseline)".format(entry["name"], entry["value"], entry["unit"]))
+            continue
+        ratio = entry["value"] / base
+        improved = ratio > 1 if entry["higher_is_better"] else ratio < 1
+        mark = ("better" if improved else "WORSE") if abs(ratio - 1) > threshold else ""
+        print("{:<28} {:>12.4g} {:>12.4g} {:<10} {:>6.2f}x {}".format(entry["name"], base, entry["value"],
+                                                                      entry["unit"], ratio, mark))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=["auto", "matlab", "numpy", "fake"], default="auto")
+    parser.add_argument("--quick", action="store_true", help="shorter runs, for a smoke test")
+    parser.add_argument("--output", default=None,
+                        help="JSON file of the results (default: bench_<commit>_<backend>.json)")
+    parser.add_argument("--compare", default=None, help="JSON file of earlier results to compare with")
+    args = parser.parse_args(argv)
+
+    backend = resolve_backend(args.backend)
+    results = run(backend, quick=args.quick)
+    output = args.output or "bench_{}_{}.json".format(results["commit"] or "unknown", backend)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    for entry in results["metrics"]:
+        print("{:<28} {:>12.4g} {}".format(entry["name"], entry["value"], entry["unit"]))
+    print("results written to {}".format(output))
+    if args.compare is not None:
+        with open(args.compare, "r") as baseline_file:
+            compare(results, json.load(baseline_file))
+
+
+if __name__ == "__main__":
+    main()
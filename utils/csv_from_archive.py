@@ -0,0 +1,24 @@
+"""Exports a run archive to CSV chunk by chunk, so the run never has to fit into memory.
+
+Usage: python csv_from_archive.py <archive dir> <csv file> [group]
+"""
+import sys
+
+from pytep.runarchive import RunArchive
+
+
+def main(archive_dir, csv_name, group=None):
+    archive = RunArchive(archive_dir)
+    columns = None
+    if group is not None:
+        columns = archive.groups[group]
+        if "time" not in columns:
+            columns = ["time"] + columns
+    header = True
+    for chunk in archive.iter_chunks(columns):
+        chunk.to_csv(csv_name, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])